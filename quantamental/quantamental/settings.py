@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "scores.middleware.TimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -129,3 +130,39 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 LOGIN_REDIRECT_URL = "/scores/"
 
 # "scores:index"
+
+# Columnar price store built from the Performance table (manage.py build_price_store)
+PRICE_STORE_DIR = BASE_DIR / "data" / "prices"
+
+# Result cache of the portfolio analytics (scores/cache.py). LocMemCache is an LRU
+# cache per process; to share the results between processes use
+# "django.core.cache.backends.filebased.FileBasedCache" with
+# "LOCATION": BASE_DIR / "data" / "cache" instead. Entries expire after TIMEOUT
+# seconds and the cache holds at most MAX_ENTRIES responses.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "analytics": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "analytics",
+        "TIMEOUT": 6 * 60 * 60,
+        "OPTIONS": {"MAX_ENTRIES": 64},
+    },
+}
+
+# Pool that runs the independent analytics stages of a request (scores/executor.py):
+# "thread", "process" or "serial", with at most max_workers workers
+ANALYTICS_EXECUTOR = {"kind": "thread", "max_workers": 4}
+
+# Pool of the chunks of simulated paths (scores/simulation.py), a process pool runs
+# the chunks in parallel, the seed gives the same paths with any pool
+SIMULATION_EXECUTOR = {"kind": "process", "max_workers": 4}
+
+# JSON history of the analytics benchmarks (manage.py run_benchmarks)
+BENCHMARK_HISTORY = BASE_DIR / "data" / "benchmarks.json"
+
+# Clients allowed to read the request latency metrics at /metrics (scores/metrics.py).
+# Behind a reverse proxy every request comes from the proxy, so do not route /metrics
+# through a public proxy.
+METRICS_ALLOWED_IPS = ["127.0.0.1", "::1"]
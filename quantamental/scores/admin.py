@@ -1,13 +1,23 @@
 from django.contrib import admin
 
 from .models import *
+from .signals import bump_once
+
+
+class VersionedAdmin(admin.ModelAdmin):
+    """Bulk deletes of versioned data bump the data version once, not per row."""
+
+    def delete_queryset(self, request, queryset):
+        with bump_once(queryset.model):
+            super().delete_queryset(request, queryset)
+
 
 # Register your models here.
 admin.site.register(Customer)
 admin.site.register(Order)
 admin.site.register(Product)
 admin.site.register(Tag)
-admin.site.register(Identification)
-admin.site.register(Sector)
-admin.site.register(Qualdata)
-admin.site.register(Performance)
+admin.site.register(Identification, VersionedAdmin)
+admin.site.register(Sector, VersionedAdmin)
+admin.site.register(Qualdata, VersionedAdmin)
+admin.site.register(Performance, VersionedAdmin)
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+from .models import DataVersion, SymbolAnalytics
+from .signals import ANALYTICS_DATA, PERFORMANCE_DATA
+from .utils import drawdown_series, rolling_statistics
+
+# Window of the materialized rolling return and volatility in trading days
+ANALYTICS_WINDOW = 252
+
+ANALYTICS_COLUMNS = [
+    "daily_return",
+    "rolling_return",
+    "rolling_volatility",
+    "drawdown",
+    "peak",
+]
+
+
+def symbol_analytics(prices, window=ANALYTICS_WINDOW):
+    """
+    Weight independent analytics of every symbol over its own trading days.
+
+    Parameters:
+    prices (pd.DataFrame): Date x symbol close prices of the full history.
+    window (int): Window of the rolling return and volatility.
+
+    Returns:
+    pd.DataFrame: Long frame with "symbol", "trade_date" and the ANALYTICS_COLUMNS,
+    one row per symbol and date with a close.
+    """
+    frames = []
+    for symbol in prices.columns:
+        closes = prices[[symbol]].dropna()
+        if closes.empty:
+            continue
+        returns = closes.pct_change()
+        statistics = rolling_statistics(returns, [window])[window]
+        frames.append(
+            pd.DataFrame(
+                {
+                    "symbol": symbol,
+                    "trade_date": closes.index.date,
+                    "daily_return": returns[symbol].to_numpy(),
+                    "rolling_return": statistics["return"][symbol].to_numpy(),
+                    "rolling_volatility": statistics["volatility"][symbol].to_numpy(),
+                    "drawdown": drawdown_series(closes)[symbol].to_numpy(),
+                    "peak": closes[symbol].cummax().to_numpy(),
+                }
+            )
+        )
+
+    if not frames:
+        return pd.DataFrame(columns=["symbol", "trade_date", *ANALYTICS_COLUMNS])
+    return pd.concat(frames, ignore_index=True)
+
+
+def to_models(frame):
+    """Unsaved SymbolAnalytics objects of a symbol_analytics frame (NaN becomes NULL)."""
+    frame = frame.astype({column: object for column in ANALYTICS_COLUMNS})
+    frame = frame.where(frame.notna(), None)
+    return [SymbolAnalytics(**row) for row in frame.to_dict(orient="records")]
+
+
+def materialized_rolling_statistics(panel, window=ANALYTICS_WINDOW):
+    """
+    Rolling return and volatility of the panel symbols read from SymbolAnalytics.
+
+    Only dates where the same window fits inside the panel are kept (the first
+    `window` dates after the first close of each symbol are NaN), which is what
+    utils.rolling_statistics returns for the panel.
+
+    Parameters:
+    panel (PricePanel): Asset prices of the requested date window.
+    window (int): Must be the materialized window.
+
+    Returns:
+    dict: {"return", "volatility": pd.DataFrame} on the panel dates and symbols, or
+    None if the table was built from other Performance data, the panel has dates
+    where a symbol has no close (its returns then differ from the returns over the
+    symbol's own trading days) or the table does not cover every close of the
+    panel. The caller then computes the statistics itself.
+    """
+    if window != ANALYTICS_WINDOW or panel.empty:
+        return None
+    if DataVersion.current(ANALYTICS_DATA) != DataVersion.current(PERFORMANCE_DATA):
+        return None
+
+    prices = panel.prices.to_numpy(dtype=float)
+    valid = ~np.isnan(prices)
+    first = np.argmax(valid, axis=0)
+    last = len(prices) - 1 - np.argmax(valid[::-1], axis=0)
+    if np.any(valid.sum(axis=0) < np.where(valid.any(axis=0), last - first + 1, 0)):
+        return None
+
+    rows = SymbolAnalytics.objects.filter(
+        symbol__in=panel.symbols,
+        trade_date__range=(panel.dates[0].date(), panel.dates[-1].date()),
+    ).values_list("symbol", "trade_date", "rolling_return", "rolling_volatility")
+    df = pd.DataFrame.from_records(
+        rows, columns=["symbol", "date", "return", "volatility"]
+    )
+    if df.empty:
+        return None
+    df["date"] = pd.to_datetime(df["date"])
+
+    statistics = {}
+    for field in ["return", "volatility"]:
+        frame = df.pivot(index="date", columns="symbol", values=field)
+        statistics[field] = frame.reindex(
+            index=panel.dates, columns=panel.symbols
+        ).astype(float)
+
+    # Same leading window as a computation on the panel alone
+    rows = np.arange(len(prices))[:, None]
+    keep = (rows >= first + window) & valid
+
+    values = statistics["return"].to_numpy()
+    if np.isnan(values[keep]).any():
+        return None
+    for field, frame in statistics.items():
+        statistics[field] = frame.where(keep)
+    return statistics
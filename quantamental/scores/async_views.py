@@ -0,0 +1,324 @@
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
+
+from . import models
+from .cache import cache_performance
+from .columnar import RESPONSE_FORMATS
+from .compression import aprecompressed, compressed_response
+from .conditional import etag, versioned
+from .metrics import timed
+from .price_store import CLOSE_COLUMNS, get_price_store, pivot_closes
+from .signals import IDENTIFICATION_DATA, QUALDATA_DATA, SCREENER_DATA, SECTOR_DATA
+from .streaming import STREAM_CHUNK_SIZE, StreamingJsonResponse, astream_rows
+from .utils import calculate_portfolio_performance
+from .views import (
+    DESCRIPTION_COLUMNS,
+    IDENTIFICATION_COLUMNS,
+    PERFORMANCE_COLUMNS,
+    QUALDATA_COLUMNS,
+    SECTOR_COLUMNS,
+    _batch_options,
+    _batch_response,
+    _columnar_prices,
+    _optimization_options,
+    _optimization_response,
+    _page,
+    _page_keys,
+    _performance_options,
+    _performance_response,
+    _qualdata_options,
+    _qualdata_queryset,
+    _qualdata_rows,
+    _screener_options,
+    _screener_page,
+    _screener_queryset,
+    _simulation_options,
+    _simulation_response,
+    _stream_options,
+    _stream_queryset,
+    _universe_options,
+    _universe_page,
+    _universe_queryset,
+    _window_queryset,
+)
+
+# Async versions of the data endpoints for ASGI deployments (quantamental/asgi.py).
+# The database is read with the async ORM, and parsing, analytics and JSON encoding
+# run on a worker thread, so the event loop keeps serving other requests meanwhile.
+
+
+def async_login_required(view):
+    """login_required for async views (Django 5.0 only wraps sync views)."""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+async def run_in_executor(func, *args, **kwargs):
+    """Run a CPU bound (or blocking) function on a worker thread."""
+    return await sync_to_async(_close_connections(func), thread_sensitive=False)(
+        *args, **kwargs
+    )
+
+
+def _close_connections(func):
+    # Worker threads outlive the request, close their database connections after use
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return wrapper
+
+
+async def _json(data):
+    # Encoding large payloads is CPU bound as well
+    with timed("serialize"):
+        return await run_in_executor(JsonResponse, data, safe=False)
+
+
+@async_login_required
+@versioned(SECTOR_DATA, IDENTIFICATION_DATA)
+async def table_view_data(request):
+    if request.GET:
+        try:
+            options = _universe_options(request.GET)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        queryset = _universe_queryset(options)
+        start = options["offset"]
+        rows = [row async for row in queryset[start : start + options["page_size"]]]
+        return JsonResponse(_universe_page(options, await queryset.acount(), rows))
+
+    async def rows():
+        return [row async for row in models.Sector.objects.values(*SECTOR_COLUMNS)]
+
+    bodies = await aprecompressed(f"table_view_data:{etag(request.data_state)}", rows)
+    return compressed_response(request, bodies)
+
+
+@async_login_required
+@versioned(IDENTIFICATION_DATA)
+async def table_view_data_2(request):
+    async def rows():
+        queryset = models.Identification.objects.values(*IDENTIFICATION_COLUMNS)
+        return [row async for row in queryset]
+
+    bodies = await aprecompressed(f"table_view_data_2:{etag(request.data_state)}", rows)
+    return compressed_response(request, bodies)
+
+
+@async_login_required
+@versioned(SCREENER_DATA)
+async def screener_view(request):
+    try:
+        options = _screener_options(request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    queryset = _screener_queryset(options)
+    start = options["offset"]
+    with timed("fetch"):
+        rows = [row async for row in queryset[start : start + options["limit"]]]
+        total = await queryset.acount()
+    return JsonResponse(_screener_page(options, total, rows))
+
+
+@async_login_required
+@versioned(QUALDATA_DATA)
+async def single_stock_view_data_1(request):
+    ticker = request.GET.get("ticker")
+    data = [
+        row
+        async for row in models.Qualdata.objects.filter(ticker=ticker).values(
+            *DESCRIPTION_COLUMNS
+        )
+    ]
+    return JsonResponse(data, safe=False)
+
+
+@async_login_required
+@versioned(QUALDATA_DATA)
+async def single_stock_view_data_2(request):
+    ticker = request.GET.get("ticker")
+    data = [
+        row
+        async for row in models.Qualdata.objects.filter(ticker=ticker).values(
+            *QUALDATA_COLUMNS
+        )
+    ]
+    return JsonResponse(data, safe=False)
+
+
+@async_login_required
+@versioned(QUALDATA_DATA)
+async def qualdata_view_data(request):
+    try:
+        tickers, fields = _qualdata_options(request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    rows = [row async for row in _qualdata_queryset(tickers, fields)]
+    return JsonResponse(_qualdata_rows(tickers, rows), safe=False)
+
+
+@async_login_required
+async def performance(request):
+    try:
+        options = _stream_options(request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    queryset = _stream_queryset(options)
+    if options["output_format"] == "columnar":
+        rows = [row async for row in queryset.values_list(*CLOSE_COLUMNS)]
+        prices = await run_in_executor(pivot_closes, rows)
+        return await run_in_executor(
+            _columnar_prices, prices, "performance", options["symbols"] or None
+        )
+
+    next_cursor = None
+    if options["limit"] is not None:
+        keys = [key async for key in _page_keys(queryset, options["limit"])]
+        queryset, next_cursor = _page(queryset, keys)
+
+    rows = queryset.values(*PERFORMANCE_COLUMNS).aiterator(chunk_size=STREAM_CHUNK_SIZE)
+    return StreamingJsonResponse(
+        astream_rows(rows, options["output_format"]),
+        options["output_format"],
+        next_cursor,
+    )
+
+
+@async_login_required
+async def pf_view_aggregated_performance(request):
+    symbol = request.GET.getlist("ticker[]", [])
+    weights = json.loads(request.GET.get("weights", "[]"))  # Parse weights
+
+    with timed("fetch"):
+        store = await run_in_executor(get_price_store)
+        if store is not None:
+            # Read the close panel straight from the memory-mapped price store
+            asset_performance = await run_in_executor(store.panel, symbol)
+            asset_performance = asset_performance.dropna(how="all")
+        else:
+            asset_performance = [
+                row
+                async for row in models.Performance.objects.filter(
+                    symbol__in=symbol
+                ).values(*PERFORMANCE_COLUMNS)
+            ]
+
+    portfolio_performance = await run_in_executor(
+        calculate_portfolio_performance, weights, asset_performance, "Portfolio"
+    )
+
+    return await _json(portfolio_performance)
+
+
+@async_login_required
+async def pf_view_asset_performance(request):
+    symbol = request.GET.getlist("ticker[]", [])
+
+    output_format = request.GET.get("format", "rows")
+    if output_format not in RESPONSE_FORMATS:
+        return JsonResponse({"error": "Invalid format"}, status=400)
+
+    queryset = models.Performance.objects.filter(symbol__in=symbol)
+    if output_format == "columnar":
+        rows = [row async for row in queryset.values_list(*CLOSE_COLUMNS)]
+        prices = await run_in_executor(pivot_closes, rows)
+        return await run_in_executor(
+            _columnar_prices, prices, "asset_performance", symbol
+        )
+
+    with timed("fetch"):
+        asset_performance = [row async for row in queryset.values(*PERFORMANCE_COLUMNS)]
+    return await _json(asset_performance)
+
+
+@async_login_required
+@cache_performance
+async def pf_view_performance(request):
+    try:
+        options = _performance_options(request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    with timed("fetch"):
+        asset_performance = [
+            row
+            async for row in _window_queryset(
+                options["asset_symbol"], options["from_date"], options["to_date"]
+            )
+        ]
+        bm_performance = [
+            row
+            async for row in _window_queryset(
+                options["bm_symbol"], options["from_date"], options["to_date"]
+            )
+        ]
+
+    try:
+        return await run_in_executor(
+            _performance_response, options, asset_performance, bm_performance
+        )
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+@async_login_required
+@require_POST
+async def optimize_view(request):
+    try:
+        options = _optimization_options(request.body)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        return await run_in_executor(_optimization_response, options)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+@async_login_required
+@require_POST
+async def pf_view_batch_performance(request):
+    try:
+        options = _batch_options(request.body)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        return await run_in_executor(_batch_response, options)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+@async_login_required
+@require_POST
+async def simulate_view(request):
+    try:
+        options = _simulation_options(request.body)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        return await run_in_executor(_simulation_response, options)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
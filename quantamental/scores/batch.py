@@ -0,0 +1,166 @@
+import numpy as np
+
+from .rebalancing import CALENDAR_SCHEDULES, _calendar_points, _growth
+
+# Drift band rebalancing depends on the path of every single portfolio, so only
+# the schedules with common rebalancing dates are evaluated in a batch
+BATCH_SCHEDULES = [*CALENDAR_SCHEDULES, "none"]
+
+# Summary metrics of every weight vector, as in calculate_performance_metrics
+# (fractions instead of formatted percentages) plus the maximum drawdown
+BATCH_METRICS = [
+    "cumulativeReturn",
+    "ytdReturn",
+    "returnPerAnnum",
+    "volatility",
+    "sharpe",
+    "calmar",
+    "sortino",
+    "maxDrawdown",
+]
+
+# Weight vectors evaluated per matrix product, bounds the days x vectors arrays
+BATCH_CHUNK_SIZE = 500
+
+
+def sample_weights(n_assets, count, alpha=1.0, seed=None):
+    """
+    Random long only weight vectors that add up to 1 (Dirichlet distribution).
+
+    Parameters:
+    n_assets (int): Number of assets.
+    count (int): Number of weight vectors.
+    alpha (float or list of float): Concentration, 1 is uniform on the simplex,
+    lower values give more concentrated portfolios.
+    seed (int): Seed of the random generator, the same seed gives the same vectors.
+
+    Returns:
+    np.ndarray: count x n_assets weights.
+    """
+    rng = np.random.default_rng(seed)
+    alpha = np.broadcast_to(np.asarray(alpha, dtype=float), (n_assets,))
+    return rng.dirichlet(alpha, size=count)
+
+
+def batch_values(prices, weights, schedule="quarterly", start_value=100.0):
+    """
+    Values of many portfolios with the same rebalancing dates.
+
+    Same result as rebalance() for every row of weights: within a segment
+    between two rebalancing dates a portfolio grows by the growth of the assets
+    since the segment start weighted by its targets, so all portfolios of a
+    segment are one product of the relative growth matrix with the weights. The
+    rest of a row that does not add up to one is cash at 0%.
+
+    Parameters:
+    prices (pd.DataFrame): Date x asset close prices.
+    weights (np.ndarray): Portfolios x assets target weights in column order.
+    schedule (str): One of BATCH_SCHEDULES.
+
+    Returns:
+    np.ndarray: Dates x portfolios values.
+    """
+    if schedule == "none":
+        points = np.array([0])
+    elif schedule in CALENDAR_SCHEDULES:
+        points = _calendar_points(prices.index, CALENDAR_SCHEDULES[schedule])
+    else:
+        raise ValueError(f"Unsupported batch rebalancing schedule: {schedule}")
+
+    growth = _growth(prices.to_numpy(dtype=float))
+    segment = np.maximum(
+        np.searchsorted(points, np.arange(len(growth)), side="left") - 1, 0
+    )
+    ratio = (growth / growth[points[segment]]) @ weights.T + (1 - weights.sum(axis=1))
+
+    # Value at the start of every segment is the product of the previous segment ratios
+    segment_start = np.vstack(
+        [np.ones((1, len(weights))), np.cumprod(ratio[points[1:]], axis=0)]
+    )
+    return start_value * segment_start[segment] * ratio
+
+
+def batch_metrics(values, dates):
+    """
+    Summary metrics of every column of a dates x portfolios value matrix.
+
+    Same definitions as calculate_performance_metrics: daily returns, 252
+    trading days a year, no risk free rate, Sortino with the standard deviation
+    of the negative daily returns.
+
+    Returns:
+    dict: {metric: np.ndarray of one value per portfolio} for BATCH_METRICS.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cumulative = values[-1] / values[0] - 1
+        n_years = (dates[-1] - dates[0]).days / 365.25
+        per_annum = (1 + cumulative) ** (1 / n_years) - 1
+
+        start_of_year = np.argmax(dates.year == dates[-1].year)
+        ytd = values[-1] / values[start_of_year] - 1
+
+        returns = values[1:] / values[:-1] - 1
+        volatility = returns.std(axis=0, ddof=1) * np.sqrt(252)
+
+        peaks = np.maximum.accumulate(values, axis=0)
+        max_drawdown = ((values - peaks) / peaks).min(axis=0)
+
+        # Sample standard deviation of the negative returns of every column
+        negative = np.where(returns < 0, returns, 0.0)
+        n_negative = (returns < 0).sum(axis=0)
+        variance = (
+            (negative**2).sum(axis=0) - negative.sum(axis=0) ** 2 / n_negative
+        ) / (n_negative - 1)
+        downside = np.sqrt(np.where(n_negative > 1, variance, np.nan)) * np.sqrt(252)
+
+        return {
+            "cumulativeReturn": cumulative,
+            "ytdReturn": ytd,
+            "returnPerAnnum": per_annum,
+            "volatility": volatility,
+            "sharpe": per_annum / volatility,
+            "calmar": per_annum / np.abs(max_drawdown),
+            "sortino": per_annum / downside,
+            "maxDrawdown": max_drawdown,
+        }
+
+
+def evaluate_batch(
+    prices,
+    weights,
+    schedule="quarterly",
+    sort="sharpe",
+    descending=True,
+    top_k=10,
+    chunk_size=BATCH_CHUNK_SIZE,
+):
+    """
+    Evaluate many weight vectors on one price panel.
+
+    The vectors are evaluated in chunks, so the memory stays at a few
+    dates x chunk_size arrays however many vectors there are.
+
+    Parameters:
+    prices (pd.DataFrame): Date x asset close prices.
+    weights (np.ndarray): Portfolios x assets target weights.
+    schedule (str): One of BATCH_SCHEDULES.
+    sort (str): Metric of BATCH_METRICS that ranks the vectors.
+    descending (bool): Rank the highest values first.
+    top_k (int): Number of ranked vectors whose value paths are returned.
+
+    Returns:
+    tuple: (metrics {metric: array of every vector}, indices of the top_k
+    vectors, dates x top_k values of those vectors).
+    """
+    metrics = {metric: np.empty(len(weights)) for metric in BATCH_METRICS}
+    for start in range(0, len(weights), chunk_size):
+        values = batch_values(prices, weights[start : start + chunk_size], schedule)
+        for metric, column in batch_metrics(values, prices.index).items():
+            metrics[metric][start : start + chunk_size] = column
+
+    # NaN ranks last in both directions
+    key = metrics[sort]
+    key = np.where(np.isnan(key), -np.inf if descending else np.inf, key)
+    order = np.argsort(-key if descending else key, kind="stable")
+    top = order[:top_k]
+    return metrics, top, batch_values(prices, weights[top], schedule)
@@ -0,0 +1,321 @@
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.http import QueryDict
+
+from .bundle import performance_bundle
+from .panel import PricePanel
+from .utils import (
+    calculate_drawdown,
+    calculate_monthly_returns,
+    calculate_performance_metrics,
+    calculate_portfolio_panel,
+    calculate_portfolio_performance,
+    calculate_rolling_beta,
+    calculate_rolling_return,
+    calculate_rolling_statistics,
+    calculate_top_drawdowns,
+)
+from .views import _performance_options, _performance_response
+
+# Default grid of universe sizes and history lengths
+BENCHMARK_SYMBOLS = [10, 100, 1000, 5000]
+BENCHMARK_YEARS = [1, 5, 10, 30]
+
+# Timed functions, pf_view_performance is the whole view from the loaded rows to the
+# encoded JSON response
+BENCHMARKS = [
+    "calculate_portfolio_panel",
+    "calculate_portfolio_performance",
+    "calculate_rolling_return",
+    "calculate_rolling_statistics",
+    "calculate_drawdown",
+    "calculate_top_drawdowns",
+    "calculate_rolling_beta",
+    "calculate_performance_metrics",
+    "calculate_monthly_returns",
+    "performance_bundle",
+    "pf_view_performance",
+]
+
+TRADING_DAYS = 252
+
+# Cases with more prices (symbols x trading days) are skipped, the row outputs of the
+# calculate_* functions hold one dict per price
+MAX_CELLS = 2_000_000
+
+# A case regresses when its best time is this much slower than in the baseline run
+# and at least MIN_REGRESSION_SECONDS slower (timer noise of the fast cases)
+REGRESSION_THRESHOLD = 0.2
+MIN_REGRESSION_SECONDS = 0.002
+
+BENCHMARK_SYMBOL = "BENCH"
+
+
+def synthetic_panel(n_symbols, years, seed=0):
+    """
+    Random walk close prices of a synthetic universe.
+
+    Every symbol has its own drift and volatility, a tenth of the symbols are
+    listed during the first half of the history (NaN before), and prices have two
+    decimals like the Performance table.
+
+    Parameters:
+    n_symbols (int): Number of symbols.
+    years (int): History length in years of 252 business days.
+    seed (int): Seed of the random generator, the same arguments give the same panel.
+
+    Returns:
+    PricePanel: Date x symbol prices ending on 2024-12-31.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end="2024-12-31", periods=years * TRADING_DAYS, name="date")
+
+    drift = rng.normal(0.0003, 0.0002, n_symbols)
+    volatility = rng.uniform(0.005, 0.03, n_symbols)
+    returns = rng.standard_normal((len(dates), n_symbols)) * volatility + drift
+    prices = np.round(100 * np.exp(np.cumsum(returns, axis=0)), 2)
+
+    late = rng.random(n_symbols) < 0.1
+    starts = rng.integers(0, len(dates) // 2, n_symbols)
+    for j in np.flatnonzero(late):
+        prices[: starts[j], j] = np.nan
+
+    columns = pd.Index([f"SYM{j:05d}" for j in range(n_symbols)], name="symbol")
+    return PricePanel(pd.DataFrame(prices, index=dates, columns=columns))
+
+
+def synthetic_records(panel):
+    """Performance rows of a panel as the views load them (dd.mm.yyyy, Decimal close)."""
+    series = panel.prices.stack().rename("close").reset_index()
+    dates = series["date"].dt.strftime("%d.%m.%Y")
+    return [
+        {"id": i + 1, "symbol": symbol, "date": date, "close": Decimal(f"{close:.2f}")}
+        for i, (symbol, date, close) in enumerate(
+            zip(series["symbol"], dates, series["close"])
+        )
+    ]
+
+
+def benchmark_cases(n_symbols, years, names=BENCHMARKS, seed=0):
+    """
+    Callables of the benchmarks on one synthetic universe.
+
+    Every call gets fresh panels, so the returns cached on a panel are computed
+    in every run like in a request.
+
+    Returns:
+    dict: {name: callable without arguments}.
+    """
+    panel = synthetic_panel(n_symbols, years, seed)
+    benchmark = synthetic_panel(1, years, seed + 1)
+    benchmark.prices.columns = pd.Index([BENCHMARK_SYMBOL], name="symbol")
+    weights = np.full(n_symbols, 1 / n_symbols)
+    portfolio = calculate_portfolio_panel(weights, panel, "Portfolio")
+
+    def fresh(source):
+        return PricePanel(source.prices)
+
+    cases = {
+        "calculate_portfolio_panel": lambda: calculate_portfolio_panel(
+            weights, fresh(panel), "Portfolio"
+        ),
+        "calculate_portfolio_performance": lambda: calculate_portfolio_performance(
+            weights, fresh(panel), "Portfolio"
+        ),
+        "calculate_rolling_return": lambda: calculate_rolling_return(fresh(panel)),
+        "calculate_rolling_statistics": lambda: calculate_rolling_statistics(
+            fresh(panel)
+        ),
+        "calculate_drawdown": lambda: calculate_drawdown(fresh(panel)),
+        "calculate_top_drawdowns": lambda: calculate_top_drawdowns(fresh(panel)),
+        "calculate_rolling_beta": lambda: calculate_rolling_beta(
+            fresh(panel), fresh(benchmark)
+        ),
+        "calculate_performance_metrics": lambda: calculate_performance_metrics(
+            fresh(panel), fresh(benchmark)
+        ),
+        "calculate_monthly_returns": lambda: calculate_monthly_returns(
+            fresh(portfolio), fresh(benchmark)
+        ),
+        "performance_bundle": lambda: performance_bundle(
+            fresh(panel), fresh(portfolio), fresh(benchmark)
+        ),
+    }
+
+    if "pf_view_performance" in names:
+        query = QueryDict(mutable=True)
+        query.setlist("assetTicker[]", panel.symbols)
+        query["assetWeights"] = json.dumps(list(weights))
+        query.setlist("bmTicker[]", [BENCHMARK_SYMBOL])
+        query["bmWeights"] = json.dumps([1])
+        query["fromDate"] = json.dumps(f"{panel.dates[0]:%Y-%m-%d}")
+        query["toDate"] = json.dumps(f"{panel.dates[-1]:%Y-%m-%d}")
+        options = _performance_options(query)
+        asset_records = synthetic_records(panel)
+        bm_records = synthetic_records(benchmark)
+        cases["pf_view_performance"] = lambda: _performance_response(
+            options, asset_records, bm_records
+        )
+
+    return {name: cases[name] for name in names}
+
+
+def time_case(func, repeat=3):
+    """Best and median wall time of repeated calls (seconds)."""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": statistics.median(times), "repeat": repeat}
+
+
+def case_key(name, n_symbols, years):
+    return f"{name}/{n_symbols}x{years}y"
+
+
+def run_benchmarks(
+    symbols=BENCHMARK_SYMBOLS,
+    years=BENCHMARK_YEARS,
+    names=BENCHMARKS,
+    repeat=3,
+    max_cells=MAX_CELLS,
+    seed=0,
+    progress=None,
+):
+    """
+    Time the benchmarks on every universe size and history length of the grid.
+
+    Parameters:
+    symbols, years (list of int): Grid of universe sizes and history lengths.
+    names (list of str): Benchmarks to run, see BENCHMARKS.
+    repeat (int): Calls per case.
+    max_cells (int): Cases with more prices are skipped.
+    seed (int): Seed of the synthetic panels.
+    progress (callable): Called with (key, result) after every case.
+
+    Returns:
+    dict: {case key: {"min", "median", "repeat"} or {"skipped": reason}}.
+    """
+    results = {}
+    for n_symbols in symbols:
+        for n_years in years:
+            cells = n_symbols * n_years * TRADING_DAYS
+            if cells > max_cells:
+                for name in names:
+                    key = case_key(name, n_symbols, n_years)
+                    results[key] = {"skipped": f"{cells} prices > {max_cells}"}
+                    if progress:
+                        progress(key, results[key])
+                continue
+
+            cases = benchmark_cases(n_symbols, n_years, names, seed)
+            for name, func in cases.items():
+                key = case_key(name, n_symbols, n_years)
+                results[key] = time_case(func, repeat)
+                if progress:
+                    progress(key, results[key])
+            del cases
+    return results
+
+
+# ! HISTORY -------------------------------------------------------------------------
+
+
+def environment():
+    """Versions and machine of a run, runs are only comparable on the same machine."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def load_history(path):
+    """Runs recorded in a history file (oldest first)."""
+    path = Path(path)
+    if not path.exists():
+        return []
+    return json.loads(path.read_text())
+
+
+def save_run(path, run):
+    """Append a run to a history file."""
+    path = Path(path)
+    history = load_history(path)
+    history.append(run)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write a copy first so that an interrupted run does not corrupt the history
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(history, indent=1))
+    tmp.replace(path)
+
+
+def make_run(results, label=None):
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "label": label,
+        "environment": environment(),
+        "results": results,
+    }
+
+
+def baseline_run(history, label=None):
+    """Latest run of the history, or latest run with the label (None if there is none)."""
+    for run in reversed(history):
+        if label is None or run.get("label") == label:
+            return run
+    return None
+
+
+def compare(
+    results,
+    baseline,
+    threshold=REGRESSION_THRESHOLD,
+    min_seconds=MIN_REGRESSION_SECONDS,
+):
+    """
+    Compare the best times of a run with a baseline run.
+
+    Returns:
+    dict: {case key: {"baseline", "change", "regression"}} for the cases timed in
+    both runs, change is the relative change of the best time (0.1 is 10% slower).
+    """
+    comparison = {}
+    for key, result in results.items():
+        before = baseline["results"].get(key, {})
+        if "min" not in result or "min" not in before:
+            continue
+        change = result["min"] / before["min"] - 1
+        comparison[key] = {
+            "baseline": before["min"],
+            "change": change,
+            "regression": change > threshold
+            and result["min"] - before["min"] > min_seconds,
+        }
+    return comparison
@@ -0,0 +1,288 @@
+import pandas as pd
+
+from .columnar import format_dates, to_columns
+from .executor import Ref, StageGraph, run_stages
+from .panel import PricePanel
+from .utils import (
+    RETURN_FREQUENCIES,
+    ROLLING_FIELDS,
+    calculate_drawdown,
+    calculate_monthly_returns,
+    calculate_performance_metrics,
+    calculate_rolling_beta,
+    calculate_rolling_return,
+    calculate_rolling_statistics,
+    calculate_top_drawdowns,
+    drawdown_series,
+    rolling_beta,
+    rolling_statistics,
+)
+
+
+def performance_bundle(
+    asset_panel,
+    portfolio_panel,
+    bm_panel,
+    beta_window=104,
+    beta_frequency="weekly",
+    rolling_windows=(),
+    top_n=5,
+    min_depth=0.0,
+    output_format="rows",
+    asset_statistics=None,
+    kind=None,
+):
+    """
+    Run the analytics of pf_view_performance as a stage graph.
+
+    Parameters:
+    asset_panel, portfolio_panel, bm_panel (PricePanel): Prices of the request.
+    beta_window, beta_frequency: Rolling beta lookback and return frequency.
+    rolling_windows (list of int): Extra rolling statistics windows.
+    top_n, min_depth: Number and minimum depth of the top drawdowns.
+    output_format (str): "rows" or "columnar".
+    asset_statistics (dict): Optional precomputed asset rolling statistics.
+    kind (str): Executor kind, see executor.run_stages.
+
+    Returns:
+    tuple: (dict of the response entries except the asset and portfolio prices,
+    StageResults with the per-stage timings).
+    """
+    graph = performance_graph(
+        asset_panel,
+        portfolio_panel,
+        bm_panel,
+        beta_window,
+        beta_frequency,
+        rolling_windows,
+        top_n,
+        min_depth,
+        output_format,
+        asset_statistics,
+    )
+    results = run_stages(graph, kind)
+    values = results.values
+
+    response_data = {
+        "portfolio_top_drawdowns": values["portfolio_top_drawdowns"],
+        "benchmark_top_drawdowns": values["benchmark_top_drawdowns"],
+        "performance_metrics": values["performance_metrics"],
+        "monthly_returns": values["monthly_returns"],
+    }
+    if output_format == "columnar":
+        response_data.update(values["columnar"])
+        return response_data, results
+
+    response_data.update(
+        {
+            "pf_bm_rolling_return": values["pf_bm_rolling_return"],
+            "asset_rolling_return": values["asset_rolling_return"],
+            "portfolio_drawdown": values["portfolio_drawdown"]
+            + values["benchmark_drawdown"],
+            "portfolio_rolling_beta": values["portfolio_rolling_beta"],
+            "asset_rolling_beta": values["asset_rolling_beta"],
+        }
+    )
+    if rolling_windows:
+        response_data["pf_bm_rolling_statistics"] = values["pf_bm_rolling_statistics"]
+        response_data["asset_rolling_statistics"] = values["asset_rolling_statistics"]
+    return response_data, results
+
+
+def performance_graph(
+    asset_panel,
+    portfolio_panel,
+    bm_panel,
+    beta_window,
+    beta_frequency,
+    rolling_windows,
+    top_n,
+    min_depth,
+    output_format,
+    asset_statistics=None,
+):
+    """
+    Stage graph of pf_view_performance.
+
+    The first stages compute the returns of every panel and the joined panels
+    once, all other stages read them from the panel caches and run concurrently.
+    """
+    beta_returns = RETURN_FREQUENCIES[beta_frequency]
+    graph = StageGraph(
+        {
+            "asset_prices": asset_panel,
+            "portfolio_prices": portfolio_panel,
+            "benchmark_prices": bm_panel,
+            "asset_statistics": asset_statistics,
+        }
+    )
+
+    # Shared inputs
+    assets = graph.add("assets", _warm, Ref("asset_prices"), beta_returns)
+    portfolio = graph.add(
+        "portfolio", _warm, Ref("portfolio_prices"), beta_returns, "monthly_returns"
+    )
+    benchmark = graph.add(
+        "benchmark", _warm, Ref("benchmark_prices"), beta_returns, "monthly_returns"
+    )
+    pf_bm = graph.add("pf_bm_panel", _join, portfolio, benchmark)
+    combined = graph.add("combined_panel", _join, portfolio, assets)
+
+    # Tables shared by both formats
+    graph.add(
+        "portfolio_top_drawdowns", calculate_top_drawdowns, portfolio, top_n, min_depth
+    )
+    graph.add(
+        "benchmark_top_drawdowns", calculate_top_drawdowns, benchmark, top_n, min_depth
+    )
+    graph.add("performance_metrics", calculate_performance_metrics, combined, benchmark)
+    graph.add("monthly_returns", calculate_monthly_returns, portfolio, benchmark)
+
+    if output_format == "columnar":
+        graph.add(
+            "columnar",
+            columnar_performance,
+            assets,
+            portfolio,
+            benchmark,
+            pf_bm,
+            beta_window,
+            beta_frequency,
+            rolling_windows,
+            Ref("asset_statistics"),
+        )
+        return graph
+
+    graph.add("pf_bm_rolling_return", calculate_rolling_return, pf_bm)
+    graph.add(
+        "asset_rolling_return",
+        calculate_rolling_return,
+        assets,
+        statistics=Ref("asset_statistics"),
+    )
+    graph.add("portfolio_drawdown", calculate_drawdown, portfolio)
+    graph.add("benchmark_drawdown", calculate_drawdown, benchmark)
+    graph.add(
+        "portfolio_rolling_beta",
+        calculate_rolling_beta,
+        portfolio,
+        benchmark,
+        beta_window,
+        beta_frequency,
+    )
+    graph.add(
+        "asset_rolling_beta",
+        calculate_rolling_beta,
+        assets,
+        benchmark,
+        beta_window,
+        beta_frequency,
+    )
+    if rolling_windows:
+        # All windows come out of one pass over each panel
+        graph.add(
+            "pf_bm_rolling_statistics",
+            calculate_rolling_statistics,
+            pf_bm,
+            rolling_windows,
+        )
+        graph.add(
+            "asset_rolling_statistics",
+            calculate_rolling_statistics,
+            assets,
+            rolling_windows,
+        )
+    return graph
+
+
+def columnar_performance(
+    asset_panel,
+    portfolio_panel,
+    bm_panel,
+    pf_bm_panel,
+    beta_window,
+    beta_frequency,
+    rolling_windows,
+    asset_statistics=None,
+):
+    """
+    Columnar timeseries of pf_view_performance.
+
+    Every daily series is a float array on one shared date axis ("dates") and the
+    rolling betas are on the axis of their return frequency ("beta_dates"). A
+    series is {symbol: {metric: [...]}} with null where there is no value. With a
+    single benchmark the beta metric is "beta", otherwise "beta <benchmark>".
+    """
+    dates = asset_panel.dates.union(pf_bm_panel.dates)
+
+    pf_bm_statistics = rolling_statistics(pf_bm_panel.daily_returns, [252])[252]
+    if asset_statistics is None:
+        asset_statistics = rolling_statistics(asset_panel.daily_returns, [252])[252]
+
+    drawdown = pd.concat(
+        [drawdown_series(portfolio_panel.prices), drawdown_series(bm_panel.prices)],
+        axis=1,
+    )
+
+    returns = RETURN_FREQUENCIES[beta_frequency]
+    portfolio_beta_dates, portfolio_betas = _beta_frames(
+        portfolio_panel, bm_panel, returns, beta_window
+    )
+    asset_beta_dates, asset_betas = _beta_frames(
+        asset_panel, bm_panel, returns, beta_window
+    )
+    beta_dates = portfolio_beta_dates.union(asset_beta_dates)
+
+    response_data = {
+        "format": "columnar",
+        "dates": format_dates(dates),
+        "beta_dates": format_dates(beta_dates),
+        "asset_performance": to_columns({"close": asset_panel.prices}, dates),
+        "portfolio_performance": to_columns({"close": pf_bm_panel.prices}, dates),
+        "pf_bm_rolling_return": to_columns(
+            {key: pf_bm_statistics[key] for key in ["volatility", "return"]}, dates
+        ),
+        "asset_rolling_return": to_columns(
+            {key: asset_statistics[key] for key in ["volatility", "return"]}, dates
+        ),
+        "portfolio_drawdown": to_columns({"drawdown": drawdown}, dates),
+        "portfolio_rolling_beta": to_columns(portfolio_betas, beta_dates),
+        "asset_rolling_beta": to_columns(asset_betas, beta_dates),
+    }
+
+    if rolling_windows:
+        for key, panel in [
+            ("pf_bm_rolling_statistics", pf_bm_panel),
+            ("asset_rolling_statistics", asset_panel),
+        ]:
+            statistics = rolling_statistics(panel.daily_returns, rolling_windows)
+            frames = {
+                f"{field}_{window}": statistics[window][field]
+                for window in rolling_windows
+                for field in ROLLING_FIELDS
+            }
+            response_data[key] = to_columns(frames, dates)
+
+    return response_data
+
+
+def _warm(panel, *attributes):
+    return panel.warm("daily_returns", *attributes)
+
+
+def _join(*panels):
+    return PricePanel.join(*panels).warm("daily_returns")
+
+
+def _beta_frames(panel, bm_panel, returns, window):
+    """Rolling betas of a panel as (index, {metric: date x symbol frame})."""
+    index, betas = rolling_beta(
+        getattr(panel, returns), getattr(bm_panel, returns), window
+    )
+    frames = {}
+    for j, benchmark in enumerate(bm_panel.symbols):
+        metric = "beta" if len(bm_panel.symbols) == 1 else f"beta {benchmark}"
+        frames[metric] = pd.DataFrame(
+            betas[:, :, j], index=index, columns=panel.symbols
+        )
+    return index, frames
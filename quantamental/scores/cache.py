@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import json
+from datetime import datetime
+from functools import wraps
+
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .models import DataVersion
+from .signals import PERFORMANCE_DATA
+
+# Alias of the result cache in settings.CACHES
+ANALYTICS_CACHE = "analytics"
+
+# Query parameters that describe the portfolio and benchmark, every other parameter
+# enters the cache key as it is
+SPEC_PARAMETERS = [
+    "assetTicker[]",
+    "assetWeights",
+    "bmTicker[]",
+    "bmWeights",
+    "fromDate",
+    "toDate",
+]
+
+# Results being computed by async views, {(key, version): asyncio.Future}
+_in_flight = {}
+
+
+def performance_spec(query):
+    """
+    Canonical specification of a pf_view_performance request.
+
+    Tickers keep the requested order (the series of the response are in that
+    order), weights are rounded so that "0.1" and "0.10000000000000001" are the
+    same portfolio, and the dates are parsed. The weights are not rescaled:
+    weights that do not add up to one leave the rest uninvested, which is a
+    different portfolio.
+
+    Parameters:
+    query (QueryDict): GET parameters of the request.
+
+    Returns:
+    dict: JSON-serializable specification, or None if the request is invalid (it
+    is then answered by the view without the cache).
+    """
+    try:
+        spec = {
+            "assets": _holdings(
+                query.getlist("assetTicker[]", []), query.get("assetWeights")
+            ),
+            "benchmark": _holdings(
+                query.getlist("bmTicker[]", []), query.get("bmWeights")
+            ),
+            "from_date": _date(query.get("fromDate")),
+            "to_date": _date(query.get("toDate")),
+        }
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+    spec["parameters"] = {
+        key: query.getlist(key) for key in sorted(query) if key not in SPEC_PARAMETERS
+    }
+    return spec
+
+
+def performance_cache_key(query):
+    """Hash of the canonical specification of a request (None if it is invalid)."""
+    spec = performance_spec(query)
+    if spec is None:
+        return None
+    canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"))
+    return "pf_view_performance:" + hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def cache_performance(view):
+    """
+    Serve repeated pf_view_performance requests from the analytics cache.
+
+    The cache version is the Performance data version, so any write to the
+    Performance table makes every cached result stale at once. Only successful
+    responses are stored. The X-Cache header tells whether a response was a HIT.
+    Works for sync and async views. Async views also compute concurrent misses of
+    the same request only once, the other requests wait for that result.
+    """
+
+    if asyncio.iscoroutinefunction(view):
+
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            key = performance_cache_key(request.GET)
+            if key is None:
+                return await view(request, *args, **kwargs)
+
+            cache = caches[ANALYTICS_CACHE]
+            version = await DataVersion.acurrent(PERFORMANCE_DATA)
+
+            cached = await cache.aget(key, version=version)
+            if cached is not None:
+                return _cached_response(cached)
+
+            in_flight = _in_flight.get((key, version))
+            if in_flight is not None:
+                cached = await asyncio.shield(in_flight)
+                if cached is not None:
+                    return _cached_response(cached)
+                # The other request failed, answer this one on its own
+                return await view(request, *args, **kwargs)
+
+            future = _in_flight[(key, version)] = (
+                asyncio.get_running_loop().create_future()
+            )
+            cached = None
+            try:
+                response = await view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    cached = (response.content, response["Content-Type"])
+                    await cache.aset(key, cached, version=version)
+            finally:
+                future.set_result(cached)
+                del _in_flight[(key, version)]
+            response["X-Cache"] = "MISS"
+            return response
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = performance_cache_key(request.GET)
+        if key is None:
+            return view(request, *args, **kwargs)
+
+        cache = caches[ANALYTICS_CACHE]
+        version = DataVersion.current(PERFORMANCE_DATA)
+
+        cached = cache.get(key, version=version)
+        if cached is not None:
+            return _cached_response(cached)
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(
+                key, (response.content, response["Content-Type"]), version=version
+            )
+        response["X-Cache"] = "MISS"
+        return response
+
+    return wrapper
+
+
+def _cached_response(cached):
+    content, content_type = cached
+    response = HttpResponse(content, content_type=content_type)
+    response["X-Cache"] = "HIT"
+    return response
+
+
+def _holdings(tickers, weights):
+    """[ticker, weight] pairs, or {date: pairs} for a dated weight schedule."""
+    if weights is None:
+        return [[ticker, None] for ticker in tickers]
+
+    weights = json.loads(weights)
+    if isinstance(weights, dict):
+        return {
+            _date(date): _holdings(tickers, json.dumps(row))
+            for date, row in sorted(weights.items())
+        }
+
+    if len(weights) != len(tickers):
+        raise ValueError("Number of weights must match the number of tickers")
+    return [
+        [ticker, round(float(weight), 10)] for ticker, weight in zip(tickers, weights)
+    ]
+
+
+def _date(value):
+    return datetime.strptime(value.strip('"'), "%Y-%m-%d").date().isoformat()
@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pandas as pd
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard library encoder is the fallback
+    orjson = None
+
+DATE_FORMAT = "%d.%m.%Y"
+
+# Response formats of the timeseries endpoints: one dict per row, or one array per series
+RESPONSE_FORMATS = ["rows", "columnar"]
+
+
+def format_dates(index):
+    """Shared date array of a columnar payload (dd.mm.yyyy, like the row format)."""
+    return list(pd.DatetimeIndex(index).strftime(DATE_FORMAT))
+
+
+def to_columns(frames, dates):
+    """
+    Convert date x symbol frames to columnar series on a shared date axis.
+
+    Parameters:
+    frames (dict): {metric: pd.DataFrame} of date x symbol values.
+    dates (pd.DatetimeIndex): Shared date axis. Missing values become null.
+
+    Returns:
+    dict: {symbol: {metric: np.ndarray}} with one float64 array per symbol and metric.
+    """
+    output = {}
+    for metric, frame in frames.items():
+        values = frame.reindex(dates).to_numpy(dtype=float)
+        for j, symbol in enumerate(frame.columns):
+            output.setdefault(symbol, {})[metric] = np.ascontiguousarray(values[:, j])
+    return output
+
+
+def dumps(payload):
+    """
+    Serialize a payload that holds NumPy arrays to JSON bytes.
+
+    orjson writes the float64 buffers directly when it is installed. NaN and
+    infinity become null in both encoders.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=_default).encode()
+
+
+def _default(value):
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == "f":
+            return np.where(np.isfinite(value), value, None).tolist()
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class ColumnarJsonResponse(HttpResponse):
+    """JSON response for payloads with NumPy arrays (see dumps)."""
+
+    def __init__(self, payload, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps(payload), **kwargs)
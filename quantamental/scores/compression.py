@@ -0,0 +1,98 @@
+import gzip
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from .cache import ANALYTICS_CACHE
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Content encodings in the order of preference of the server
+ENCODINGS = ["br", "gzip"]
+
+# Bodies are compressed once per data version, so the levels favour size over speed
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+
+def json_bodies(data):
+    """
+    Encode data like JsonResponse and compress it with every available encoding.
+
+    Returns:
+    dict: {encoding: bytes} with "identity" (the JSON), "gzip" and, if the
+    brotli package is installed, "br".
+    """
+    content = json.dumps(data, cls=DjangoJSONEncoder).encode()
+    bodies = {
+        "identity": content,
+        "gzip": gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0),
+    }
+    if brotli is not None:
+        bodies["br"] = brotli.compress(content, quality=BROTLI_QUALITY)
+    return bodies
+
+
+def precompressed(key, build):
+    """
+    Compressed JSON bodies of build() from the analytics cache.
+
+    Parameters:
+    key (str): Cache key, must change with the data (e.g. contain its ETag).
+    build (callable): Returns the data on a cache miss.
+
+    Returns:
+    dict: {encoding: bytes}, see json_bodies.
+    """
+    cache = caches[ANALYTICS_CACHE]
+    bodies = cache.get(key)
+    if bodies is None:
+        bodies = json_bodies(build())
+        cache.set(key, bodies)
+    return bodies
+
+
+async def aprecompressed(key, build):
+    """Async version of precompressed(), build is a coroutine function."""
+    cache = caches[ANALYTICS_CACHE]
+    bodies = await cache.aget(key)
+    if bodies is None:
+        data = await build()
+        # Encoding and compressing are CPU bound, keep them off the event loop
+        bodies = await sync_to_async(json_bodies, thread_sensitive=False)(data)
+        await cache.aset(key, bodies)
+    return bodies
+
+
+def accepted_encoding(request, bodies):
+    """Preferred encoding of the bodies that the Accept-Encoding header allows."""
+    accepted = {}
+    for coding in request.headers.get("Accept-Encoding", "").split(","):
+        coding, _, parameters = coding.partition(";")
+        try:
+            quality = float(parameters.strip().removeprefix("q=") or 1)
+        except ValueError:
+            quality = 0
+        accepted[coding.strip().lower()] = quality
+
+    for encoding in ENCODINGS:
+        if encoding in bodies and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return "identity"
+
+
+def compressed_response(request, bodies, content_type="application/json"):
+    """Response with the body in the preferred encoding of the client."""
+    encoding = accepted_encoding(request, bodies)
+    response = HttpResponse(bodies[encoding], content_type=content_type)
+    if encoding != "identity":
+        response["Content-Encoding"] = encoding
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
@@ -0,0 +1,95 @@
+from collections import namedtuple
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .models import DataVersion
+
+# Versions ({name: version}) and latest update (None if never bumped) of data sets
+DataState = namedtuple("DataState", ["versions", "updated"])
+
+
+def data_state(names):
+    """DataState of the named DataVersion rows (version 0 for missing rows)."""
+    rows = DataVersion.objects.filter(name__in=names).values_list(
+        "name", "version", "updated"
+    )
+    return _data_state(names, list(rows))
+
+
+async def adata_state(names):
+    """Async version of data_state()."""
+    rows = DataVersion.objects.filter(name__in=names).values_list(
+        "name", "version", "updated"
+    )
+    return _data_state(names, [row async for row in rows])
+
+
+def etag(state):
+    """
+    Weak ETag of a DataState, the same for every content encoding of a response.
+
+    Data sets are joined with "+", a comma would split the ETag in If-None-Match.
+    """
+    tag = "+".join(f"{name}:{version}" for name, version in state.versions.items())
+    return f'W/"{tag}"'
+
+
+def versioned(*names):
+    """
+    Conditional GET for views of data sets versioned by DataVersion.
+
+    The response gets an ETag and a Last-Modified date from the versions of the
+    named data sets, and a revalidation of an unchanged response is answered
+    with 304 Not Modified (Django's condition decorator). Responses are private
+    and always revalidated (Cache-Control: private, no-cache), so browsers keep
+    them but ask before reusing them. The DataState is loaded once per request
+    and set as request.data_state for the view. Works for sync and async views.
+    """
+    names = sorted(names)
+
+    def decorator(view):
+        conditional = condition(etag_func=_etag, last_modified_func=_last_modified)(
+            view
+        )
+
+        if iscoroutinefunction(view):
+
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                request.data_state = await adata_state(names)
+                response = await conditional(request, *args, **kwargs)
+                patch_cache_control(response, private=True, no_cache=True)
+                return response
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            request.data_state = data_state(names)
+            response = conditional(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _data_state(names, rows):
+    versions = dict.fromkeys(names, 0)
+    updated = None
+    for name, version, row_updated in rows:
+        versions[name] = version
+        updated = row_updated if updated is None else max(updated, row_updated)
+    return DataState(versions, updated)
+
+
+def _etag(request, *args, **kwargs):
+    return etag(request.data_state)
+
+
+def _last_modified(request, *args, **kwargs):
+    return request.data_state.updated
@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+
+from django.conf import settings
+
+from .metrics import record
+
+EXECUTOR_KINDS = ["thread", "process", "serial"]
+
+Stage = namedtuple("Stage", ["name", "func", "args", "kwargs", "dependencies"])
+StageResults = namedtuple("StageResults", ["values", "timings", "elapsed"])
+
+# Pools are created on first use and shared by all requests of the process
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class Ref(str):
+    """Name of an input or stage whose value is passed as an argument to a stage."""
+
+
+class StageGraph:
+    """
+    Dependency graph of analytics stages.
+
+    Every stage is a function call. Arguments that are Ref("name") are replaced by
+    the value of that input or stage, which makes the stage depend on it, so a
+    shared input (a joined panel, cached returns) is built once by its own stage
+    and handed to every stage that needs it. Stages can only refer to names that
+    already exist, so the graph has no cycles.
+
+    With a process pool the functions and their arguments must be picklable
+    (module level functions, no lambdas), and every argument is copied to the
+    worker process.
+    """
+
+    def __init__(self, inputs=None):
+        self.inputs = dict(inputs or {})
+        self.stages = {}
+
+    def add(self, name, func, *args, **kwargs):
+        if name in self.inputs or name in self.stages:
+            raise ValueError(f"Duplicate stage: {name}")
+
+        dependencies = [
+            value for value in [*args, *kwargs.values()] if isinstance(value, Ref)
+        ]
+        for dependency in dependencies:
+            if dependency not in self.inputs and dependency not in self.stages:
+                raise ValueError(f"Stage {name} depends on unknown {dependency}")
+
+        self.stages[name] = Stage(name, func, args, kwargs, dependencies)
+        return Ref(name)
+
+
+def run_stages(graph, kind=None, max_workers=None):
+    """
+    Run the stages of a graph as soon as their dependencies are done.
+
+    Parameters:
+    graph (StageGraph): Stages to run.
+    kind (str): "thread", "process" or "serial". Defaults to
+    settings.ANALYTICS_EXECUTOR["kind"].
+    max_workers (int): Pool size. Defaults to settings.ANALYTICS_EXECUTOR["max_workers"].
+
+    Returns:
+    StageResults: values ({name: value} of inputs and stages), timings ({name:
+    seconds} spent in every stage) and the elapsed wall time of the graph. They
+    are recorded as stages of the current request as well (scores/metrics.py).
+    """
+    config = getattr(settings, "ANALYTICS_EXECUTOR", {})
+    kind = kind or config.get("kind", "thread")
+    max_workers = max_workers or config.get("max_workers")
+    if kind not in EXECUTOR_KINDS:
+        raise ValueError(f"Unknown executor kind: {kind}")
+
+    start = time.perf_counter()
+    values = dict(graph.inputs)
+    timings = {}
+
+    if kind == "serial":
+        # Stages were added in dependency order
+        for stage in graph.stages.values():
+            values[stage.name], timings[stage.name] = _timed(
+                stage.func, *_resolve(stage, values)
+            )
+        return _results(values, timings, time.perf_counter() - start)
+
+    pool = _get_pool(kind, max_workers)
+    pending = dict(graph.stages)
+    running = {}
+    while pending or running:
+        for name, stage in list(pending.items()):
+            if all(dependency in values for dependency in stage.dependencies):
+                args, kwargs = _resolve(stage, values)
+                running[pool.submit(_timed, stage.func, args, kwargs)] = name
+                del pending[name]
+
+        finished, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in finished:
+            name = running.pop(future)
+            values[name], timings[name] = future.result()
+
+    return _results(values, timings, time.perf_counter() - start)
+
+
+def map_chunks(func, chunks, kind=None, max_workers=None):
+    """
+    Call a function with the arguments of every chunk on the shared pool.
+
+    For many independent calls of the same function (e.g. chunks of simulated
+    paths), which are not stages of their own. With a process pool func must be
+    a module level function and the arguments are copied to the workers.
+
+    Parameters:
+    func (callable): Function called as func(*chunk).
+    chunks (list of tuple): Arguments of every call.
+    kind, max_workers: Pool, see run_stages().
+
+    Returns:
+    list: Results in the order of the chunks.
+    """
+    config = getattr(settings, "ANALYTICS_EXECUTOR", {})
+    kind = kind or config.get("kind", "thread")
+    max_workers = max_workers or config.get("max_workers")
+    if kind not in EXECUTOR_KINDS:
+        raise ValueError(f"Unknown executor kind: {kind}")
+
+    if kind == "serial":
+        return [func(*chunk) for chunk in chunks]
+    pool = _get_pool(kind, max_workers)
+    futures = [pool.submit(func, *chunk) for chunk in chunks]
+    return [future.result() for future in futures]
+
+
+def _results(values, timings, elapsed):
+    # Every stage and the whole graph are stages of the request (Server-Timing)
+    for name, seconds in timings.items():
+        record(name, seconds)
+    record("analytics", elapsed)
+    return StageResults(values, timings, elapsed)
+
+
+def _timed(func, args, kwargs):
+    start = time.perf_counter()
+    value = func(*args, **kwargs)
+    return value, time.perf_counter() - start
+
+
+def _resolve(stage, values):
+    def value(argument):
+        return values[argument] if isinstance(argument, Ref) else argument
+
+    args = [value(argument) for argument in stage.args]
+    kwargs = {key: value(argument) for key, argument in stage.kwargs.items()}
+    return args, kwargs
+
+
+def _get_pool(kind, max_workers):
+    key = (kind, max_workers)
+    with _pools_lock:
+        if key not in _pools:
+            pool_class = ThreadPoolExecutor if kind == "thread" else ProcessPoolExecutor
+            _pools[key] = pool_class(max_workers=max_workers)
+        return _pools[key]
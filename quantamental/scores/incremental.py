@@ -0,0 +1,318 @@
+import math
+from collections import deque
+
+import pandas as pd
+
+from .analytics import ANALYTICS_COLUMNS
+from .models import AnalyticsState, Performance, SymbolAnalytics
+from .price_store import read_closes
+
+
+class DrawdownState:
+    """
+    Running peak and drawdown of a price series.
+
+    Same definition as utils.drawdown_series: close / running peak - 1.
+    """
+
+    def __init__(self, peak=None, drawdown=None):
+        self.peak = peak
+        self.drawdown = drawdown
+
+    def update(self, close):
+        if self.peak is None or close > self.peak:
+            self.peak = close
+        self.drawdown = close / self.peak - 1
+        return self.drawdown
+
+    def to_dict(self):
+        return {"peak": self.peak, "drawdown": self.drawdown}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class RollingStatsState:
+    """
+    Rolling return and annualized volatility over the last `window` daily returns.
+
+    The window keeps the sums of r, r**2 and log(1 + r), so a new close costs O(1):
+    add the new return and subtract the one that leaves the window. The sums are
+    recomputed from the window once every `window` updates to stop rounding errors
+    from piling up, which is still O(1) amortized. Same definitions as
+    utils.rolling_statistics, over the trading days of the symbol itself.
+    """
+
+    def __init__(self, window=252, last_close=None, returns=(), periods_per_year=252):
+        self.window = window
+        self.periods_per_year = periods_per_year
+        self.last_close = last_close
+        self.returns = deque(returns, maxlen=window)
+        self._resum()
+
+    def update(self, close):
+        if self.last_close is not None:
+            value = close / self.last_close - 1
+            if len(self.returns) == self.window:
+                self._add(self.returns[0], -1)
+            self.returns.append(value)
+            self._add(value, 1)
+
+            self._updates += 1
+            if self._updates >= self.window:
+                self._resum()
+        self.last_close = close
+
+    @property
+    def complete(self):
+        return len(self.returns) == self.window
+
+    @property
+    def rolling_return(self):
+        return math.expm1(self.log_sum) if self.complete else None
+
+    @property
+    def volatility(self):
+        if not self.complete:
+            return None
+        n = len(self.returns)
+        variance = (self.squares - self.total * self.total / n) / (n - 1)
+        return math.sqrt(max(variance, 0.0) * self.periods_per_year)
+
+    def to_dict(self):
+        return {
+            "window": self.window,
+            "last_close": self.last_close,
+            "returns": list(self.returns),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def _add(self, value, sign):
+        self.total += sign * value
+        self.squares += sign * value * value
+        self.log_sum += sign * math.log1p(value)
+
+    def _resum(self):
+        self.total = math.fsum(self.returns)
+        self.squares = math.fsum(value * value for value in self.returns)
+        self.log_sum = math.fsum(math.log1p(value) for value in self.returns)
+        self._updates = 0
+
+
+class RollingBetaState:
+    """
+    Rolling beta of an asset against a benchmark over the last `window` joint returns.
+
+    Keeps the sums of x, y, x*y and y*y of the window like utils.rolling_beta
+    (covariance with ddof=1, benchmark variance with ddof=0, Blume adjustment),
+    so every joint close costs O(1).
+    """
+
+    def __init__(
+        self, window=252, last_asset=None, last_benchmark=None, pairs=(), blume=True
+    ):
+        self.window = window
+        self.blume = blume
+        self.last_asset = last_asset
+        self.last_benchmark = last_benchmark
+        self.pairs = deque((tuple(pair) for pair in pairs), maxlen=window)
+        self._resum()
+
+    def update(self, asset_close, benchmark_close):
+        if self.last_asset is not None:
+            pair = (
+                asset_close / self.last_asset - 1,
+                benchmark_close / self.last_benchmark - 1,
+            )
+            if len(self.pairs) == self.window:
+                self._add(self.pairs[0], -1)
+            self.pairs.append(pair)
+            self._add(pair, 1)
+
+            self._updates += 1
+            if self._updates >= self.window:
+                self._resum()
+        self.last_asset = asset_close
+        self.last_benchmark = benchmark_close
+
+    @property
+    def beta(self):
+        n = len(self.pairs)
+        if n < self.window:
+            return None
+        covariance = (self.sums[2] - self.sums[0] * self.sums[1] / n) / (n - 1)
+        variance = (self.sums[3] - self.sums[1] * self.sums[1] / n) / n
+        if variance == 0:
+            return None
+        beta = covariance / variance
+        return 0.67 * beta + 0.33 if self.blume else beta
+
+    def to_dict(self):
+        return {
+            "window": self.window,
+            "last_asset": self.last_asset,
+            "last_benchmark": self.last_benchmark,
+            "pairs": [list(pair) for pair in self.pairs],
+            "blume": self.blume,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def _add(self, pair, sign):
+        x, y = pair
+        for i, value in enumerate([x, y, x * y, y * y]):
+            self.sums[i] += sign * value
+
+    def _resum(self):
+        columns = list(zip(*self.pairs)) or [(), ()]
+        x, y = columns
+        self.sums = [
+            math.fsum(x),
+            math.fsum(y),
+            math.fsum(a * b for a, b in self.pairs),
+            math.fsum(b * b for b in y),
+        ]
+        self._updates = 0
+
+
+class SymbolState:
+    """Drawdown and rolling statistics of one symbol, persisted as one AnalyticsState."""
+
+    def __init__(self, drawdown=None, rolling=None, window=252):
+        self.drawdown = drawdown or DrawdownState()
+        self.rolling = rolling or RollingStatsState(window)
+
+    def update(self, close):
+        self.drawdown.update(close)
+        self.rolling.update(close)
+
+    def values(self):
+        """Current analytics of the symbol."""
+        returns = self.rolling.returns
+        return {
+            "daily_return": returns[-1] if returns else None,
+            "drawdown": self.drawdown.drawdown,
+            "peak": self.drawdown.peak,
+            "rolling_return": self.rolling.rolling_return,
+            "rolling_volatility": self.rolling.volatility,
+        }
+
+    def to_dict(self):
+        return {"drawdown": self.drawdown.to_dict(), "rolling": self.rolling.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            DrawdownState.from_dict(data["drawdown"]),
+            RollingStatsState.from_dict(data["rolling"]),
+        )
+
+
+def pair_key(symbol, benchmark):
+    """AnalyticsState key of the rolling beta of symbol against benchmark."""
+    return f"{symbol}|{benchmark}"
+
+
+def update_analytics_state(symbols, benchmarks=(), window=252, beta_window=252):
+    """
+    Advance the persisted analytics state of symbols with their new closes.
+
+    Only closes after the last date of a state are read and applied, so calling it
+    after every daily load costs O(1) per symbol. A symbol without a state is
+    replayed once from its full history. Applying the same dates twice is a no-op.
+    The new dates of symbols that already had a state are also appended to the
+    SymbolAnalytics table (build_analytics fills it for the full history).
+
+    Parameters:
+    symbols (list of str): Symbols to update.
+    benchmarks (list of str): Benchmarks to keep a rolling beta against.
+    window (int): Window of the rolling return and volatility in trading days.
+    beta_window (int): Window of the rolling betas in joint trading days.
+
+    Returns:
+    int: Number of states that changed.
+    """
+    symbols = sorted(set(symbols) | set(benchmarks))
+    if not symbols:
+        return 0
+    keys = {symbol: symbol for symbol in symbols}
+    for symbol in symbols:
+        for benchmark in benchmarks:
+            if symbol != benchmark:
+                keys[(symbol, benchmark)] = pair_key(symbol, benchmark)
+
+    stored = AnalyticsState.objects.in_bulk(list(keys.values()), field_name="key")
+
+    # Read everything after the oldest state in one query (all history for new ones)
+    queryset = Performance.objects.filter(symbol__in=symbols)
+    if len(stored) == len(keys):
+        oldest = min(state.trade_date for state in stored.values())
+        queryset = queryset.filter(trade_date__gt=oldest)
+    closes = read_closes(queryset) if queryset.exists() else pd.DataFrame()
+
+    changed = []
+    analytics = []
+    for name, key in keys.items():
+        record = stored.get(key)
+        if isinstance(name, tuple):
+            prices = closes.reindex(columns=list(name)).dropna()
+            state = (
+                RollingBetaState.from_dict(record.state)
+                if record
+                else RollingBetaState(beta_window)
+            )
+        else:
+            prices = closes.reindex(columns=[name]).dropna()
+            state = (
+                SymbolState.from_dict(record.state)
+                if record
+                else SymbolState(window=window)
+            )
+
+        if record is not None:
+            prices = prices[prices.index > pd.Timestamp(record.trade_date)]
+        if prices.empty:
+            continue
+
+        materialize = record is not None and isinstance(state, SymbolState)
+        for date, row in zip(prices.index.date, prices.to_numpy(dtype=float).tolist()):
+            state.update(*row)
+            if materialize:
+                analytics.append(
+                    SymbolAnalytics(symbol=name, trade_date=date, **state.values())
+                )
+
+        record = record or AnalyticsState(key=key)
+        record.trade_date = prices.index[-1].date()
+        record.state = state.to_dict()
+        changed.append(record)
+
+    AnalyticsState.objects.bulk_create(
+        changed,
+        update_conflicts=True,
+        unique_fields=["key"],
+        update_fields=["trade_date", "state"],
+    )
+    SymbolAnalytics.objects.bulk_create(
+        analytics,
+        update_conflicts=True,
+        unique_fields=["symbol", "trade_date"],
+        update_fields=ANALYTICS_COLUMNS,
+    )
+    return len(changed)
+
+
+def load_state(key):
+    """Return the SymbolState or RollingBetaState stored under key (None if missing)."""
+    record = AnalyticsState.objects.filter(key=key).first()
+    if record is None:
+        return None
+    if "|" in key:
+        return RollingBetaState.from_dict(record.state)
+    return SymbolState.from_dict(record.state)
@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from scores.analytics import symbol_analytics, to_models
+from scores.models import DataVersion, Performance, SymbolAnalytics
+from scores.price_store import read_closes
+from scores.signals import ANALYTICS_DATA, PERFORMANCE_DATA
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized per-symbol analytics from the Performance table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--symbol",
+            action="append",
+            default=[],
+            help="Only rebuild this symbol (repeatable, all symbols by default). "
+            "Only a full rebuild makes a stale table current again",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=200,
+            help="Number of symbols computed at once",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of rows per INSERT",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        # Read before the prices, a write during the build leaves the table stale
+        version = DataVersion.current(PERFORMANCE_DATA)
+        symbols = options["symbol"] or list(
+            Performance.objects.order_by("symbol")
+            .values_list("symbol", flat=True)
+            .distinct()
+        )
+
+        n_rows = 0
+        chunk_size = options["chunk_size"]
+        for i in range(0, len(symbols), chunk_size):
+            chunk = symbols[i : i + chunk_size]
+            closes = read_closes(Performance.objects.filter(symbol__in=chunk))
+            objects = to_models(symbol_analytics(closes))
+
+            # Swap the rows of the chunk in one transaction
+            with transaction.atomic():
+                SymbolAnalytics.objects.filter(symbol__in=chunk).delete()
+                SymbolAnalytics.objects.bulk_create(
+                    objects, batch_size=options["batch_size"]
+                )
+            n_rows += len(objects)
+            self.stdout.write(f"{i + len(chunk)}/{len(symbols)} symbols")
+
+        if not options["symbol"]:
+            DataVersion.record(ANALYTICS_DATA, version)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Built {n_rows} rows for {len(symbols)} symbols in {elapsed:.1f}s"
+            )
+        )
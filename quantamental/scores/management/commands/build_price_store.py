@@ -0,0 +1,73 @@
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+from scores.models import DataVersion, Performance
+from scores.price_store import PriceStore, read_closes
+from scores.signals import PERFORMANCE_DATA
+
+
+class Command(BaseCommand):
+    help = "Rebuild or append to the columnar price store from the Performance table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--append",
+            action="store_true",
+            help="Only append dates newer than the last stored date (rebuild after "
+            "prices of stored dates changed)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of symbols read from the database at once",
+        )
+        parser.add_argument(
+            "--directory", type=str, default=None, help="Override PRICE_STORE_DIR"
+        )
+
+    def handle(self, *args, **options):
+        store = PriceStore(options["directory"])
+        start = time.perf_counter()
+        # Read before the prices, a write during the build leaves the store stale
+        version = DataVersion.current(PERFORMANCE_DATA)
+
+        if options["append"] and store.exists():
+            n_dates = self.append(store, version)
+            message = f"Appended {n_dates} dates"
+        else:
+            self.rebuild(store, options["chunk_size"], version)
+            message = f"Rebuilt store with {len(store.dates)} dates"
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{message} for {len(store.symbols)} symbols in {elapsed:.1f}s "
+                f"({store.directory})"
+            )
+        )
+
+    def rebuild(self, store, chunk_size, version):
+        symbols = list(
+            Performance.objects.order_by("symbol")
+            .values_list("symbol", flat=True)
+            .distinct()
+        )
+        dates = pd.to_datetime(
+            list(Performance.objects.values_list("trade_date", flat=True).distinct())
+        )
+
+        def chunks():
+            for i in range(0, len(symbols), chunk_size):
+                queryset = Performance.objects.filter(
+                    symbol__in=symbols[i : i + chunk_size]
+                )
+                yield read_closes(queryset)
+
+        store.write(dates, chunks(), version)
+
+    def append(self, store, version):
+        last_date = pd.Timestamp(store.dates[-1]).date()
+        frame = read_closes(Performance.objects.filter(trade_date__gt=last_date))
+        return store.append(frame, version)
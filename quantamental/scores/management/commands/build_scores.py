@@ -0,0 +1,155 @@
+import time
+from datetime import datetime
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Max
+import pandas as pd
+from scores.models import (
+    DataVersion,
+    FactorScore,
+    Identification,
+    Performance,
+    Qualdata,
+)
+from scores.price_store import read_closes
+from scores.screener import match_codes
+from scores.scoring import (
+    has_recent_close,
+    price_factors,
+    score_dates,
+    score_history,
+    score_models,
+)
+from scores.signals import SCORES_DATA
+
+
+class Command(BaseCommand):
+    help = "Rebuild the monthly factor score history of the Identification universe"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="Rescore the dates from this date on (yyyy-mm-dd). By default the "
+            "dates from the latest stored date on, so a scheduled run (e.g. daily from "
+            "cron) rescores the current month and adds new ones",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rebuild the whole history",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=200,
+            help="Number of symbols whose prices are read at once",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of rows per INSERT",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options["full"]:
+            since = None
+        elif options["since"]:
+            try:
+                since = datetime.strptime(options["since"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--since must be a yyyy-mm-dd date")
+        else:
+            since = FactorScore.objects.aggregate(Max("score_date"))["score_date__max"]
+
+        # Universe: every Identification code with its GIC sector
+        sectors = {}
+        for row in Identification.objects.order_by("pk").values(
+            "code", gicSector=F("sector__gicSector")
+        ):
+            if row["code"] and row["code"] not in sectors:
+                sector = row["gicSector"]
+                sectors[row["code"]] = sector if sector and sector != "NA" else None
+        codes = list(sectors)
+
+        # Price and Qualdata symbols of the universe
+        symbols = list(
+            Performance.objects.order_by("symbol")
+            .values_list("symbol", flat=True)
+            .distinct()
+        )
+        matches = {
+            symbol: code
+            for symbol, code in match_codes(codes, symbols).items()
+            if code in sectors
+        }
+        dates = score_dates(
+            Performance.objects.order_by("trade_date")
+            .values_list("trade_date", flat=True)
+            .distinct()
+        )
+
+        factors = {"momentum": [], "low_volatility": [], "quality": []}
+        listed = []
+        priced = list(matches)
+        chunk_size = options["chunk_size"]
+        for i in range(0, len(priced), chunk_size):
+            chunk = priced[i : i + chunk_size]
+            closes = read_closes(Performance.objects.filter(symbol__in=chunk))
+            for factor, frame in price_factors(closes, dates).items():
+                factors[factor].append(frame.rename(columns=matches))
+            listed.append(has_recent_close(closes, dates).rename(columns=matches))
+            self.stdout.write(f"{i + len(chunk)}/{len(priced)} symbols")
+
+        # Qualdata has no history, the current dividend yield is used on every date
+        fundamentals = Qualdata.objects.values_list("ticker", "dividendYield")
+        fundamentals = {ticker: dy for ticker, dy in fundamentals if ticker}
+        tickers = match_codes(codes, fundamentals)
+        value = pd.Series(
+            {
+                tickers[ticker]: dividend_yield
+                for ticker, dividend_yield in fundamentals.items()
+                if tickers[ticker] in sectors
+            },
+            dtype=float,
+        )
+
+        frames = {
+            factor: (
+                pd.concat(parts, axis=1) if parts else pd.DataFrame(index=dates)
+            ).reindex(index=dates, columns=codes)
+            for factor, parts in factors.items()
+        }
+        # Only on the dates a name has a recent close, as the price factors
+        listed = (
+            pd.concat(listed, axis=1) if listed else pd.DataFrame(index=dates)
+        ).reindex(index=dates, columns=codes, fill_value=False)
+        frames["value"] = pd.DataFrame(
+            [value.reindex(codes).to_numpy()] * len(dates), index=dates, columns=codes
+        ).where(listed)
+
+        scores = score_history(frames, sectors)
+        objects = score_models(scores, sectors, since)
+
+        # Swap the rescored dates in one transaction
+        with transaction.atomic():
+            stale = FactorScore.objects.all()
+            if since is not None:
+                stale = stale.filter(score_date__gte=since)
+            stale.delete()
+            n_rows = 0
+            while batch := list(islice(objects, options["batch_size"])):
+                FactorScore.objects.bulk_create(batch)
+                n_rows += len(batch)
+            DataVersion.bump(SCORES_DATA)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stored {n_rows} scores on {len(dates)} dates for "
+                f"{len(codes)} symbols in {elapsed:.1f}s"
+            )
+        )
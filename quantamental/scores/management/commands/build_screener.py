@@ -0,0 +1,82 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+import pandas as pd
+from scores.models import (
+    DataVersion,
+    Identification,
+    Performance,
+    Qualdata,
+    ScreenerFactor,
+)
+from scores.price_store import read_closes
+from scores.screener import (
+    FUNDAMENTAL_FIELDS,
+    GIC_FIELDS,
+    price_factors,
+    screener_rows,
+    to_models,
+)
+from scores.signals import SCREENER_DATA
+
+
+class Command(BaseCommand):
+    help = "Rebuild the screener table from the reference data and the prices"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=200,
+            help="Number of symbols whose prices are read at once",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of rows per INSERT",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        symbols = list(
+            Performance.objects.order_by("symbol")
+            .values_list("symbol", flat=True)
+            .distinct()
+        )
+
+        factors = []
+        chunk_size = options["chunk_size"]
+        for i in range(0, len(symbols), chunk_size):
+            chunk = symbols[i : i + chunk_size]
+            factors.append(
+                price_factors(read_closes(Performance.objects.filter(symbol__in=chunk)))
+            )
+            self.stdout.write(f"{i + len(chunk)}/{len(symbols)} symbols")
+
+        rows = screener_rows(
+            Identification.objects.order_by("pk").values(
+                "code",
+                "name",
+                **{field: F(f"sector__{field}") for field in GIC_FIELDS},
+            ),
+            Qualdata.objects.order_by("pk").values(
+                "ticker", "name", *FUNDAMENTAL_FIELDS
+            ),
+            pd.concat(factors) if factors else price_factors(pd.DataFrame()),
+        )
+
+        # Swap the whole table in one transaction
+        with transaction.atomic():
+            ScreenerFactor.objects.all().delete()
+            ScreenerFactor.objects.bulk_create(
+                to_models(rows), batch_size=options["batch_size"]
+            )
+            DataVersion.bump(SCREENER_DATA)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(f"Built {len(rows)} screener rows in {elapsed:.1f}s")
+        )
@@ -0,0 +1,216 @@
+import csv
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import chain, islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from scores.incremental import update_analytics_state
+from scores.models import DataVersion, Performance
+from scores.signals import ANALYTICS_DATA, PERFORMANCE_DATA
+
+# Date formats tried on the first rows when --date-format is not given
+DATE_FORMATS = ["%d.%m.%Y", "%m/%d/%Y", "%Y-%m-%d", "%d/%m/%Y"]
+DATE_SAMPLE_ROWS = 1000
+
+
+class Command(BaseCommand):
+    help = "Load close prices from CSV files into the Performance table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("files", nargs="+", type=str, help="CSV files to load")
+        parser.add_argument(
+            "--delimiter",
+            type=str,
+            default=None,
+            help="Field delimiter (detected from the header by default)",
+        )
+        parser.add_argument(
+            "--date-format",
+            type=str,
+            default=None,
+            help="strptime format of the dates (detected from the first rows by "
+            "default)",
+        )
+        parser.add_argument("--symbol-column", type=str, default="symbol")
+        parser.add_argument("--date-column", type=str, default="date")
+        parser.add_argument("--close-column", type=str, default="close")
+        parser.add_argument(
+            "--on-conflict",
+            choices=["skip", "update"],
+            default="skip",
+            help="Keep (skip) or overwrite (update) prices that already exist",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only load dates newer than the latest stored date of each symbol "
+            "and advance the incremental analytics state",
+        )
+        parser.add_argument(
+            "--benchmark",
+            action="append",
+            default=[],
+            help="Keep an incremental rolling beta against this symbol (repeatable)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of rows per INSERT",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count_before = Performance.objects.count()
+
+        # Latest stored date of every symbol, older rows are skipped in incremental mode
+        self.latest = {}
+        if options["incremental"]:
+            self.latest = dict(
+                Performance.objects.values_list("symbol").annotate(Max("trade_date"))
+            )
+        self.symbols = set()
+        # Whether SymbolAnalytics was built from the prices before this load
+        analytics_current = DataVersion.current(ANALYTICS_DATA) == DataVersion.current(
+            PERFORMANCE_DATA
+        )
+
+        n_rows = 0
+        with transaction.atomic():
+            for path in options["files"]:
+                loaded = self.load(path, options)
+                self.stdout.write(f"{path}: {loaded} rows")
+                n_rows += loaded
+
+        # Bulk inserts skip the post_save signal, invalidate the caches here
+        version = DataVersion.bump(PERFORMANCE_DATA)
+
+        elapsed = time.perf_counter() - start
+        inserted = Performance.objects.count() - count_before
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Read {n_rows} rows ({inserted} new) in {elapsed:.1f}s "
+                f"({n_rows / max(elapsed, 1e-9):,.0f} rows/s)"
+            )
+        )
+
+        if options["incremental"]:
+            start = time.perf_counter()
+            changed = update_analytics_state(self.symbols, options["benchmark"])
+            # The new dates were appended to SymbolAnalytics (symbols without
+            # rows are missing there and computed by the views)
+            if analytics_current:
+                DataVersion.record(ANALYTICS_DATA, version)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Updated {changed} analytics states in {elapsed:.1f}s"
+                )
+            )
+
+    def load(self, path, options):
+        """Stream one CSV file into the Performance table in batches."""
+        if options["on_conflict"] == "update":
+            conflict = {
+                "update_conflicts": True,
+                "unique_fields": ["symbol", "trade_date"],
+                "update_fields": ["date", "close"],
+            }
+        else:
+            conflict = {"ignore_conflicts": True}
+
+        n_rows = 0
+        for batch in self.read(path, options):
+            Performance.objects.bulk_create(batch, **conflict)
+            n_rows += len(batch)
+        return n_rows
+
+    def read(self, path, options):
+        """Yield lists of unsaved Performance objects of at most --batch-size rows."""
+        with open(path, "r", newline="", encoding="utf-8-sig") as file:
+            header = file.readline()
+            delimiter = options["delimiter"] or self.sniff_delimiter(header)
+            columns = [
+                column.strip().lower()
+                for column in next(csv.reader([header], delimiter=delimiter))
+            ]
+            try:
+                symbol_index, date_index, close_index = [
+                    columns.index(options[name].lower())
+                    for name in ["symbol_column", "date_column", "close_column"]
+                ]
+            except ValueError:
+                raise CommandError(f"{path}: missing column, header is {columns}")
+
+            reader = csv.reader(file, delimiter=delimiter)
+            date_format = options["date_format"]
+            if date_format is None:
+                sample = list(islice(reader, DATE_SAMPLE_ROWS))
+                values = [row[date_index] for row in sample if len(row) > date_index]
+                if values:
+                    date_format = self.detect_date_format(values)
+                reader = chain(sample, reader)
+
+            batch = []
+            for line, row in enumerate(reader, 2):
+                if not row:
+                    continue
+                try:
+                    trade_date = datetime.strptime(
+                        row[date_index].strip(), date_format
+                    ).date()
+                    close = Decimal(row[close_index].strip())
+                except (ValueError, IndexError, InvalidOperation):
+                    raise CommandError(f"{path}, line {line}: cannot parse {row}")
+
+                symbol = row[symbol_index].strip()
+                latest = self.latest.get(symbol)
+                if latest is not None and trade_date <= latest:
+                    continue
+                self.symbols.add(symbol)
+
+                batch.append(
+                    Performance(
+                        symbol=symbol,
+                        date=trade_date.strftime("%d.%m.%Y"),
+                        trade_date=trade_date,
+                        close=close,
+                    )
+                )
+                if len(batch) >= options["batch_size"]:
+                    yield batch
+                    batch = []
+
+            if batch:
+                yield batch
+
+    @staticmethod
+    def sniff_delimiter(header):
+        try:
+            return csv.Sniffer().sniff(header, delimiters=",;\t|").delimiter
+        except csv.Error:
+            return ","
+
+    @staticmethod
+    def detect_date_format(values):
+        """The one DATE_FORMATS entry that parses every sampled date."""
+
+        def parses(date_format):
+            try:
+                for value in values:
+                    datetime.strptime(value.strip(), date_format)
+            except ValueError:
+                return False
+            return True
+
+        matches = [date_format for date_format in DATE_FORMATS if parses(date_format)]
+        if not matches:
+            raise CommandError(f"Unknown date format: {values[0]}, use --date-format")
+        if len(matches) > 1:
+            raise CommandError(
+                f"Ambiguous date format ({' or '.join(matches)}), use --date-format"
+            )
+        return matches[0]
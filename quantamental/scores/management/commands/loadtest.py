@@ -0,0 +1,127 @@
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Send concurrent GET requests to running servers and report the throughput "
+        "and latencies, e.g. to compare the WSGI and the ASGI (/async/) endpoints"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="+", type=str, help="URLs to load test")
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=16,
+            help="Number of simultaneous clients",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Number of requests per URL",
+        )
+        parser.add_argument(
+            "--user",
+            type=str,
+            default=None,
+            help="Create a session for this user (the servers must share the database)",
+        )
+        parser.add_argument(
+            "--session",
+            type=str,
+            default=None,
+            help="Existing session cookie value",
+        )
+        parser.add_argument("--timeout", type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        session = options["session"]
+        if options["user"]:
+            session = self.create_session(options["user"])
+        headers = {}
+        if session:
+            headers["Cookie"] = f"{settings.SESSION_COOKIE_NAME}={session}"
+
+        for url in options["urls"]:
+            self.run(url, headers, options)
+
+    def create_session(self, username):
+        try:
+            user = get_user_model().objects.get(username=username)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"Unknown user: {username}")
+
+        store = SessionStore()
+        store[SESSION_KEY] = str(user.pk)
+        store[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        store.create()
+        return store.session_key
+
+    def run(self, url, headers, options):
+        latencies = []
+        errors = []
+        n_bytes = [0]
+        lock = threading.Lock()
+
+        def fetch(_):
+            request = urllib.request.Request(url, headers=headers)
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=options["timeout"]) as r:
+                    body = r.read()
+                    # Login redirects would otherwise count as fast successes
+                    if r.url != url:
+                        raise urllib.error.URLError(f"redirected to {r.url}")
+            except (urllib.error.URLError, OSError) as e:
+                with lock:
+                    errors.append(str(e))
+                return
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                n_bytes[0] += len(body)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            list(pool.map(fetch, range(options["requests"])))
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(url)
+        if errors:
+            self.stdout.write(
+                self.style.WARNING(f"  {len(errors)} errors, first: {errors[0]}")
+            )
+        if not latencies:
+            return
+
+        latencies.sort()
+        self.stdout.write(
+            f"  {len(latencies)} requests in {elapsed:.2f}s, "
+            f"{len(latencies) / elapsed:.1f} req/s, "
+            f"{n_bytes[0] / len(latencies) / 1024:.0f} KiB/response"
+        )
+        self.stdout.write(
+            f"  latency ms: mean {statistics.fmean(latencies) * 1000:.0f}, "
+            f"p50 {_percentile(latencies, 50) * 1000:.0f}, "
+            f"p90 {_percentile(latencies, 90) * 1000:.0f}, "
+            f"p99 {_percentile(latencies, 99) * 1000:.0f}, "
+            f"max {latencies[-1] * 1000:.0f}"
+        )
+
+
+def _percentile(values, q):
+    """Nearest rank percentile of sorted values."""
+    return values[min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))]
@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from scores.benchmarks import (
+    BENCHMARK_SYMBOLS,
+    BENCHMARK_YEARS,
+    BENCHMARKS,
+    MAX_CELLS,
+    REGRESSION_THRESHOLD,
+    baseline_run,
+    compare,
+    load_history,
+    make_run,
+    run_benchmarks,
+    save_run,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the analytics on synthetic price panels, record the run in the "
+        "benchmark history and flag regressions against a baseline run"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--symbols", type=int, nargs="+", default=BENCHMARK_SYMBOLS)
+        parser.add_argument("--years", type=int, nargs="+", default=BENCHMARK_YEARS)
+        parser.add_argument(
+            "--benchmark",
+            choices=BENCHMARKS,
+            action="append",
+            default=[],
+            help="Only run this benchmark (repeatable, all by default)",
+        )
+        parser.add_argument("--repeat", type=int, default=3, help="Calls per case")
+        parser.add_argument(
+            "--max-cells",
+            type=int,
+            default=MAX_CELLS,
+            help="Skip cases with more prices (symbols x trading days)",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--history",
+            type=str,
+            default=str(getattr(settings, "BENCHMARK_HISTORY", "benchmarks.json")),
+            help="JSON file of the recorded runs",
+        )
+        parser.add_argument(
+            "--label", type=str, default=None, help="Label of this run, e.g. baseline"
+        )
+        parser.add_argument(
+            "--baseline",
+            type=str,
+            default=None,
+            help="Compare with the latest run with this label (latest run by default)",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=REGRESSION_THRESHOLD,
+            help="Relative slowdown that counts as a regression",
+        )
+        parser.add_argument(
+            "--no-save", action="store_true", help="Do not record this run"
+        )
+        parser.add_argument(
+            "--fail-on-regression",
+            action="store_true",
+            help="Exit with an error if a case regressed",
+        )
+
+    def handle(self, *args, **options):
+        history = load_history(options["history"])
+        baseline = baseline_run(history, options["baseline"])
+        if options["baseline"] and baseline is None:
+            raise CommandError(f"No run labelled {options['baseline']}")
+
+        results = run_benchmarks(
+            symbols=options["symbols"],
+            years=options["years"],
+            names=options["benchmark"] or BENCHMARKS,
+            repeat=options["repeat"],
+            max_cells=options["max_cells"],
+            seed=options["seed"],
+            progress=self.report,
+        )
+
+        regressions = []
+        if baseline is not None:
+            comparison = compare(results, baseline, options["threshold"])
+            self.stdout.write(f"\nCompared with the run of {baseline['timestamp']}")
+            for key, entry in comparison.items():
+                line = (
+                    f"{key:<50} {results[key]['min'] * 1000:>10.1f} ms "
+                    f"{entry['baseline'] * 1000:>10.1f} ms {entry['change']:>+8.1%}"
+                )
+                if entry["regression"]:
+                    regressions.append(key)
+                    self.stdout.write(self.style.ERROR(line + "  REGRESSION"))
+                else:
+                    self.stdout.write(line)
+
+        if not options["no_save"]:
+            save_run(options["history"], make_run(results, options["label"]))
+            self.stdout.write(f"Recorded the run in {options['history']}")
+
+        if regressions:
+            message = f"{len(regressions)} regressions: {', '.join(regressions)}"
+            if options["fail_on_regression"]:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS("No regressions"))
+
+    def report(self, key, result):
+        if "skipped" in result:
+            self.stdout.write(f"{key:<50} skipped ({result['skipped']})")
+        else:
+            self.stdout.write(
+                f"{key:<50} {result['min'] * 1000:>10.1f} ms "
+                f"(median {result['median'] * 1000:.1f} ms)"
+            )
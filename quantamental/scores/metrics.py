@@ -0,0 +1,183 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = [
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+]
+
+# Content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Stage timings of the current request, set by TimingMiddleware (None outside requests)
+_request_timings = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """
+    Seconds spent in the named stages of one request.
+
+    Stages recorded several times in a request (e.g. two pivots) are added up.
+    Worker threads of async views record into the same object, so adding is
+    locked.
+    """
+
+    def __init__(self):
+        self.durations = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+
+@contextmanager
+def collect_timings():
+    """Collect the timings recorded in the block (one request) in a RequestTimings."""
+    timings = RequestTimings()
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def record(name, seconds):
+    """Add the duration of a stage to the timings of the current request, if any."""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def timed(name):
+    """
+    Time a block, or every call of a decorated function, as a stage of the request.
+
+    Outside a request (management commands, benchmarks) and on threads that do
+    not share the request context (the analytics executor pool, whose stages are
+    recorded by run_stages instead) nothing is recorded.
+
+    Parameters:
+    name (str): Stage name in the Server-Timing header and the metrics.
+    """
+    if _request_timings.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def server_timing(durations, total):
+    """Server-Timing header value of stage durations and the total (milliseconds)."""
+    entries = [
+        f"{name};dur={seconds * 1000:.1f}" for name, seconds in durations.items()
+    ]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+# ! HISTOGRAMS ----------------------------------------------------------------------
+
+
+class Histogram:
+    """
+    Prometheus histogram with labels, kept in the memory of the process.
+
+    Every process of a multi-process server (gunicorn workers) has its own
+    histograms, so the metrics endpoint reports the process that answers it.
+    """
+
+    def __init__(self, name, documentation, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = list(buckets)
+        # {label values: [cumulative bucket counts..., count, sum]}
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = [0] * (len(self.buckets) + 1) + [0.0]
+                self._series[label_values] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def collect(self):
+        """Lines of the histogram in the Prometheus text format."""
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for label_values, values in sorted(series.items()):
+            labels = [
+                f'{label}="{_escape(value)}"'
+                for label, value in zip(self.labels, label_values)
+            ]
+            for bound, count in zip(self.buckets, values):
+                le = ",".join([*labels, f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{le}}} {count}")
+            le = ",".join([*labels, 'le="+Inf"'])
+            lines.append(f"{self.name}_bucket{{{le}}} {values[-2]}")
+            lines.append(f"{self.name}_sum{{{','.join(labels)}}} {values[-1]!r}")
+            lines.append(f"{self.name}_count{{{','.join(labels)}}} {values[-2]}")
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    "quantamental_request_duration_seconds",
+    "Time until the response of a request is ready, per endpoint (URL name).",
+    ["endpoint", "method", "status"],
+)
+STAGE_DURATION = Histogram(
+    "quantamental_stage_duration_seconds",
+    "Time spent in a stage of a request, per endpoint (URL name) and stage.",
+    ["endpoint", "stage"],
+)
+HISTOGRAMS = [REQUEST_DURATION, STAGE_DURATION]
+
+
+def observe_request(endpoint, method, status, total, durations):
+    """Add a finished request and its stage durations to the histograms."""
+    REQUEST_DURATION.observe((endpoint, method, str(status)), total)
+    for name, seconds in durations.items():
+        STAGE_DURATION.observe((endpoint, name), seconds)
+
+
+def render_metrics():
+    """All histograms in the Prometheus text exposition format."""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.collect())
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,57 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .metrics import collect_timings, observe_request, server_timing
+
+# Endpoint label of requests that match no URL pattern (keeps the labels bounded)
+UNMATCHED_ENDPOINT = "unmatched"
+
+# Method label of the requests, any other method is counted as "OTHER"
+METHODS = ["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
+
+
+class TimingMiddleware:
+    """
+    Time every request and the stages recorded during it (scores/metrics.py).
+
+    The stage durations and the total are sent in a Server-Timing header and
+    added to the latency histograms of the metrics endpoint, labelled with the
+    URL name of the view. The total ends when the response is ready, the body of
+    a streamed response is produced afterwards. Put it first in MIDDLEWARE so that
+    the total includes the other middleware. Works under WSGI and ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        start = time.perf_counter()
+        with collect_timings() as timings:
+            response = self.get_response(request)
+        return self.finish(request, response, timings, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with collect_timings() as timings:
+            response = await self.get_response(request)
+        return self.finish(request, response, timings, time.perf_counter() - start)
+
+    def finish(self, request, response, timings, total):
+        match = request.resolver_match
+        endpoint = match.view_name if match is not None else UNMATCHED_ENDPOINT
+        method = request.method if request.method in METHODS else "OTHER"
+        observe_request(
+            endpoint, method, response.status_code, total, timings.durations
+        )
+        response["Server-Timing"] = server_timing(timings.durations, total)
+        return response
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.14 on 2026-10-18 18:50
+
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import Cast, Concat, Substr
+
+
+def fill_trade_date(apps, schema_editor):
+    # dd.mm.yyyy -> yyyy-mm-dd in a single UPDATE instead of parsing row by row
+    Performance = apps.get_model("scores", "Performance")
+    Performance.objects.update(
+        trade_date=Cast(
+            Concat(
+                Substr("date", 7, 4),
+                Value("-"),
+                Substr("date", 4, 2),
+                Value("-"),
+                Substr("date", 1, 2),
+            ),
+            models.DateField(),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("scores", "0010_performance"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="performance",
+            name="trade_date",
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(fill_trade_date, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="performance",
+            index=models.Index(
+                fields=["symbol", "trade_date"], name="performance_symbol_date"
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scores", "0011_performance_trade_date"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DataVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50, unique=True)),
+                ("version", models.PositiveBigIntegerField(default=0)),
+                ("updated", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:03
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicates(apps, schema_editor):
+    # Keep the most recently inserted price of every (symbol, trade_date) pair
+    Performance = apps.get_model("scores", "Performance")
+    keep = (
+        Performance.objects.values("symbol", "trade_date")
+        .annotate(keep_id=Max("id"))
+        .values("keep_id")
+    )
+    Performance.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scores", "0012_dataversion"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name="performance",
+            name="performance_symbol_date",
+        ),
+        migrations.AddConstraint(
+            model_name="performance",
+            constraint=models.UniqueConstraint(
+                fields=("symbol", "trade_date"), name="performance_symbol_date_unique"
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scores", "0013_performance_unique_symbol_date"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnalyticsState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=50, unique=True)),
+                ("trade_date", models.DateField()),
+                ("state", models.JSONField()),
+            ],
+        ),
+    ]
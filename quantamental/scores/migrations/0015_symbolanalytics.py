@@ -0,0 +1,40 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scores", "0014_analyticsstate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SymbolAnalytics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("symbol", models.CharField(max_length=10)),
+                ("trade_date", models.DateField()),
+                ("daily_return", models.FloatField(null=True)),
+                ("rolling_return", models.FloatField(null=True)),
+                ("rolling_volatility", models.FloatField(null=True)),
+                ("drawdown", models.FloatField(null=True)),
+                ("peak", models.FloatField(null=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="symbolanalytics",
+            constraint=models.UniqueConstraint(
+                fields=("symbol", "trade_date"), name="symbolanalytics_symbol_date"
+            ),
+        ),
+    ]
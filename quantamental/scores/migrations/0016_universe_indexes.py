@@ -0,0 +1,38 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scores", "0015_symbolanalytics"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="identification",
+            name="code",
+            field=models.CharField(db_index=True, max_length=200, null=True),
+        ),
+        migrations.AlterField(
+            model_name="sector",
+            name="gicGroup",
+            field=models.CharField(db_index=True, max_length=200, null=True),
+        ),
+        migrations.AlterField(
+            model_name="sector",
+            name="gicIndustry",
+            field=models.CharField(db_index=True, max_length=200, null=True),
+        ),
+        migrations.AlterField(
+            model_name="sector",
+            name="gicSector",
+            field=models.CharField(db_index=True, max_length=200, null=True),
+        ),
+        migrations.AlterField(
+            model_name="sector",
+            name="gicSubIndustry",
+            field=models.CharField(db_index=True, max_length=200, null=True),
+        ),
+    ]
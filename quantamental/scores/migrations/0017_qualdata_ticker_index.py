@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scores", "0016_universe_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="qualdata",
+            name="ticker",
+            field=models.CharField(db_index=True, max_length=200, null=True),
+        ),
+    ]
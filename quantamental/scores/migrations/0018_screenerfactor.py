@@ -0,0 +1,60 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scores", "0017_qualdata_ticker_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScreenerFactor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("symbol", models.CharField(max_length=200, unique=True)),
+                ("name", models.CharField(db_index=True, max_length=200, null=True)),
+                (
+                    "gicSector",
+                    models.CharField(db_index=True, max_length=200, null=True),
+                ),
+                (
+                    "gicGroup",
+                    models.CharField(db_index=True, max_length=200, null=True),
+                ),
+                (
+                    "gicIndustry",
+                    models.CharField(db_index=True, max_length=200, null=True),
+                ),
+                (
+                    "gicSubIndustry",
+                    models.CharField(db_index=True, max_length=200, null=True),
+                ),
+                ("beta", models.FloatField(db_index=True, null=True)),
+                ("mcap", models.FloatField(db_index=True, null=True)),
+                ("dividendYield", models.FloatField(db_index=True, null=True)),
+                ("trade_date", models.DateField(null=True)),
+                ("return_1m", models.FloatField(db_index=True, null=True)),
+                ("return_3m", models.FloatField(db_index=True, null=True)),
+                ("return_6m", models.FloatField(db_index=True, null=True)),
+                ("return_1y", models.FloatField(db_index=True, null=True)),
+                ("return_3y", models.FloatField(db_index=True, null=True)),
+                ("volatility_3m", models.FloatField(db_index=True, null=True)),
+                ("volatility_1y", models.FloatField(db_index=True, null=True)),
+                ("volatility_3y", models.FloatField(db_index=True, null=True)),
+                ("max_drawdown_1y", models.FloatField(db_index=True, null=True)),
+                ("max_drawdown_3y", models.FloatField(db_index=True, null=True)),
+                ("drawdown", models.FloatField(db_index=True, null=True)),
+            ],
+        ),
+    ]
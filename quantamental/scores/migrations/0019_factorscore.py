@@ -0,0 +1,49 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scores", "0018_screenerfactor"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FactorScore",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("symbol", models.CharField(max_length=200)),
+                ("score_date", models.DateField()),
+                ("gicSector", models.CharField(max_length=200, null=True)),
+                ("momentum", models.FloatField(null=True)),
+                ("low_volatility", models.FloatField(null=True)),
+                ("value", models.FloatField(null=True)),
+                ("quality", models.FloatField(null=True)),
+                ("composite", models.FloatField()),
+                ("rank", models.PositiveIntegerField()),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["score_date", "rank"], name="factorscore_date_rank"
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="factorscore",
+            constraint=models.UniqueConstraint(
+                fields=("symbol", "score_date"), name="factorscore_symbol_date"
+            ),
+        ),
+    ]
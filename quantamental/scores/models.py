@@ -1,12 +1,14 @@
 # Create your models here.
 import csv
+from datetime import datetime
 
 from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
 
 
 class Identification(models.Model):
-    code = models.CharField(max_length=200, null=True)
+    code = models.CharField(max_length=200, null=True, db_index=True)
     name = models.CharField(max_length=200, null=True)
     isin = models.CharField(max_length=200, null=True)
 
@@ -18,17 +20,17 @@ class Sector(models.Model):
     code = models.ForeignKey(Identification, null=True, on_delete=models.CASCADE)
     sector = models.CharField(max_length=200, null=True)
     industry = models.CharField(max_length=200, null=True)
-    gicSector = models.CharField(max_length=200, null=True)
-    gicGroup = models.CharField(max_length=200, null=True)
-    gicIndustry = models.CharField(max_length=200, null=True)
-    gicSubIndustry = models.CharField(max_length=200, null=True)
+    gicSector = models.CharField(max_length=200, null=True, db_index=True)
+    gicGroup = models.CharField(max_length=200, null=True, db_index=True)
+    gicIndustry = models.CharField(max_length=200, null=True, db_index=True)
+    gicSubIndustry = models.CharField(max_length=200, null=True, db_index=True)
 
     def __str__(self):
         return self.code.code
 
 
 class Qualdata(models.Model):
-    ticker = models.CharField(max_length=200, null=True)
+    ticker = models.CharField(max_length=200, null=True, db_index=True)
     name = models.CharField(max_length=200, null=True)
     description = models.CharField(max_length=500, null=True)
     exchange = models.CharField(max_length=200, null=True)
@@ -95,8 +97,151 @@ class Order(models.Model):
 
 class Performance(models.Model):
     symbol = models.CharField(max_length=10)
-    date = models.CharField(max_length=25)
+    date = models.CharField(max_length=25)  # dd.mm.yyyy, kept for the JS payloads
+    trade_date = models.DateField(null=True)  # sortable copy of date for range queries
     close = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        # One price per symbol and day, the unique index also serves the range queries
+        constraints = [
+            models.UniqueConstraint(
+                fields=["symbol", "trade_date"], name="performance_symbol_date_unique"
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.trade_date is None and self.date:
+            self.trade_date = datetime.strptime(self.date, "%d.%m.%Y").date()
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.symbol} on {self.date}"
+
+
+class DataVersion(models.Model):
+    """Counter that is bumped whenever a data set changes (used to invalidate caches)."""
+
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def current(cls, name):
+        """Current version of a data set (0 if it was never bumped)."""
+        version = cls.objects.filter(name=name).values_list("version", flat=True)
+        return version.first() or 0
+
+    @classmethod
+    async def acurrent(cls, name):
+        """Async version of current()."""
+        version = cls.objects.filter(name=name).values_list("version", flat=True)
+        return await version.afirst() or 0
+
+    @classmethod
+    def record(cls, name, version):
+        """Set a data set to a version (e.g. the version of the data it was built from)."""
+        cls.objects.update_or_create(name=name, defaults={"version": version})
+
+    @classmethod
+    def bump(cls, name):
+        """Increment the version of a data set and return the new version."""
+        updated = cls.objects.filter(name=name).update(
+            version=models.F("version") + 1, updated=timezone.now()
+        )
+        if not updated:
+            cls.objects.get_or_create(name=name, defaults={"version": 1})
+        return cls.current(name)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class AnalyticsState(models.Model):
+    """Incrementally updated analytics of a symbol or a symbol|benchmark pair (see incremental.py)."""
+
+    key = models.CharField(max_length=50, unique=True)
+    trade_date = models.DateField()  # last close included in the state
+    state = models.JSONField()
+
+    def __str__(self):
+        return f"{self.key} on {self.trade_date}"
+
+
+class SymbolAnalytics(models.Model):
+    """Weight independent analytics of a symbol per day (manage.py build_analytics)."""
+
+    symbol = models.CharField(max_length=10)
+    trade_date = models.DateField()
+    daily_return = models.FloatField(null=True)
+    rolling_return = models.FloatField(null=True)  # 252 trading days
+    rolling_volatility = models.FloatField(null=True)  # 252 trading days, annualized
+    drawdown = models.FloatField(null=True)
+    peak = models.FloatField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["symbol", "trade_date"], name="symbolanalytics_symbol_date"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol} on {self.trade_date}"
+
+
+class ScreenerFactor(models.Model):
+    """Screener row of a security as of the last build (manage.py build_screener)."""
+
+    # Identification code, or the Performance / Qualdata symbol of a security without one
+    symbol = models.CharField(max_length=200, unique=True)
+    name = models.CharField(max_length=200, null=True, db_index=True)
+    gicSector = models.CharField(max_length=200, null=True, db_index=True)
+    gicGroup = models.CharField(max_length=200, null=True, db_index=True)
+    gicIndustry = models.CharField(max_length=200, null=True, db_index=True)
+    gicSubIndustry = models.CharField(max_length=200, null=True, db_index=True)
+    beta = models.FloatField(null=True, db_index=True)
+    mcap = models.FloatField(null=True, db_index=True)
+    dividendYield = models.FloatField(null=True, db_index=True)
+    trade_date = models.DateField(null=True)  # last close of the price factors
+    return_1m = models.FloatField(null=True, db_index=True)
+    return_3m = models.FloatField(null=True, db_index=True)
+    return_6m = models.FloatField(null=True, db_index=True)
+    return_1y = models.FloatField(null=True, db_index=True)
+    return_3y = models.FloatField(null=True, db_index=True)
+    volatility_3m = models.FloatField(null=True, db_index=True)  # annualized
+    volatility_1y = models.FloatField(null=True, db_index=True)
+    volatility_3y = models.FloatField(null=True, db_index=True)
+    max_drawdown_1y = models.FloatField(null=True, db_index=True)
+    max_drawdown_3y = models.FloatField(null=True, db_index=True)
+    drawdown = models.FloatField(null=True, db_index=True)  # from the all time high
+
+    def __str__(self):
+        return self.symbol
+
+
+class FactorScore(models.Model):
+    """Factor z-scores and composite rank of a security on a date (manage.py build_scores)."""
+
+    symbol = models.CharField(max_length=200)  # Identification code
+    score_date = models.DateField()
+    gicSector = models.CharField(max_length=200, null=True)
+    momentum = models.FloatField(null=True)
+    low_volatility = models.FloatField(null=True)
+    value = models.FloatField(null=True)
+    quality = models.FloatField(null=True)
+    composite = models.FloatField()
+    rank = models.PositiveIntegerField()  # 1 is the best composite of the date
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["symbol", "score_date"], name="factorscore_symbol_date"
+            ),
+        ]
+        # The latest snapshot is read in rank order
+        indexes = [
+            models.Index(fields=["score_date", "rank"], name="factorscore_date_rank"),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol} on {self.score_date}"
@@ -0,0 +1,632 @@
+import hashlib
+import json
+from collections import namedtuple
+
+import numpy as np
+from django.core.cache import caches
+
+from .cache import ANALYTICS_CACHE
+from .models import DataVersion
+from .signals import PERFORMANCE_DATA
+
+OBJECTIVES = ["min_variance", "max_sharpe", "risk_parity", "max_diversification"]
+ESTIMATORS = ["sample", "ewma", "ledoit_wolf"]
+
+# Trading days per year (annualization) and defaults of the estimation window
+TRADING_DAYS = 252
+COVARIANCE_WINDOW = 3 * TRADING_DAYS
+EWMA_HALFLIFE = 63
+
+# Symbols with fewer daily returns in the window are left out of the optimization
+MIN_OBSERVATIONS = 60
+
+# Stopping rule of the solver: largest weight change of an iteration
+TOLERANCE = 1e-9
+MAX_ITERATIONS = 5000
+
+# Risk parity needs strictly positive weights
+RISK_PARITY_FLOOR = 1e-6
+
+# Annualized mean returns and covariance of the daily returns of the symbols
+Estimate = namedtuple("Estimate", ["symbols", "mean", "covariance", "shrinkage"])
+
+# Long only box bounds and sector caps, groups[i] is the sector number of asset i
+# (caps[k] is inf for sectors without a cap)
+Constraints = namedtuple("Constraints", ["lower", "upper", "groups", "caps"])
+
+Solution = namedtuple("Solution", ["weights", "iterations", "converged"])
+
+
+# ! ESTIMATION ----------------------------------------------------------------------
+
+
+def daily_returns(prices):
+    """
+    Daily returns of a wide close frame.
+
+    Prices are carried over holidays of a single market (at most 5 days), so a
+    missing close does not hide the return of the next day. Returns before the
+    first and after the last close of a symbol stay NaN.
+    """
+    return prices.ffill(limit=5).pct_change(fill_method=None).iloc[1:]
+
+
+def sample_covariance(returns, weights=None):
+    """
+    Covariance and mean of daily returns with missing values.
+
+    Every pair of symbols uses the days where both have a return (pairwise
+    complete), which keeps late listings in the universe but can give a matrix
+    that is not positive semidefinite; it is repaired by nearest_psd.
+
+    Parameters:
+    returns (np.ndarray): Days x symbols daily returns, NaN where missing.
+    weights (np.ndarray): Optional weight of every day (e.g. EWMA), equal by default.
+
+    Returns:
+    tuple: (mean, covariance) of the daily returns.
+    """
+    available = ~np.isnan(returns)
+    if weights is None:
+        weights = np.ones(len(returns))
+    mask = available * weights[:, None]
+
+    values = np.where(available, returns, 0.0)
+    mean = (mask * values).sum(axis=0) / mask.sum(axis=0)
+    centered = np.where(available, returns - mean, 0.0)
+
+    # Weighted pairwise sums of the products and of the weights, with the
+    # unbiased correction of weighted samples
+    weighted = centered * weights[:, None]
+    products = weighted.T @ centered
+    total = mask.T @ available
+    squares = (mask * weights[:, None]).T @ available
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = products / (total - squares / total)
+    covariance[~np.isfinite(covariance)] = 0.0
+    return mean, nearest_psd(covariance)
+
+
+def ewma_covariance(returns, halflife=EWMA_HALFLIFE):
+    """Exponentially weighted sample_covariance, the weight of a day halves every halflife days."""
+    age = np.arange(len(returns))[::-1]
+    return sample_covariance(returns, 0.5 ** (age / halflife))
+
+
+def ledoit_wolf_covariance(returns):
+    """
+    Sample covariance shrunk towards a scaled identity (Ledoit and Wolf, 2004).
+
+    The shrinkage intensity minimizes the expected squared error of the
+    estimate. Missing returns count as zero deviations from the mean.
+
+    Returns:
+    tuple: (mean, covariance, shrinkage intensity between 0 and 1).
+    """
+    mean, sample = sample_covariance(returns)
+    n_days, n_symbols = returns.shape
+    centered = np.where(np.isnan(returns), 0.0, returns - mean)
+
+    target = np.trace(sample) / n_symbols
+    distance = np.sum((sample - target * np.eye(n_symbols)) ** 2)
+    # Sum over the days of ||x x' - S||^2, without the days x symbols x symbols array
+    norms = np.sum(centered**2, axis=1)
+    spread = (
+        np.sum(norms**2)
+        - 2 * np.sum((centered @ sample) * centered)
+        + n_days * np.sum(sample**2)
+    ) / n_days**2
+
+    shrinkage = 1.0 if distance == 0 else min(max(spread, 0.0), distance) / distance
+    covariance = shrinkage * target * np.eye(n_symbols) + (1 - shrinkage) * sample
+    return mean, covariance, shrinkage
+
+
+def nearest_psd(matrix, floor=1e-12):
+    """Symmetric matrix with its negative eigenvalues raised to a small positive floor."""
+    matrix = (matrix + matrix.T) / 2
+    values, vectors = np.linalg.eigh(matrix)
+    if values[0] > 0:
+        return matrix
+    values = np.maximum(values, floor * max(values[-1], floor))
+    return (vectors * values) @ vectors.T
+
+
+def estimate(returns, estimator="ledoit_wolf", halflife=EWMA_HALFLIFE):
+    """
+    Annualized mean and covariance of a daily returns frame.
+
+    Parameters:
+    returns (pd.DataFrame): Date x symbol daily returns (see daily_returns).
+    estimator (str): "sample", "ewma" or "ledoit_wolf".
+    halflife (int): Half-life in days of the EWMA weights.
+
+    Returns:
+    Estimate: Symbols in the column order of the frame.
+    """
+    values = returns.to_numpy(dtype=float)
+    shrinkage = None
+    if estimator == "sample":
+        mean, covariance = sample_covariance(values)
+    elif estimator == "ewma":
+        mean, covariance = ewma_covariance(values, halflife)
+    elif estimator == "ledoit_wolf":
+        mean, covariance, shrinkage = ledoit_wolf_covariance(values)
+    else:
+        raise ValueError(f"Unknown estimator: {estimator}")
+    return Estimate(
+        list(returns.columns), mean * TRADING_DAYS, covariance * TRADING_DAYS, shrinkage
+    )
+
+
+def estimate_cache_key(symbols, estimator, window, to_date, halflife):
+    """Cache key of an estimate, the data version is the cache version."""
+    spec = {
+        "symbols": sorted(symbols),
+        "estimator": estimator,
+        "window": window,
+        "to_date": to_date.isoformat() if to_date else None,
+        "halflife": halflife if estimator == "ewma" else None,
+    }
+    canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"))
+    return "covariance:" + hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def cached_estimate(
+    symbols, load_returns, estimator, window, to_date=None, halflife=EWMA_HALFLIFE
+):
+    """
+    Estimate of the symbols from the analytics cache.
+
+    The key is the symbol set, the estimator and the window, the version is the
+    Performance data version, so new prices make every cached estimate stale.
+    A window without to_date ends at the latest price of that data version.
+
+    Parameters:
+    symbols (list of str): Requested symbols (the order does not matter).
+    load_returns (callable): Returns the daily returns frame of the window on a miss.
+
+    Returns:
+    tuple: (Estimate, True if it came from the cache). Raises ValueError if fewer
+    than 2 symbols have MIN_OBSERVATIONS returns in the window.
+    """
+    cache = caches[ANALYTICS_CACHE]
+    key = estimate_cache_key(symbols, estimator, window, to_date, halflife)
+    version = DataVersion.current(PERFORMANCE_DATA)
+
+    cached = cache.get(key, version=version)
+    if cached is not None:
+        return cached, True
+
+    returns = load_returns()
+    # Symbols without enough returns in the window cannot be estimated
+    returns = returns.loc[:, returns.notna().sum() >= MIN_OBSERVATIONS]
+    if returns.shape[1] < 2:
+        raise ValueError(
+            f"At least 2 tickers with {MIN_OBSERVATIONS} returns in the window are required"
+        )
+    result = estimate(returns, estimator, halflife)
+    cache.set(key, result, version=version)
+    return result, False
+
+
+# ! CONSTRAINTS ---------------------------------------------------------------------
+
+
+def gic_sectors(rows):
+    """
+    GIC sector of every Performance symbol from (Identification code, gicSector) rows.
+
+    Codes are matched exactly, and Bloomberg style codes ("AAPL US") also by
+    their ticker when no other listing of the ticker has a different sector.
+    Sectors missing in the data ("NA") are left out.
+    """
+    exact = {}
+    tickers = {}
+    for code, sector in rows:
+        if not code or not sector or sector == "NA":
+            continue
+        exact[code] = sector
+        tickers.setdefault(code.split()[0], set()).add(sector)
+
+    sectors = {
+        ticker: names.pop() for ticker, names in tickers.items() if len(names) == 1
+    }
+    sectors.update(exact)
+    return sectors
+
+
+def make_constraints(symbols, lower=0.0, upper=1.0, sectors=None, sector_caps=None):
+    """
+    Constraints of a long only portfolio.
+
+    Parameters:
+    symbols (list of str): Assets in optimization order.
+    lower, upper (float or dict): Weight bounds of every asset, or {symbol: bound}
+    with the other assets at 0 and 1.
+    sectors (dict): {symbol: sector}, assets without a sector are not capped.
+    sector_caps (float or dict): Maximum weight of every sector, or {sector: cap}.
+
+    Returns:
+    Constraints. Raises ValueError if the bounds are invalid.
+    """
+
+    def bounds(value, default):
+        if isinstance(value, dict):
+            return np.array([float(value.get(s, default)) for s in symbols])
+        return np.full(len(symbols), float(value))
+
+    try:
+        lower = bounds(lower, 0.0)
+        upper = bounds(upper, 1.0)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid weight bounds")
+    if np.any(lower < 0) or np.any(lower > upper) or np.any(upper > 1):
+        raise ValueError("Invalid weight bounds")
+
+    sectors = sectors or {}
+    names = sorted({sectors[s] for s in symbols if sectors.get(s) is not None})
+    number = {name: k for k, name in enumerate(names)}
+    # Assets without a sector form the last, uncapped group
+    groups = np.array([number.get(sectors.get(s), len(names)) for s in symbols])
+    caps = np.full(len(names) + 1, np.inf)
+    if sector_caps is not None:
+        for name, k in number.items():
+            cap = (
+                sector_caps.get(name) if isinstance(sector_caps, dict) else sector_caps
+            )
+            if cap is not None:
+                try:
+                    caps[k] = float(cap)
+                except (TypeError, ValueError):
+                    raise ValueError("Invalid sector caps")
+    if np.any(caps < 0):
+        raise ValueError("Invalid sector caps")
+
+    constraints = Constraints(lower, upper, groups, caps)
+    # The portfolio of the highest lower bounds is feasible unless the constraints are
+    max_linear(np.zeros(len(symbols)), constraints)
+    return constraints
+
+
+def project(v, constraints):
+    """
+    Euclidean projection onto {sum(w) = 1, lower <= w <= upper, sector sums <= caps}.
+
+    The projection is w_i = clip(v_i - t_k, lower_i, upper_i) with one shift t_k
+    per sector. Uncapped sectors share the shift t of the budget, a capped sector
+    uses t unless its sum exceeds the cap, then its own larger shift brings the
+    sum down to the cap. The budget sum min(cap_k, sector sum at t) decreases
+    with t, so both shifts are roots of decreasing piecewise linear functions.
+    """
+    lower, upper, groups, caps = constraints
+    n_groups = len(caps)
+
+    def budget(t):
+        sums = np.bincount(
+            groups, np.minimum(np.maximum(v - t, lower), upper), minlength=n_groups
+        )
+        return np.minimum(caps, sums).sum()
+
+    t = _shift(budget, np.concatenate([v - upper, v - lower]), 1.0)
+    w = np.minimum(np.maximum(v - t, lower), upper)
+
+    # Own shifts of the sectors above their cap
+    sums = np.bincount(groups, w, minlength=n_groups)
+    for k in np.flatnonzero(sums > caps):
+        members = groups == k
+        v_k, lower_k, upper_k = v[members], lower[members], upper[members]
+        points = np.concatenate([[t], v_k - upper_k, v_k - lower_k])
+        t_k = _shift(
+            lambda t: np.minimum(np.maximum(v_k - t, lower_k), upper_k).sum(),
+            points[points >= t],
+            caps[k],
+        )
+        w[members] = np.minimum(np.maximum(v_k - t_k, lower_k), upper_k)
+    return w
+
+
+def _shift(func, points, target, tol=1e-13, max_iter=100):
+    """
+    Root of func(t) = target for a decreasing, piecewise linear func.
+
+    A binary search over the points (sorted here, they must bracket the root)
+    finds the two neighbouring points around the root. When the points hold
+    every kink of func, func is linear between them and the first secant step
+    is exact, other kinks (e.g. sector caps) are handled by alternating secant
+    and bisection steps.
+    """
+    points = np.sort(points)
+    i, j = 0, len(points) - 1
+    f_low = func(points[i]) - target
+    f_high = func(points[j]) - target
+    while j - i > 1:
+        m = (i + j) // 2
+        f = func(points[m]) - target
+        if f > 0:
+            i, f_low = m, f
+        else:
+            j, f_high = m, f
+    low, high = points[i], points[j]
+
+    t = high
+    for iteration in range(max_iter):
+        if f_low <= tol:
+            return low
+        if f_high >= -tol:
+            return high
+        if iteration % 2 == 0:
+            t = low + f_low * (high - low) / (f_low - f_high)
+        else:
+            t = (low + high) / 2
+        f = func(t) - target
+        if abs(f) <= tol:
+            return t
+        if f > 0:
+            low, f_low = t, f
+        else:
+            high, f_high = t, f
+    return t
+
+
+def max_linear(a, constraints):
+    """
+    Portfolio of the constraints with the highest a'w.
+
+    Starting from the lower bounds the remaining budget goes to the assets in
+    decreasing order of a, as far as their upper bound and sector cap allow,
+    which is optimal for nested (sector within budget) caps. Raises ValueError if
+    no portfolio satisfies the constraints.
+    """
+    lower, upper, groups, caps = constraints
+    w = lower.copy()
+    room = caps - np.bincount(groups, lower, minlength=len(caps))
+    budget = 1 - w.sum()
+    if budget < -1e-12 or np.any(room < -1e-12):
+        raise ValueError("Infeasible constraints: lower bounds exceed the budget")
+
+    for i in np.argsort(-a, kind="stable"):
+        if budget <= 0:
+            break
+        add = min(upper[i] - lower[i], room[groups[i]], budget)
+        w[i] += add
+        room[groups[i]] -= add
+        budget -= add
+    if budget > 1e-9:
+        raise ValueError("Infeasible constraints: the weights cannot add up to 1")
+    return w
+
+
+# ! SOLVER --------------------------------------------------------------------------
+
+
+def projected_gradient(
+    objective, gradient, project, w0, step, tol=TOLERANCE, max_iter=MAX_ITERATIONS
+):
+    """
+    Minimize a smooth objective over a convex set by accelerated projected gradient.
+
+    Steps are accelerated with Nesterov momentum, lengthened a little every
+    iteration and shortened by backtracking until the quadratic upper bound
+    holds, and the momentum is reset whenever the
+    objective goes up, so the objective never increases. Points where the
+    objective is not finite (e.g. the log of a weight) are treated as too far.
+
+    Parameters:
+    objective, gradient (callable): f(w) and its gradient.
+    project (callable): Euclidean projection onto the feasible set.
+    w0 (np.ndarray): Starting point.
+    step (float): Initial step, e.g. 1 / Lipschitz constant of the gradient.
+
+    Returns:
+    Solution: Weights, number of iterations and whether the weights converged.
+    """
+    w = project(w0)
+    fw = objective(w)
+    y, fy = w, fw
+    momentum = 1.0
+    for iteration in range(1, max_iter + 1):
+        g = gradient(y)
+        # Try a longer step first, backtracking shortens it again where needed
+        step *= 1.25
+        while True:
+            w_next = project(y - step * g)
+            d = w_next - y
+            f_next = objective(w_next)
+            if np.isfinite(f_next) and f_next <= fy + g @ d + d @ d / (2 * step):
+                break
+            step /= 2
+            if step < 1e-20:
+                return Solution(w, iteration, False)
+
+        if f_next > fw:
+            # Restart the momentum from the last accepted point
+            y, fy, momentum = w, fw, 1.0
+            continue
+
+        converged = np.max(np.abs(w_next - w)) < tol
+        next_momentum = (1 + np.sqrt(1 + 4 * momentum**2)) / 2
+        y = w_next + (momentum - 1) / next_momentum * (w_next - w)
+        w, fw, momentum = w_next, f_next, next_momentum
+        fy = objective(y)
+        if not np.isfinite(fy):
+            y, fy = w, fw
+        if converged:
+            return Solution(w, iteration, True)
+    return Solution(w, max_iter, False)
+
+
+def largest_eigenvalue(matrix, iterations=50):
+    """Largest eigenvalue of a positive semidefinite matrix (power iteration)."""
+    v = np.ones(len(matrix)) / np.sqrt(len(matrix))
+    value = 0.0
+    for _ in range(iterations):
+        u = matrix @ v
+        value = np.linalg.norm(u)
+        if value == 0:
+            return 0.0
+        v = u / value
+    return value
+
+
+def min_variance(covariance, constraints):
+    """Portfolio of the constraints with the lowest variance w'Cw."""
+
+    def objective(w):
+        return w @ covariance @ w
+
+    def gradient(w):
+        return 2 * covariance @ w
+
+    n = len(covariance)
+    step = 1 / (2 * largest_eigenvalue(covariance) or 1.0)
+    return projected_gradient(
+        objective,
+        gradient,
+        lambda v: project(v, constraints),
+        np.full(n, 1 / n),
+        step,
+    )
+
+
+def max_ratio(a, covariance, constraints, offset=0.0):
+    """
+    Portfolio of the constraints with the highest (a'w - offset) / sqrt(w'Cw).
+
+    With a = expected returns and offset = risk free rate this is the maximum
+    Sharpe ratio, with a = volatilities and no offset the maximum
+    diversification ratio. The ratio is pseudo-concave where it is positive, so
+    the projected gradient started from such a portfolio finds the maximum.
+    Raises ValueError if no portfolio has a'w above the offset.
+    """
+    start = max_linear(a, constraints)
+    if a @ start <= offset:
+        raise ValueError("No portfolio has an expected return above the risk free rate")
+    # Start halfway to the lowest variance to stay away from a corner
+    blend = (start + min_variance(covariance, constraints).weights) / 2
+    if a @ blend > offset:
+        start = blend
+
+    def objective(w):
+        excess = a @ w - offset
+        if excess <= 0:
+            return np.inf
+        return -excess / np.sqrt(w @ covariance @ w)
+
+    def gradient(w):
+        variance = w @ covariance @ w
+        volatility = np.sqrt(variance)
+        return -a / volatility + (a @ w - offset) * (covariance @ w) / (
+            variance * volatility
+        )
+
+    variance = start @ covariance @ start
+    step = variance / (largest_eigenvalue(covariance) or 1.0)
+    return projected_gradient(
+        objective, gradient, lambda v: project(v, constraints), start, step
+    )
+
+
+def risk_parity(covariance, constraints, budgets=None):
+    """
+    Portfolio whose assets contribute their budget share of the risk.
+
+    Solves min 0.5 w'Cw - c * sum(b_i log w_i) over the constraints (Roncalli's
+    risk budgeting). c is the variance of the unconstrained risk parity
+    portfolio, so that portfolio is the solution whenever it satisfies the
+    constraints, otherwise the risk contributions are as close to the budgets as
+    the constraints allow. Budgets are equal by default.
+    """
+    n = len(covariance)
+    budgets = np.full(n, 1 / n) if budgets is None else budgets / budgets.sum()
+    unconstrained = _risk_budget_weights(covariance, budgets)
+    scale = unconstrained @ covariance @ unconstrained
+
+    floored = constraints._replace(
+        lower=np.maximum(constraints.lower, RISK_PARITY_FLOOR)
+    )
+
+    def objective(w):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return 0.5 * w @ covariance @ w - scale * budgets @ np.log(w)
+
+    def gradient(w):
+        return covariance @ w - scale * budgets / w
+
+    step = 1 / (largest_eigenvalue(covariance) or 1.0)
+    return projected_gradient(
+        objective,
+        gradient,
+        lambda v: project(v, floored),
+        unconstrained,
+        step,
+    )
+
+
+def _risk_budget_weights(covariance, budgets, max_iter=100):
+    """
+    Long only risk budgeting weights without other constraints.
+
+    Newton's method on the convex 0.5 y'Cy - sum(b log y) (Spinu, 2013), whose
+    minimum has the risk contributions y_i (Cy)_i = b_i, scaled to a sum of 1.
+    """
+    y = budgets / np.sqrt(np.diag(covariance) + 1e-18)
+    for _ in range(max_iter):
+        gradient = covariance @ y - budgets / y
+        hessian = covariance + np.diag(budgets / y**2)
+        delta = np.linalg.solve(hessian, gradient)
+        # Damped step that keeps every weight positive
+        ratio = np.max(delta / y)
+        y = y - delta / max(1.0, ratio / 0.9)
+        if np.max(np.abs(delta / y)) < 1e-12:
+            break
+    return y / y.sum()
+
+
+def optimize(objective, result, constraints, risk_free=0.0):
+    """
+    Optimal weights of an Estimate.
+
+    Parameters:
+    objective (str): One of OBJECTIVES.
+    result (Estimate): Annualized mean returns and covariance.
+    constraints (Constraints): Bounds and sector caps in the order of result.symbols.
+    risk_free (float): Annual risk free rate of the maximum Sharpe ratio.
+
+    Returns:
+    Solution. Raises ValueError if the objective cannot be reached.
+    """
+    covariance = result.covariance
+    if objective == "min_variance":
+        return min_variance(covariance, constraints)
+    if objective == "max_sharpe":
+        return max_ratio(result.mean, covariance, constraints, risk_free)
+    if objective == "max_diversification":
+        return max_ratio(np.sqrt(np.diag(covariance)), covariance, constraints)
+    if objective == "risk_parity":
+        return risk_parity(covariance, constraints)
+    raise ValueError(f"Unknown objective: {objective}")
+
+
+def portfolio_statistics(weights, result, risk_free=0.0):
+    """Annualized return, volatility, Sharpe and diversification ratio and risk contributions."""
+    covariance = result.covariance
+    variance = weights @ covariance @ weights
+    volatility = np.sqrt(variance)
+    expected = weights @ result.mean
+    return {
+        "expectedReturn": float(expected),
+        "volatility": float(volatility),
+        "sharpe": float((expected - risk_free) / volatility) if volatility else None,
+        "diversificationRatio": (
+            float(weights @ np.sqrt(np.diag(covariance)) / volatility)
+            if volatility
+            else None
+        ),
+        # Share of the variance contributed by every asset
+        "riskContributions": (
+            (weights * (covariance @ weights) / variance).tolist()
+            if variance
+            else [0.0] * len(weights)
+        ),
+    }
@@ -0,0 +1,129 @@
+from functools import cached_property
+
+import pandas as pd
+
+
+class PricePanel:
+    """
+    Date-indexed, float, wide close price frame (date x symbol) shared by the analytics.
+
+    A panel is built once per request. The daily, weekly and monthly returns are
+    computed on first access and cached, so every function in utils.py that
+    receives the same panel reuses them instead of parsing and pivoting the
+    records again.
+    """
+
+    def __init__(self, prices):
+        self.prices = prices
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Build a panel from a list of Performance-like dictionaries.
+
+        Parameters:
+        records (list of dict): Dictionaries with "symbol", "date" (dd.mm.yyyy) and "close".
+
+        Returns:
+        PricePanel: Panel with one column per symbol, sorted by date.
+        """
+        if not records:
+            return cls(pd.DataFrame(index=pd.DatetimeIndex([], name="date")))
+
+        df = pd.DataFrame(records, columns=["symbol", "date", "close"])
+        df["date"] = pd.to_datetime(df["date"], format="%d.%m.%Y")
+        df["close"] = df["close"].astype(float)
+        prices = df.pivot(index="date", columns="symbol", values="close").sort_index()
+        return cls(prices)
+
+    @classmethod
+    def coerce(cls, data):
+        """Return data as a PricePanel (panel, wide frame or list of dict)."""
+        if isinstance(data, cls):
+            return data
+        if isinstance(data, pd.DataFrame):
+            return cls(data)
+        return cls.from_records(data)
+
+    @classmethod
+    def join(cls, *panels):
+        """Outer-join several panels on the date axis."""
+        frames = [panel.prices for panel in panels if panel is not None]
+        return cls(pd.concat(frames, axis=1).sort_index())
+
+    # ! SHAPE -------------------------------------------------------------------------
+
+    @property
+    def symbols(self):
+        return list(self.prices.columns)
+
+    @property
+    def dates(self):
+        return self.prices.index
+
+    @property
+    def empty(self):
+        return self.prices.empty
+
+    def select(self, symbols):
+        """Return a panel with the given symbols in the given order (unknown ones are skipped)."""
+        return PricePanel(self.prices[[s for s in symbols if s in self.prices.columns]])
+
+    def restrict(self, dates):
+        """Return a panel that only keeps the dates also present in dates."""
+        return PricePanel(self.prices[self.prices.index.isin(dates)])
+
+    # ! RETURNS -----------------------------------------------------------------------
+
+    def warm(self, *attributes):
+        """Compute the given cached returns now (e.g. before the panel is shared) and return the panel."""
+        for attribute in attributes:
+            getattr(self, attribute)
+        return self
+
+    @cached_property
+    def daily_returns(self):
+        return self.prices.pct_change()
+
+    @cached_property
+    def weekly_prices(self):
+        return self.prices.resample("W-FRI").last()
+
+    @cached_property
+    def weekly_returns(self):
+        return self.weekly_prices.pct_change()
+
+    @cached_property
+    def monthly_prices(self):
+        return self.prices.resample("M").ffill()
+
+    @cached_property
+    def monthly_returns(self):
+        return self.monthly_prices.pct_change()
+
+    # ! OUTPUT ------------------------------------------------------------------------
+
+    def to_records(self, decimals=2):
+        """
+        Convert the panel back to the row-oriented Performance format.
+
+        Returns:
+        list of dict: One dictionary per symbol and date with "id", "symbol",
+        "date" (dd.mm.yyyy) and the close formatted as a string.
+        """
+        output = []
+        dates = self.prices.index.strftime("%d.%m.%Y")
+        for symbol in self.prices.columns:
+            closes = self.prices[symbol].to_numpy()
+            for date, close in zip(dates, closes):
+                if pd.isna(close):
+                    continue
+                output.append(
+                    {
+                        "id": len(output) + 1,
+                        "symbol": symbol,
+                        "date": date,
+                        "close": f"{close:.{decimals}f}",
+                    }
+                )
+        return output
@@ -0,0 +1,280 @@
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .models import DataVersion, Performance
+from .signals import PERFORMANCE_DATA
+
+MANIFEST = "manifest.json"
+DATES = "dates.i8"
+COLUMNS = "columns"
+
+# Performance fields read by read_closes
+CLOSE_COLUMNS = ["symbol", "trade_date", "close"]
+
+
+class PriceStore:
+    """
+    Columnar close price store kept next to the Performance model.
+
+    The store holds one sorted date axis and one float64 column per symbol. Every
+    file is a raw little-endian array that is memory-mapped on read, so a
+    symbol x date slice is a view on the page cache instead of a copy. Missing
+    prices are stored as NaN.
+
+    Layout of the store directory:
+        manifest.json       symbols in column order, the number of dates and the
+                            Performance data version the store was built from
+        dates.i8            int64 days since 1970-01-01, sorted ascending
+        columns/<n>.f8      float64 close prices of the n-th symbol
+    """
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory or settings.PRICE_STORE_DIR)
+        self._manifest = None
+        self._positions = None
+        self._dates = None
+        self._columns = {}
+
+    # ! READ --------------------------------------------------------------------------
+
+    def exists(self):
+        return (self.directory / MANIFEST).exists()
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            with open(self.directory / MANIFEST, "r") as file:
+                self._manifest = json.load(file)
+        return self._manifest
+
+    @property
+    def symbols(self):
+        return self.manifest["symbols"]
+
+    @property
+    def version(self):
+        """Performance data version of the prices in the store (None if unknown)."""
+        return self.manifest.get("version")
+
+    @property
+    def positions(self):
+        """Column number of every symbol in the store."""
+        if self._positions is None:
+            self._positions = {symbol: i for i, symbol in enumerate(self.symbols)}
+        return self._positions
+
+    @property
+    def dates(self):
+        """Memory-mapped date axis as datetime64[D]."""
+        if self._dates is None:
+            self._dates = self._map(self.directory / DATES, np.int64).view(
+                "datetime64[D]"
+            )
+        return self._dates
+
+    def column(self, symbol):
+        """Memory-mapped close prices of a single symbol over the full date axis."""
+        if symbol not in self._columns:
+            path = self._column_path(self.positions[symbol])
+            self._columns[symbol] = self._map(path, np.float64)
+        return self._columns[symbol]
+
+    def window(self, from_date=None, to_date=None):
+        """Return the slice of the date axis between from_date and to_date (inclusive)."""
+        dates = self.dates
+        start = 0
+        stop = len(dates)
+        if from_date is not None:
+            start = np.searchsorted(dates, np.datetime64(from_date, "D"), "left")
+        if to_date is not None:
+            stop = np.searchsorted(dates, np.datetime64(to_date, "D"), "right")
+        return slice(start, stop)
+
+    def panel(self, symbols, from_date=None, to_date=None):
+        """
+        Return a symbol x date panel slice of the store.
+
+        Parameters:
+        symbols (list of str): Symbols to include. Unknown symbols are skipped.
+        from_date, to_date (date-like): Optional inclusive date window.
+
+        Returns:
+        pd.DataFrame: Date-indexed float frame with one column per symbol. The columns
+        are views on the memory-mapped files, no price data is copied.
+        """
+        window = self.window(from_date, to_date)
+        known = [symbol for symbol in symbols if symbol in self.positions]
+        index = pd.DatetimeIndex(
+            self.dates[window].astype("datetime64[ns]"), name="date"
+        )
+        columns = {symbol: self.column(symbol)[window] for symbol in known}
+        panel = pd.DataFrame(columns, index=index, copy=False)
+        panel.columns.name = "symbol"
+        return panel
+
+    # ! WRITE -------------------------------------------------------------------------
+
+    def write(self, dates, chunks, version=None):
+        """
+        Rebuild the store from scratch.
+
+        The new store is written next to the current one and swapped in once it is
+        complete, so readers never see a half written store.
+
+        Parameters:
+        dates (array-like): Full date axis of the store.
+        chunks (iterable of pd.DataFrame): Wide close frames (date x symbol). Each
+        chunk is reindexed onto the date axis before it is written.
+        version (int): Performance data version read before the prices.
+        """
+        dates = pd.DatetimeIndex(sorted(set(pd.DatetimeIndex(dates))))
+        staging = self.directory.with_name(self.directory.name + ".tmp")
+        if staging.exists():
+            shutil.rmtree(staging)
+        (staging / COLUMNS).mkdir(parents=True)
+
+        self._dump(staging / DATES, self._days(dates))
+
+        symbols = []
+        for chunk in chunks:
+            chunk = chunk.reindex(dates)
+            for symbol in chunk.columns:
+                path = staging / COLUMNS / f"{len(symbols)}.f8"
+                self._dump(path, chunk[symbol].to_numpy(dtype="<f8"))
+                symbols.append(symbol)
+
+        self._write_manifest(staging, symbols, len(dates), version)
+
+        if self.directory.exists():
+            shutil.rmtree(self.directory)
+        os.replace(staging, self.directory)
+        self._reset()
+
+    def append(self, frame, version=None):
+        """
+        Append dates newer than the last stored date.
+
+        Existing columns are extended in place (NaN where a symbol has no price on
+        a new date) and unknown symbols get a new column that is NaN before their
+        first appended date. The manifest is rewritten last, so an interrupted
+        append is simply overwritten by the next one.
+
+        Parameters:
+        frame (pd.DataFrame): Wide close frame (date x symbol).
+        version (int): Performance data version read before the prices.
+
+        Returns:
+        int: Number of dates appended.
+        """
+        last_date = pd.Timestamp(self.dates[-1]) if len(self.dates) else None
+        frame = frame.sort_index()
+        if last_date is not None:
+            frame = frame[frame.index > last_date]
+        if frame.empty:
+            self._write_manifest(self.directory, self.symbols, len(self.dates), version)
+            self._reset()
+            return 0
+
+        symbols = list(self.symbols)
+        n_dates = len(self.dates)
+
+        for symbol in frame.columns:
+            if symbol not in symbols:
+                path = self._column_path(len(symbols))
+                self._dump(path, np.full(n_dates, np.nan, dtype="<f8"))
+                symbols.append(symbol)
+
+        frame = frame.reindex(columns=symbols)
+        for index, symbol in enumerate(symbols):
+            values = frame[symbol].to_numpy(dtype="<f8")
+            self._extend(self._column_path(index), n_dates, values)
+
+        self._extend(self.directory / DATES, n_dates, self._days(frame.index))
+
+        self._write_manifest(self.directory, symbols, n_dates + len(frame), version)
+        self._reset()
+        return len(frame)
+
+    # ! HELPERS -----------------------------------------------------------------------
+
+    def _column_path(self, index):
+        return self.directory / COLUMNS / f"{index}.f8"
+
+    def _map(self, path, dtype):
+        length = self.manifest["length"]
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(
+            path, dtype=np.dtype(dtype).newbyteorder("<"), mode="r", shape=(length,)
+        )
+
+    def _reset(self):
+        self._manifest = None
+        self._positions = None
+        self._dates = None
+        self._columns = {}
+
+    @staticmethod
+    def _days(dates):
+        return pd.DatetimeIndex(dates).values.astype("datetime64[D]").astype("<i8")
+
+    @staticmethod
+    def _dump(path, values):
+        with open(path, "wb") as file:
+            file.write(np.ascontiguousarray(values).tobytes())
+
+    @staticmethod
+    def _extend(path, length, values):
+        # Cut off anything past the manifest length before appending
+        with open(path, "r+b") as file:
+            file.seek(length * 8)
+            file.write(np.ascontiguousarray(values).tobytes())
+            file.truncate()
+
+    @staticmethod
+    def _write_manifest(directory, symbols, length, version):
+        with open(directory / MANIFEST, "w") as file:
+            json.dump({"symbols": symbols, "length": length, "version": version}, file)
+
+
+def read_closes(queryset=None, chunk_size=20000):
+    """
+    Read close prices from the Performance table into a wide frame.
+
+    Parameters:
+    queryset (QuerySet): Optional pre-filtered Performance queryset.
+    chunk_size (int): Number of rows fetched per database round trip.
+
+    Returns:
+    pd.DataFrame: Date-indexed float frame with one column per symbol.
+    """
+    if queryset is None:
+        queryset = Performance.objects.all()
+    rows = queryset.values_list(*CLOSE_COLUMNS).iterator(chunk_size=chunk_size)
+    return pivot_closes(rows)
+
+
+def pivot_closes(rows):
+    """Wide close frame of (symbol, trade_date, close) rows, see read_closes."""
+    df = pd.DataFrame.from_records(rows, columns=["symbol", "date", "close"])
+    df["date"] = pd.to_datetime(df["date"])
+    df["close"] = df["close"].astype(float)
+    return df.pivot(index="date", columns="symbol", values="close").sort_index()
+
+
+def get_price_store():
+    """
+    Return the configured price store, or None if it has not been built yet or is
+    stale (Performance changed since it was built or appended, the views then
+    read the database).
+    """
+    store = PriceStore()
+    if not store.exists():
+        return None
+    return store if store.version == DataVersion.current(PERFORMANCE_DATA) else None
@@ -0,0 +1,170 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Calendar schedules: rebalance at the close of the last trading day of each period
+CALENDAR_SCHEDULES = {"monthly": "M", "quarterly": "Q", "annual": "Y"}
+SCHEDULES = [*CALENDAR_SCHEDULES, "drift", "none"]
+
+RebalanceResult = namedtuple(
+    "RebalanceResult", ["values", "weights", "rebalance_dates", "turnover"]
+)
+
+
+def rebalance(prices, weights, schedule="quarterly", band=0.05, start_value=100.0):
+    """
+    Simulate a portfolio that is reset to its target weights on a schedule.
+
+    Between two rebalancing dates every asset simply grows with its cumulative
+    return, so a whole segment is evaluated with array operations and the segments
+    are chained by their end values. No Python loop runs over the dates.
+
+    Parameters:
+    prices (pd.DataFrame): Date x asset close prices. Gaps are forward filled and
+    assets without a price yet earn nothing.
+    weights (array-like or pd.DataFrame): Static target weights in column order, or a
+    date-indexed frame of target weights (one row per rebalancing date, explicit
+    schedule). Dates between two trading days apply on the next trading day. The
+    rest of a row that does not add up to one is held in cash at 0%.
+    schedule (str): "monthly", "quarterly", "annual", "drift" (rebalance once any
+    weight is more than band away from its target) or "none" (buy and hold).
+    Ignored for dated weights.
+    band (float): Absolute weight tolerance of the drift schedule.
+    start_value (float): Portfolio value on the first date.
+
+    Returns:
+    RebalanceResult: values (pd.Series) of the portfolio, weights (pd.DataFrame) of
+    the drifted weights at every close before rebalancing, rebalance_dates
+    (pd.DatetimeIndex) and turnover (pd.Series, one-way, per rebalancing date).
+    """
+    dates = prices.index
+    growth = _growth(prices.to_numpy(dtype=float))
+
+    if isinstance(weights, pd.DataFrame):
+        points, targets = _dated_points(dates, weights.reindex(columns=prices.columns))
+    else:
+        targets = np.asarray(weights, dtype=float)[None, :]
+        if schedule == "drift":
+            points = _drift_points(growth, targets[0], band)
+        elif schedule == "none":
+            points = np.array([0])
+        elif schedule in CALENDAR_SCHEDULES:
+            points = _calendar_points(dates, CALENDAR_SCHEDULES[schedule])
+        else:
+            raise ValueError(f"Unknown rebalancing schedule: {schedule}")
+        targets = np.repeat(targets, len(points), axis=0)
+
+    values, drifted = _evaluate(growth, points, targets)
+    values *= start_value
+
+    # Turnover is the one-way trade from the drifted back to the target weights
+    # (cash included)
+    trades = targets[1:] - drifted[points[1:]]
+    turnover = 0.5 * (np.abs(trades).sum(axis=1) + np.abs(trades.sum(axis=1)))
+
+    return RebalanceResult(
+        values=pd.Series(values, index=dates),
+        weights=pd.DataFrame(drifted, index=dates, columns=prices.columns),
+        rebalance_dates=dates[points],
+        turnover=pd.Series(turnover, index=dates[points[1:]]),
+    )
+
+
+def _growth(prices):
+    """Cumulative growth of every column since the first date (1 before its first price)."""
+    n_periods, n_assets = prices.shape
+    missing = np.isnan(prices)
+
+    if missing.any():
+        # Forward fill gaps with the last available price
+        last = np.where(missing, 0, np.arange(n_periods)[:, None])
+        np.maximum.accumulate(last, axis=0, out=last)
+        prices = prices[last, np.arange(n_assets)]
+
+    first = prices[np.argmax(~missing, axis=0), np.arange(n_assets)]
+    growth = prices / first
+    growth[np.isnan(growth)] = 1.0
+    return growth
+
+
+def _evaluate(growth, points, targets):
+    """
+    Chain the rebalancing segments.
+
+    The segment k covers the dates (points[k], points[k + 1]]. Within it an asset is
+    worth targets[k] * growth[t] / growth[points[k]] of the value at points[k] and
+    the cash 1 - targets[k].sum() does not change.
+    """
+    n_periods = len(growth)
+    t = np.arange(n_periods)
+    segment = np.maximum(np.searchsorted(points, t, side="left") - 1, 0)
+    start = points[segment]
+
+    holdings = growth / growth[start]
+    cash = 1.0 - targets.sum(axis=1)
+    if (targets == targets[0]).all():
+        holdings *= targets[0]
+        ratio = holdings.sum(axis=1) + cash[0]
+    else:
+        holdings *= targets[segment]
+        ratio = holdings.sum(axis=1) + cash[segment]
+
+    # Value at the start of every segment is the product of the previous segment ratios
+    segment_start = np.concatenate([[1.0], np.cumprod(ratio[points[1:]])])
+    values = segment_start[segment] * ratio
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drifted = holdings / ratio[:, None]
+    drifted[0] = targets[0]
+    return values, drifted
+
+
+def _calendar_points(dates, freq):
+    """First date plus the last trading day of every period (except the final one)."""
+    periods = dates.to_period(freq)
+    period_end = np.flatnonzero(periods[1:] != periods[:-1])
+    return np.unique(np.concatenate([[0], period_end]))
+
+
+def _dated_points(dates, schedule):
+    """Map explicit rebalancing dates to the first trading day on or after them."""
+    schedule = schedule.sort_index().fillna(0.0)
+    # Weights dated before the first trading day apply from the first day
+    rows = np.searchsorted(dates.values, schedule.index.values, side="left")
+    keep = rows < len(dates)
+    rows, targets = rows[keep], schedule.to_numpy(dtype=float)[keep]
+
+    # If several dates map to the same trading day the last one wins
+    last = np.flatnonzero(np.append(rows[1:] != rows[:-1], True))
+    rows, targets = rows[last], targets[last]
+    if len(rows) == 0 or rows[0] != 0:
+        raise ValueError("Dated weights must start on or before the first date")
+    return rows, targets
+
+
+def _drift_points(growth, target, band, block=256):
+    """
+    Rebalancing dates of a drift-band schedule.
+
+    Each step scans the following dates in blocks with array operations and stops at
+    the first close where a weight has drifted more than band from its target. Cash
+    (1 - target.sum()) does not grow but counts in the portfolio value.
+    """
+    n_periods = len(growth)
+    cash = 1.0 - target.sum()
+    points = [0]
+    start = 0
+    scanned = 1
+    while scanned < n_periods:
+        stop = min(scanned + block, n_periods)
+        holdings = target * growth[scanned:stop] / growth[start]
+        drifted = holdings / (holdings.sum(axis=1, keepdims=True) + cash)
+        breach = np.flatnonzero(np.abs(drifted - target).max(axis=1) > band)
+        if len(breach):
+            start = scanned + breach[0]
+            points.append(start)
+            scanned = start + 1
+        else:
+            scanned = stop
+    return np.array(points)
@@ -0,0 +1,228 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .models import FactorScore
+from .utils import rolling_statistics
+
+FACTORS = ["momentum", "low_volatility", "value", "quality"]
+
+# Weights of the factor z-scores in the composite score
+COMPOSITE_WEIGHTS = {
+    "momentum": 1.0,
+    "low_volatility": 1.0,
+    "value": 1.0,
+    "quality": 1.0,
+}
+
+# Momentum is the return of the last 12 months without the latest month (12-1)
+MOMENTUM_MONTHS = 12
+MOMENTUM_SKIP = 1
+
+# Trading days of the volatility and of the high of the quality proxy
+VOLATILITY_WINDOW = 252
+QUALITY_WINDOW = 756
+
+# A value older than this many calendar days on a scoring date counts as missing
+# (holidays, stale or delisted names)
+MAX_AGE_DAYS = 7
+
+# Raw factors are winsorized at these cross-sectional quantiles of every date and
+# the z-scores are capped at +-Z_CAP
+WINSOR_QUANTILES = (0.01, 0.99)
+Z_CAP = 3.0
+
+# Sectors with fewer names with a factor value on a date are scored against the
+# whole cross-section instead of their sector
+MIN_SECTOR_SIZE = 5
+
+# Names need this many factor z-scores for a composite score
+MIN_FACTORS = 2
+
+SCORE_COLUMNS = [*FACTORS, "composite", "rank"]
+
+
+def score_dates(dates):
+    """Scoring dates: the last trading day of every month of the calendar."""
+    dates = pd.DatetimeIndex(dates).sort_values()
+    return pd.DatetimeIndex(
+        pd.Series(dates, index=dates).groupby(dates.to_period("M")).max(), name="date"
+    )
+
+
+def price_factors(prices, dates):
+    """
+    Raw price factors of the symbols on the scoring dates.
+
+    momentum is the 12-1 month return, low_volatility the negative annualized
+    volatility of the last year of daily returns and quality the drawdown from
+    the three year high. The Qualdata fundamentals have no profitability fields,
+    so the drawdown from the high (names that hold their value) is the quality
+    proxy. Every factor is taken on the last close up to a scoring date and is
+    NaN where that close is more than MAX_AGE_DAYS old (see has_recent_close),
+    so stale or delisted names are not scored.
+
+    Parameters:
+    prices (pd.DataFrame): Date x symbol close prices of the full history.
+    dates (pd.DatetimeIndex): Scoring dates (see score_dates).
+
+    Returns:
+    dict: {factor: pd.DataFrame} of scoring date x symbol raw factors.
+    """
+    closes = _at_dates(prices, dates)
+    listed = closes.notna()
+    momentum = closes.shift(MOMENTUM_SKIP) / closes.shift(MOMENTUM_MONTHS) - 1
+
+    returns = prices.pct_change(fill_method=None)
+    volatility = rolling_statistics(returns, [VOLATILITY_WINDOW])[VOLATILITY_WINDOW][
+        "volatility"
+    ]
+    high = prices.rolling(QUALITY_WINDOW, min_periods=VOLATILITY_WINDOW).max()
+    quality = prices / high - 1
+
+    return {
+        "momentum": momentum.where(listed),
+        "low_volatility": -_at_dates(volatility, dates).where(listed),
+        "quality": _at_dates(quality, dates).where(listed),
+    }
+
+
+def has_recent_close(prices, dates):
+    """True where a symbol has a close at most MAX_AGE_DAYS old on a scoring date."""
+    return _at_dates(prices, dates).notna()
+
+
+def winsorize(values, quantiles=WINSOR_QUANTILES):
+    """Clip every row (date) of a dates x names array at its cross-sectional quantiles."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # dates without any value
+        low, high = np.nanquantile(values, quantiles, axis=1, keepdims=True)
+    return np.clip(values, low, high)
+
+
+def sector_zscores(values, groups, min_size=MIN_SECTOR_SIZE, cap=Z_CAP):
+    """
+    Sector neutral z-scores of a dates x names array.
+
+    Every name is standardized with the mean and standard deviation of its
+    sector on the same date, or of the whole cross-section when the sector has
+    fewer than min_size values on that date (or the name has no sector).
+
+    Parameters:
+    values (np.ndarray): Dates x names raw factor, NaN where missing.
+    groups (np.ndarray): Sector number of every name, -1 without a sector.
+
+    Returns:
+    np.ndarray: Dates x names z-scores capped at +-cap.
+    """
+    with warnings.catch_warnings(), np.errstate(divide="ignore", invalid="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)  # dates without any value
+        mean = np.repeat(np.nanmean(values, axis=1, keepdims=True), values.shape[1], 1)
+        std = np.repeat(
+            np.nanstd(values, axis=1, ddof=1, keepdims=True), values.shape[1], 1
+        )
+        for group in np.unique(groups[groups >= 0]):
+            columns = np.flatnonzero(groups == group)
+            block = values[:, columns]
+            rows = np.flatnonzero((~np.isnan(block)).sum(axis=1) >= min_size)
+            cells = np.ix_(rows, columns)
+            mean[cells] = np.nanmean(block[rows], axis=1, keepdims=True)
+            std[cells] = np.nanstd(block[rows], axis=1, ddof=1, keepdims=True)
+
+        zscores = (values - mean) / np.where(std > 0, std, np.nan)
+    return np.clip(zscores, -cap, cap)
+
+
+def score_history(factors, sectors, weights=COMPOSITE_WEIGHTS):
+    """
+    Factor z-scores, composite scores and ranks of the universe on every date.
+
+    Every factor is winsorized and standardized across the names of each date,
+    the composite is the weighted mean of the z-scores a name has (at least
+    MIN_FACTORS) and rank 1 is the best composite of a date.
+
+    Parameters:
+    factors (dict): {factor: pd.DataFrame} of date x name raw factors, higher is
+    better, all on the same dates and names.
+    sectors (dict): {name: GIC sector}, names without one are only compared with
+    the whole cross-section.
+
+    Returns:
+    dict: {column: pd.DataFrame} of date x name values for the SCORE_COLUMNS.
+    """
+    first = next(iter(factors.values()))
+    dates, names = first.index, first.columns
+    labels = pd.Series([sectors.get(name) for name in names], dtype=object)
+    groups = np.where(labels.notna(), pd.factorize(labels)[0], -1)
+
+    scores = {}
+    total = np.zeros(first.shape)
+    weight = np.zeros(first.shape)
+    count = np.zeros(first.shape)
+    for factor, frame in factors.items():
+        zscores = sector_zscores(winsorize(frame.to_numpy(dtype=float)), groups)
+        scores[factor] = pd.DataFrame(zscores, index=dates, columns=names)
+        valid = ~np.isnan(zscores)
+        total += np.where(valid, zscores, 0.0) * weights[factor]
+        weight += valid * weights[factor]
+        count += valid
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        composite = np.where(count >= MIN_FACTORS, total / weight, np.nan)
+    scores["composite"] = pd.DataFrame(composite, index=dates, columns=names)
+    scores["rank"] = scores["composite"].rank(axis=1, ascending=False, method="first")
+    return scores
+
+
+def score_models(scores, sectors, since=None):
+    """
+    Yield unsaved FactorScore objects of score_history() (names with a composite).
+
+    A generator, so that a long history can be inserted in batches without
+    holding every object in memory.
+
+    Parameters:
+    since (date): Only dates from this date on, all dates by default.
+    """
+    frame = pd.DataFrame({column: scores[column].stack() for column in SCORE_COLUMNS})
+    frame = frame[frame["composite"].notna()]
+    if since is not None:
+        frame = frame[frame.index.get_level_values(0) >= pd.Timestamp(since)]
+
+    symbols = frame.index.get_level_values(1)
+    columns = [
+        frame[column].astype(object).where(frame[column].notna(), None).to_numpy()
+        for column in FACTORS
+    ]
+    for symbol, date, momentum, low_volatility, value, quality, composite, rank in zip(
+        symbols,
+        frame.index.get_level_values(0).date,
+        *columns,
+        frame["composite"].to_numpy(),
+        frame["rank"].to_numpy(),
+    ):
+        yield FactorScore(
+            symbol=symbol,
+            score_date=date,
+            gicSector=sectors.get(symbol),
+            momentum=momentum,
+            low_volatility=low_volatility,
+            value=value,
+            quality=quality,
+            composite=composite,
+            rank=int(rank),
+        )
+
+
+def _at_dates(frame, dates, max_age=MAX_AGE_DAYS):
+    """Last value of every column up to each date, NaN if older than max_age days."""
+    stamps = pd.DataFrame(
+        np.where(frame.notna(), frame.index.to_numpy()[:, None], np.datetime64("NaT")),
+        index=frame.index,
+        columns=frame.columns,
+    )
+    values = frame.ffill().reindex(dates, method="ffill")
+    stamps = stamps.ffill().reindex(dates, method="ffill")
+    age = dates.to_numpy()[:, None] - stamps.to_numpy()
+    return values.where(age <= np.timedelta64(max_age, "D"))
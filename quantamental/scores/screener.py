@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+from .models import ScreenerFactor
+
+# Trading day windows of the price factors
+RETURN_WINDOWS = {"1m": 21, "3m": 63, "6m": 126, "1y": 252, "3y": 756}
+VOLATILITY_WINDOWS = {"3m": 63, "1y": 252, "3y": 756}
+DRAWDOWN_WINDOWS = {"1y": 252, "3y": 756}
+
+GIC_FIELDS = ["gicSector", "gicGroup", "gicIndustry", "gicSubIndustry"]
+FUNDAMENTAL_FIELDS = ["beta", "mcap", "dividendYield"]
+PRICE_FACTORS = [
+    *[f"return_{name}" for name in RETURN_WINDOWS],
+    *[f"volatility_{name}" for name in VOLATILITY_WINDOWS],
+    *[f"max_drawdown_{name}" for name in DRAWDOWN_WINDOWS],
+    "drawdown",
+]
+
+# Columns of a screener row, the text and numeric fields can be filtered and sorted
+SCREENER_TEXT_FIELDS = ["symbol", "name", *GIC_FIELDS]
+SCREENER_NUMBER_FIELDS = [*FUNDAMENTAL_FIELDS, *PRICE_FACTORS]
+SCREENER_COLUMNS = [*SCREENER_TEXT_FIELDS, "trade_date", *SCREENER_NUMBER_FIELDS]
+
+
+def price_factors(prices):
+    """
+    Price factors of every symbol as of its last close.
+
+    Every symbol uses its own trading days, a factor is NaN unless the symbol
+    has a close for the whole window. Returns are close to close, volatilities
+    are annualized (252 days), drawdowns are negative fractions from the peak
+    of the window (max_drawdown_*) or of the whole history (drawdown).
+
+    Parameters:
+    prices (pd.DataFrame): Date x symbol close prices of the full history.
+
+    Returns:
+    pd.DataFrame: Symbol x ("trade_date", *PRICE_FACTORS) frame.
+    """
+    longest = max(*RETURN_WINDOWS.values(), *VOLATILITY_WINDOWS.values()) + 1
+    rows = {}
+    for symbol in prices.columns:
+        column = prices[symbol].dropna()
+        if column.empty:
+            continue
+        closes = column.to_numpy(dtype=float)
+        recent = closes[-longest:]
+        returns = recent[1:] / recent[:-1] - 1
+
+        row = {"trade_date": column.index[-1].date()}
+        for name, window in RETURN_WINDOWS.items():
+            row[f"return_{name}"] = (
+                closes[-1] / closes[-1 - window] - 1 if len(closes) > window else np.nan
+            )
+        for name, window in VOLATILITY_WINDOWS.items():
+            row[f"volatility_{name}"] = (
+                returns[-window:].std(ddof=1) * np.sqrt(252)
+                if len(returns) >= window
+                else np.nan
+            )
+        for name, window in DRAWDOWN_WINDOWS.items():
+            if len(closes) > window:
+                values = closes[-1 - window :]
+                row[f"max_drawdown_{name}"] = (
+                    values / np.maximum.accumulate(values) - 1
+                ).min()
+            else:
+                row[f"max_drawdown_{name}"] = np.nan
+        row["drawdown"] = closes[-1] / closes.max() - 1
+        rows[symbol] = row
+
+    return pd.DataFrame.from_dict(
+        rows, orient="index", columns=["trade_date", *PRICE_FACTORS]
+    )
+
+
+def match_codes(codes, symbols):
+    """
+    Identification code of every Performance or Qualdata symbol.
+
+    Symbols are matched to a code exactly, or by the ticker of a Bloomberg style
+    code ("AAPL US") when only one code has that ticker (as gic_sectors).
+    Symbols without a code keep their own name.
+
+    Returns:
+    dict: {symbol: code}.
+    """
+    codes = set(codes)
+    tickers = {}
+    for code in codes:
+        tickers.setdefault(code.split()[0], []).append(code)
+
+    matches = {}
+    for symbol in symbols:
+        if symbol in codes:
+            matches[symbol] = symbol
+        elif len(tickers.get(symbol, [])) == 1:
+            matches[symbol] = tickers[symbol][0]
+        else:
+            matches[symbol] = symbol
+    return matches
+
+
+def screener_rows(identifications, fundamentals, factors):
+    """
+    Screener rows of the universe.
+
+    The universe is every Identification code plus the Performance and Qualdata
+    symbols without a code (indices, funds).
+
+    Parameters:
+    identifications (iterable of dict): Identification code and name with the
+    GIC_FIELDS of its Sector (None without one).
+    fundamentals (iterable of dict): Qualdata ticker, name and FUNDAMENTAL_FIELDS.
+    factors (pd.DataFrame): price_factors() of the Performance symbols.
+
+    Returns:
+    dict: {symbol: row with the SCREENER_COLUMNS}.
+    """
+    empty = dict.fromkeys(SCREENER_COLUMNS)
+    rows = {}
+    for identification in identifications:
+        code = identification["code"]
+        if code and code not in rows:
+            rows[code] = {
+                **empty,
+                **{field: identification[field] for field in GIC_FIELDS},
+                "symbol": code,
+                "name": identification["name"],
+            }
+
+    fundamentals = list(fundamentals)
+    symbols = [row["ticker"] for row in fundamentals if row["ticker"]]
+    matches = match_codes(rows, [*symbols, *factors.index])
+
+    for fundamental in fundamentals:
+        if not fundamental["ticker"]:
+            continue
+        code = matches[fundamental["ticker"]]
+        row = rows.setdefault(code, {**empty, "symbol": code})
+        row["name"] = row["name"] or fundamental["name"]
+        row.update({field: fundamental[field] for field in FUNDAMENTAL_FIELDS})
+
+    values = factors.astype(object).where(factors.notna(), None)
+    for symbol, factor in zip(values.index, values.to_dict(orient="records")):
+        code = matches[symbol]
+        rows.setdefault(code, {**empty, "symbol": code}).update(factor)
+    return rows
+
+
+def to_models(rows):
+    """Unsaved ScreenerFactor objects of screener_rows()."""
+    return [ScreenerFactor(**row) for row in rows.values()]
@@ -0,0 +1,68 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import DataVersion, Identification, Performance, Qualdata, Sector
+
+# Names of the DataVersion rows of the versioned tables
+PERFORMANCE_DATA = "performance"
+IDENTIFICATION_DATA = "identification"
+SECTOR_DATA = "sector"
+QUALDATA_DATA = "qualdata"
+# Bumped by manage.py build_screener and build_scores
+SCREENER_DATA = "screener"
+SCORES_DATA = "scores"
+# Performance version the SymbolAnalytics table was built from, recorded by
+# manage.py build_analytics (and kept by load_prices --incremental)
+ANALYTICS_DATA = "analytics"
+
+REFERENCE_DATA = {
+    Identification: IDENTIFICATION_DATA,
+    Sector: SECTOR_DATA,
+    Qualdata: QUALDATA_DATA,
+}
+VERSIONED_DATA = {Performance: PERFORMANCE_DATA, **REFERENCE_DATA}
+
+# Data sets whose per-row bumps are deferred to the end of a bump_once block
+_deferred = ContextVar("deferred_versions", default=frozenset())
+
+
+@contextmanager
+def bump_once(model):
+    """
+    Bump the data version of a versioned model once for all writes of the block.
+
+    A queryset delete() sends post_delete for every row (the receivers disable
+    the fast delete), which would bump the version once per row.
+    """
+    name = VERSIONED_DATA[model]
+    token = _deferred.set(_deferred.get() | {name})
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+        DataVersion.bump(name)
+
+
+def _bump(name):
+    if name not in _deferred.get():
+        DataVersion.bump(name)
+
+
+@receiver(post_save, sender=Performance)
+@receiver(post_delete, sender=Performance)
+def performance_changed(sender, **kwargs):
+    # bulk_create and queryset update() skip these signals, commands that use them
+    # call DataVersion.bump(PERFORMANCE_DATA) themselves. A queryset delete() sends
+    # post_delete per row, wrap it in bump_once to bump a single time
+    _bump(PERFORMANCE_DATA)
+
+
+@receiver([post_save, post_delete], sender=Identification)
+@receiver([post_save, post_delete], sender=Sector)
+@receiver([post_save, post_delete], sender=Qualdata)
+def reference_data_changed(sender, **kwargs):
+    # Same as above, bulk writes of reference data must bump the version themselves
+    _bump(REFERENCE_DATA[sender])
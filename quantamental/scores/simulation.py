@@ -0,0 +1,239 @@
+from collections import namedtuple
+
+import numpy as np
+
+from .executor import map_chunks
+from .optimization import TRADING_DAYS, estimate, nearest_psd
+
+METHODS = ["normal", "t", "bootstrap"]
+
+# Rebalancing of the simulated portfolios to the target weights, every n trading days
+SIMULATION_SCHEDULES = {"monthly": 21, "quarterly": 63, "annual": 252, "none": None}
+
+# Trading days simulated per array operation, the rebalancing periods are multiples of it
+BLOCK_STEPS = 21
+
+# Size of the largest array of a chunk (block steps x paths x assets). The paths
+# of a chunk follow from it, so a chunk is memory bounded and the result does not
+# depend on the number of workers
+CHUNK_ELEMENTS = 2_000_000
+
+# Defaults of the fan chart and the distributions
+FAN_POINTS = 126
+FAN_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+HISTOGRAM_BINS = 50
+
+# Degrees of freedom of the t distribution and mean block length (trading days)
+# of the stationary bootstrap
+T_DOF = 5
+BLOCK_LENGTH = 21
+
+# Daily return model of the assets and target weights of the portfolio. returns are
+# the historical days x assets returns of the bootstrap, mean and factor (factor @
+# factor.T is the covariance) the daily moments of the parametric methods
+Model = namedtuple(
+    "Model",
+    ["method", "weights", "mean", "factor", "returns", "dof", "block_length", "period"],
+)
+
+
+def make_model(
+    returns,
+    weights,
+    method="normal",
+    estimator="ledoit_wolf",
+    dof=T_DOF,
+    block_length=BLOCK_LENGTH,
+    schedule="quarterly",
+):
+    """
+    Return model of a portfolio from historical daily returns.
+
+    Parameters:
+    returns (pd.DataFrame): Date x asset daily returns without missing values.
+    weights (array-like): Target weights in column order, the rest is cash (0%).
+    method (str): "normal" or "t" (multivariate, with the mean and covariance of
+    the estimator) or "bootstrap" (stationary block bootstrap of the days).
+    estimator (str): Covariance estimator of the parametric methods, see estimate().
+    dof (float): Degrees of freedom of the t distribution (> 2).
+    block_length (float): Mean block length in days of the bootstrap.
+    schedule (str): Rebalancing schedule, one of SIMULATION_SCHEDULES.
+
+    Returns:
+    Model: Daily return model.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown simulation method: {method}")
+
+    mean = factor = None
+    if method != "bootstrap":
+        result = estimate(returns, estimator)
+        mean = result.mean / TRADING_DAYS
+        # Eigen factor instead of Cholesky, the covariance may be singular
+        values, vectors = np.linalg.eigh(nearest_psd(result.covariance / TRADING_DAYS))
+        factor = vectors * np.sqrt(np.maximum(values, 0.0))
+
+    return Model(
+        method,
+        np.asarray(weights, dtype=float),
+        mean,
+        factor,
+        returns.to_numpy(dtype=float),
+        float(dof),
+        float(block_length),
+        SIMULATION_SCHEDULES[schedule],
+    )
+
+
+def fan_steps(horizon, points=FAN_POINTS):
+    """Trading days of the fan chart, evenly spaced from 0 to the horizon."""
+    return np.unique(np.linspace(0, horizon, min(horizon, points) + 1).round()).astype(
+        int
+    )
+
+
+def chunk_paths(n_assets):
+    """Paths per chunk of a portfolio of n_assets (see CHUNK_ELEMENTS)."""
+    return max(1, CHUNK_ELEMENTS // (BLOCK_STEPS * n_assets))
+
+
+def simulate(model, n_paths, horizon, seed, kind=None, max_workers=None):
+    """
+    Simulate future wealth paths of a portfolio.
+
+    The paths are split into chunks that run on the executor pool
+    (scores/executor.py). Every chunk has its own random generator spawned from
+    the seed, so the same seed gives the same paths on any pool.
+
+    Parameters:
+    model (Model): Return model, see make_model().
+    n_paths (int): Number of paths.
+    horizon (int): Trading days simulated.
+    seed (int): Seed of the random generators.
+    kind, max_workers: Executor pool, see map_chunks().
+
+    Returns:
+    tuple: (fan steps, paths x steps float32 wealth at the fan steps, terminal
+    wealth and maximum drawdown of every path). Wealth starts at 1.
+    """
+    steps = fan_steps(horizon)
+    size = chunk_paths(len(model.weights))
+    sizes = [min(size, n_paths - start) for start in range(0, n_paths, size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    chunks = map_chunks(
+        simulate_chunk,
+        [(model, n, horizon, steps, s) for n, s in zip(sizes, seeds)],
+        kind,
+        max_workers,
+    )
+    fan, terminal, drawdown = (np.concatenate(arrays) for arrays in zip(*chunks))
+    return steps, fan, terminal, drawdown
+
+
+def simulate_chunk(model, n_paths, horizon, steps, seed):
+    """
+    Simulate one chunk of paths (see simulate).
+
+    Days are drawn BLOCK_STEPS at a time for all paths, the holdings drift with
+    the returns and are reset to the target weights on rebalancing days. Returns
+    below -100% (far tails of the parametric methods) are cut at -100%.
+    """
+    rng = np.random.default_rng(seed)
+    weights = model.weights
+    holdings = np.tile(weights, (n_paths, 1))
+    cash = np.full(n_paths, 1.0 - weights.sum())
+    peak = np.ones(n_paths)
+    drawdown = np.zeros(n_paths)
+    wealth = np.ones(n_paths)
+    index = None
+
+    fan = np.empty((n_paths, len(steps)), dtype=np.float32)
+    fan[:, steps == 0] = 1.0
+
+    for start in range(0, horizon, BLOCK_STEPS):
+        n_steps = min(BLOCK_STEPS, horizon - start)
+        if model.period and start and start % model.period == 0:
+            holdings = wealth[:, None] * weights
+            cash = wealth * (1.0 - weights.sum())
+
+        if model.method == "bootstrap":
+            returns, index = _bootstrap_returns(model, rng, n_steps, n_paths, index)
+        else:
+            returns = _parametric_returns(model, rng, n_steps, n_paths)
+        growth = np.cumprod(1.0 + np.maximum(returns, -1.0), axis=0)
+
+        # Days x paths wealth of the block
+        values = (growth * holdings).sum(axis=2) + cash
+        holdings = holdings * growth[-1]
+        wealth = values[-1]
+
+        peaks = np.maximum(np.maximum.accumulate(values, axis=0), peak)
+        drawdown = np.minimum(drawdown, (values / peaks - 1.0).min(axis=0))
+        peak = peaks[-1]
+
+        in_block = (steps > start) & (steps <= start + n_steps)
+        fan[:, in_block] = values[steps[in_block] - start - 1].T
+
+    return fan, wealth, drawdown
+
+
+def summarize(steps, fan, terminal, drawdown, quantiles=FAN_QUANTILES):
+    """
+    Fan bands and distributions of simulated paths.
+
+    Returns:
+    dict: fan (quantiles x steps float32 bands), terminalWealth and maxDrawdown
+    (mean, quantiles and histogram) and the probability of a loss at the horizon.
+    """
+    return {
+        "fan": {
+            "steps": steps,
+            "quantiles": quantiles,
+            "bands": np.quantile(fan, quantiles, axis=0).astype(np.float32),
+        },
+        "terminalWealth": _distribution(terminal, quantiles),
+        "maxDrawdown": _distribution(drawdown, quantiles),
+        "probabilityOfLoss": float((terminal < 1.0).mean()),
+    }
+
+
+def _distribution(values, quantiles):
+    counts, edges = np.histogram(values, bins=HISTOGRAM_BINS)
+    return {
+        "mean": float(values.mean()),
+        "quantiles": np.quantile(values, quantiles),
+        "histogram": {"edges": edges, "counts": counts},
+    }
+
+
+def _parametric_returns(model, rng, n_steps, n_paths):
+    """Days x paths x assets multivariate normal or t daily returns."""
+    shocks = rng.standard_normal((n_steps, n_paths, len(model.mean))) @ model.factor.T
+    if model.method == "t":
+        # Normal variance mixture, scaled to the covariance of the model
+        chi2 = rng.chisquare(model.dof, size=(n_steps, n_paths, 1))
+        shocks *= np.sqrt((model.dof - 2.0) / chi2)
+    return model.mean + shocks
+
+
+def _bootstrap_returns(model, rng, n_steps, n_paths, index):
+    """
+    Days x paths x assets historical daily returns of a stationary bootstrap.
+
+    Every path continues with the next historical day (circularly) or, with
+    probability 1 / block_length, jumps to a random day. index is the historical
+    day of the previous step of every path, None before the first step.
+    """
+    n_days = len(model.returns)
+    jump = rng.random((n_steps, n_paths)) < 1.0 / model.block_length
+    targets = rng.integers(n_days, size=(n_steps, n_paths))
+    if index is None:
+        jump[0] = True
+        index = targets[0]
+
+    days = np.empty((n_steps, n_paths), dtype=np.intp)
+    for step in range(n_steps):
+        index = np.where(jump[step], targets[step], (index + 1) % n_days)
+        days[step] = index
+    return model.returns[days], index
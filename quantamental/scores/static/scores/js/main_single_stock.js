@@ -15,29 +15,33 @@ d3.json(sankeyStocks).then(data => { // Fetches data from the specified JSON fil
     sankeyChart = new SankeyChart(_parentElement = "#sankey-chart-area", _data = data[ticker], _dimension = { width: 900, height: 350 });
 })
 
-// Qualitative Table
-axios.get(output1, {
-    params: {
-        ticker: $('.form-select').val() // Additional data like ticker
-    }
-}).then(response => {
-    const data = response.data;
-    horTable = new HorizontalTable(_tableid = "table_description", _data = data);
-}).catch(error => {
-    console.error('Error fetching data:', error);
-});
-
-// Qualitative Table
-axios.get(output2, {
-    params: {
-        ticker: $('.form-select').val() // Additional data like ticker
-    }
-}).then(response => {
-    const data = response.data;
-    horTable = new HorizontalTable(_tableid = "table_qualitative_data", _data = data);
-}).catch(error => {
-    console.error('Error fetching data:', error);
-});
+// Description and Qualitative Table (one request for both tables)
+const loadQualitativeTables = () => {
+    axios.get(qualdataLink, {
+        params: {
+            ticker: [$('.form-select').val()], // Sent as ticker[]
+            fields: ["description", "name", "exchange", "sector", "beta", "mcap", "dividendYield"]
+        }
+    }).then(response => {
+        const data = response.data;
+        const description = data.map(row => ({ description: row.description }));
+        const qualitative = data.map(row => ({
+            name: row.name,
+            ticker: row.ticker,
+            exchange: row.exchange,
+            sector: row.sector,
+            beta: row.beta,
+            mcap: row.mcap,
+            dividendYield: row.dividendYield
+        }));
+        horTable = new HorizontalTable(_tableid = "table_description", _data = description);
+        horTable = new HorizontalTable(_tableid = "table_qualitative_data", _data = qualitative);
+    }).catch(error => {
+        console.error('Error fetching data:', error);
+    });
+}
+
+loadQualitativeTables()
 
 
 
@@ -86,29 +90,8 @@ d3.json(groupedbar2).then(data => {
 
 
 const updateSingleStockView = () => {
-    // Description
-    axios.get(output1, {
-        params: {
-            ticker: $('.form-select').val() // Additional data like ticker
-        }
-    }).then(response => {
-        const data = response.data;
-        horTable = new HorizontalTable(_tableid = "table_description", _data = data);
-    }).catch(error => {
-        console.error('Error fetching data:', error);
-    });
-
-    // Qualitative Table
-    axios.get(output2, {
-        params: {
-            ticker: $('.form-select').val() // Additional data like ticker
-        }
-    }).then(response => {
-        const data = response.data;
-        horTable = new HorizontalTable(_tableid = "table_qualitative_data", _data = data);
-    }).catch(error => {
-        console.error('Error fetching data:', error);
-    });
+    // Description and Qualitative Table
+    loadQualitativeTables()
 
     // Sankey Update
     d3.json(sankeyStocks).then(data => { // Fetches data from the specified JSON file
@@ -0,0 +1,95 @@
+import base64
+import json
+from datetime import date
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+# Rows fetched from the database cursor and encoded per chunk
+STREAM_CHUNK_SIZE = 2000
+
+# Streamed response formats: a JSON array (same bytes as JsonResponse) or one row per line
+STREAM_CONTENT_TYPES = {"rows": "application/json", "ndjson": "application/x-ndjson"}
+
+
+def encode_cursor(symbol, trade_date):
+    """Opaque keyset cursor of the last row of a page."""
+    key = json.dumps([symbol, trade_date.isoformat()])
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(symbol, trade_date) of a cursor, raises ValueError if it is invalid."""
+    try:
+        symbol, trade_date = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(symbol), date.fromisoformat(trade_date)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+
+
+def stream_rows(rows, output_format="rows", chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Encode an iterator of row dicts chunk by chunk.
+
+    Only one chunk of rows is held in memory at a time, so the memory of the
+    response does not grow with the number of rows.
+
+    Parameters:
+    rows (iterator): Row dicts, e.g. QuerySet.values().iterator(chunk_size).
+    output_format (str): "rows" or "ndjson".
+    chunk_size (int): Number of rows encoded per yielded string.
+
+    Returns:
+    generator: JSON text chunks.
+    """
+    encode = DjangoJSONEncoder().encode
+    first = True
+    if output_format == "rows":
+        yield "["
+    while chunk := list(islice(rows, chunk_size)):
+        yield _encode_chunk(encode, chunk, output_format, first)
+        first = False
+    if output_format == "rows":
+        yield "]"
+
+
+async def astream_rows(rows, output_format="rows", chunk_size=STREAM_CHUNK_SIZE):
+    """Async version of stream_rows for async row iterators (QuerySet.aiterator)."""
+    encode = DjangoJSONEncoder().encode
+    first = True
+    if output_format == "rows":
+        yield "["
+    chunk = []
+    async for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield _encode_chunk(encode, chunk, output_format, first)
+            first = False
+            chunk = []
+    if chunk:
+        yield _encode_chunk(encode, chunk, output_format, first)
+    if output_format == "rows":
+        yield "]"
+
+
+def _encode_chunk(encode, chunk, output_format, first):
+    if output_format == "ndjson":
+        return "".join(encode(row) + "\n" for row in chunk)
+    # The chunk as a list without its brackets, same separators as the whole list
+    text = encode(chunk)[1:-1]
+    return text if first else ", " + text
+
+
+class StreamingJsonResponse(StreamingHttpResponse):
+    """
+    Streamed JSON array or NDJSON response of row dicts.
+
+    next_cursor is sent in the X-Next-Cursor header when there is another page.
+    """
+
+    def __init__(self, chunks, output_format="rows", next_cursor=None, **kwargs):
+        kwargs.setdefault("content_type", STREAM_CONTENT_TYPES[output_format])
+        super().__init__(chunks, **kwargs)
+        if next_cursor is not None:
+            self["X-Next-Cursor"] = next_cursor
@@ -1,3 +1,921 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.http import JsonResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .analytics import materialized_rolling_statistics
+from .batch import BATCH_SCHEDULES, batch_values, sample_weights
+from .benchmarks import synthetic_panel
+from .cache import ANALYTICS_CACHE
+from .executor import Ref, StageGraph, run_stages
+from .incremental import load_state
+from .metrics import collect_timings
+from .models import DataVersion, Identification, Performance, Sector
+from .optimization import make_constraints, min_variance, project
+from .panel import PricePanel
+from .price_store import get_price_store, read_closes
+from .rebalancing import rebalance
+from .scoring import (
+    has_recent_close,
+    price_factors as scoring_factors,
+    score_dates,
+    score_history,
+    sector_zscores,
+)
+from .screener import (
+    DRAWDOWN_WINDOWS,
+    RETURN_WINDOWS,
+    VOLATILITY_WINDOWS,
+    match_codes,
+    price_factors,
+)
+from .signals import PERFORMANCE_DATA, bump_once
+from .simulation import METHODS, make_model, simulate
+from .utils import (
+    calculate_portfolio_panel,
+    drawdown_episodes,
+    drawdown_series,
+    rolling_beta,
+    rolling_statistics,
+)
+from .views import SECTOR_COLUMNS
+
+
+class ProjectionTests(SimpleTestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+        self.symbols = [f"S{i}" for i in range(12)]
+        sectors = {symbol: f"G{i % 3}" for i, symbol in enumerate(self.symbols)}
+        sectors["S11"] = None
+        self.constraints = make_constraints(
+            self.symbols, 0.01, 0.2, sectors, {"G0": 0.3, "G1": 0.25}
+        )
+
+    def assertFeasible(self, w):
+        lower, upper, groups, caps = self.constraints
+        self.assertAlmostEqual(w.sum(), 1.0, places=10)
+        self.assertTrue(np.all(w >= lower - 1e-12))
+        self.assertTrue(np.all(w <= upper + 1e-12))
+        self.assertTrue(np.all(np.bincount(groups, w) <= caps + 1e-12))
+
+    def test_projection_is_feasible_and_idempotent(self):
+        for scale in [0.01, 1.0, 100.0]:
+            w = project(self.rng.normal(scale=scale, size=12), self.constraints)
+            self.assertFeasible(w)
+            np.testing.assert_allclose(project(w, self.constraints), w, atol=1e-12)
+
+    def test_projection_is_the_closest_feasible_point(self):
+        # (v - p)'(w - p) <= 0 for every feasible w
+        v = self.rng.normal(size=12)
+        p = project(v, self.constraints)
+        for _ in range(100):
+            w = project(self.rng.normal(size=12), self.constraints)
+            self.assertLessEqual((v - p) @ (w - p), 1e-10)
+
+    def test_infeasible_constraints_raise(self):
+        with self.assertRaises(ValueError):
+            make_constraints(["A", "B"], upper=0.3)
+        with self.assertRaises(ValueError):
+            make_constraints(["A", "B"], lower=0.6)
+        with self.assertRaises(ValueError):
+            make_constraints(["A", "B"], sectors={"A": "X", "B": "X"}, sector_caps=0.5)
+        with self.assertRaises(ValueError):
+            make_constraints(["A", "B"], lower={"A": None})
+
+
+class MinVarianceTests(SimpleTestCase):
+    def test_two_assets_match_the_closed_form(self):
+        covariance = np.array([[0.04, 0.006], [0.006, 0.09]])
+        (a, c), (_, b) = covariance
+        expected = (b - c) / (a + b - 2 * c)
+
+        solution = min_variance(covariance, make_constraints(["A", "B"]))
+        self.assertTrue(solution.converged)
+        np.testing.assert_allclose(
+            solution.weights, [expected, 1 - expected], atol=1e-7
+        )
+
+    def test_two_assets_at_a_bound(self):
+        covariance = np.array([[0.04, 0.006], [0.006, 0.09]])
+        constraints = make_constraints(["A", "B"], upper={"A": 0.5})
+        solution = min_variance(covariance, constraints)
+        np.testing.assert_allclose(solution.weights, [0.5, 0.5], atol=1e-7)
+
+
+class BatchValuesTests(SimpleTestCase):
+    def test_batch_values_match_every_single_portfolio(self):
+        # The second asset is only listed in the second half (NaN before), the
+        # last rows are partly in cash
+        prices = synthetic_panel(20, 3, seed=1).prices.iloc[:, :3]
+        weights = np.vstack(
+            [sample_weights(3, 2, seed=2), [0.2, 0.3, 0.4], [0.3, 0.3, 0.0]]
+        )
+
+        for schedule in BATCH_SCHEDULES:
+            values = batch_values(prices, weights, schedule)
+            for column, row in zip(values.T, weights):
+                expected = calculate_portfolio_panel(row, prices, "pf", schedule)
+                np.testing.assert_allclose(
+                    column, expected.prices["pf"].to_numpy(), rtol=1e-12
+                )
+
+
+def reference_values(prices, weights, rebalance_dates, start_value=100.0):
+    """Day by day portfolio value with the rest of the weights in cash at 0%."""
+    closes = prices.ffill().to_numpy(dtype=float)
+    first = closes[np.argmax(~np.isnan(closes), axis=0), np.arange(closes.shape[1])]
+    growth = np.where(np.isnan(closes), 1.0, closes / first)
+
+    holdings = start_value * weights
+    cash = start_value * (1 - weights.sum())
+    values = [start_value]
+    for t in range(1, len(growth)):
+        holdings = holdings * growth[t] / growth[t - 1]
+        values.append(holdings.sum() + cash)
+        if prices.index[t] in rebalance_dates:
+            holdings = values[-1] * weights
+            cash = values[-1] * (1 - weights.sum())
+    return np.array(values)
+
+
+class RebalanceTests(SimpleTestCase):
+    def setUp(self):
+        self.prices = synthetic_panel(20, 4, seed=1).prices.iloc[:, :3]
+
+    def test_quarterly_matches_the_daily_loop(self):
+        weights = np.array([0.5, 0.3, 0.2])
+        result = rebalance(self.prices, weights, "quarterly")
+        # Last trading day of every quarter but the final one
+        dates = self.prices.index
+        quarter_ends = dates[:-1][dates.to_period("Q")[1:] != dates.to_period("Q")[:-1]]
+        np.testing.assert_array_equal(result.rebalance_dates[1:], quarter_ends)
+        np.testing.assert_allclose(
+            result.values, reference_values(self.prices, weights, quarter_ends)
+        )
+
+    def test_weights_below_one_hold_cash(self):
+        weights = np.array([0.3, 0.3, 0.0])
+        for schedule in ["none", "quarterly", "drift"]:
+            result = rebalance(self.prices, weights, schedule, band=0.05)
+            self.assertEqual(result.values.iloc[0], 100.0)
+            np.testing.assert_allclose(
+                result.values,
+                reference_values(self.prices, weights, result.rebalance_dates[1:]),
+            )
+
+        # Buy and hold keeps 40% at 0%
+        growth = (
+            self.prices.ffill().bfill().iloc[-1] / self.prices.ffill().bfill().iloc[0]
+        )
+        self.assertAlmostEqual(
+            rebalance(self.prices, weights, "none").values.iloc[-1],
+            100 * (0.4 + 0.3 * growth.iloc[0] + 0.3 * growth.iloc[1]),
+        )
+
+    def test_drift_rebalances_on_the_first_breach(self):
+        weights = np.array([0.3, 0.3, 0.2])
+        result = rebalance(self.prices, weights, "drift", band=0.05)
+        deviation = (result.weights - weights).abs().max(axis=1)
+        breaches = deviation.index[deviation > 0.05]
+        self.assertGreater(len(result.rebalance_dates), 1)
+        # Every breach is a rebalancing date, so no weight drifts further
+        np.testing.assert_array_equal(breaches, result.rebalance_dates[1:])
+
+
+class LoadPricesTestCase(TestCase):
+    """Loads date x symbol close frames with manage.py load_prices."""
+
+    def setUp(self):
+        self.prices = synthetic_panel(2, 2, seed=3).prices.iloc[:, :2]
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def load(self, prices, name, *args):
+        path = os.path.join(self.directory.name, name)
+        rows = prices.stack().rename("close").reset_index()
+        rows["date"] = rows["date"].dt.strftime("%Y-%m-%d")
+        rows.to_csv(path, index=False)
+        output = StringIO()
+        call_command("load_prices", path, "--incremental", *args, stdout=output)
+        return output.getvalue()
+
+
+class IncrementalLoadTests(LoadPricesTestCase):
+
+    def test_states_match_the_full_history(self):
+        self.load(self.prices.iloc[:-5], "history.csv")
+        self.load(self.prices.iloc[-10:], "update.csv")
+
+        returns = self.prices.pct_change()
+        statistics = rolling_statistics(returns, [252])[252]
+        drawdowns = drawdown_series(self.prices)
+        for symbol in self.prices.columns:
+            values = load_state(symbol).values()
+            self.assertAlmostEqual(values["drawdown"], drawdowns[symbol].iloc[-1])
+            self.assertAlmostEqual(
+                values["rolling_return"], statistics["return"][symbol].iloc[-1]
+            )
+            self.assertAlmostEqual(
+                values["rolling_volatility"],
+                statistics["volatility"][symbol].iloc[-1],
+            )
+
+    def test_load_without_new_rows(self):
+        self.load(self.prices, "history.csv")
+        output = self.load(self.prices.iloc[-10:], "update.csv")
+        self.assertIn("Updated 0 analytics states", output)
+
+
+def create_prices(prices):
+    """Performance rows of a date x symbol close frame (NaN is no row)."""
+    Performance.objects.bulk_create(
+        Performance(
+            symbol=symbol,
+            date=date.strftime("%d.%m.%Y"),
+            trade_date=date.date(),
+            close=round(close, 2),
+        )
+        for (date, symbol), close in prices.stack().items()
+    )
+
+
+class PriceStoreTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings = override_settings(
+            PRICE_STORE_DIR=os.path.join(self.directory.name, "prices")
+        )
+        self.settings.enable()
+
+        # OLD widens the date axis of the store on both sides of AAA and BBB
+        prices = synthetic_panel(2, 3, seed=4).prices
+        prices.columns = ["AAA", "BBB"]
+        old = synthetic_panel(1, 5, seed=5).prices.set_axis(["OLD"], axis=1)
+        self.prices = prices.iloc[100:-100]
+        create_prices(pd.concat([self.prices, old], axis=1))
+
+        self.user = User.objects.create_user("store")
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        self.settings.disable()
+        self.directory.cleanup()
+
+    def test_store_matches_the_database(self):
+        call_command("build_price_store", stdout=StringIO())
+        store = get_price_store()
+        self.assertIsNotNone(store)
+        panel = store.panel(["AAA", "BBB", "OLD"])
+        pd.testing.assert_frame_equal(
+            panel.dropna(how="all"), read_closes(), check_freq=False
+        )
+
+    def test_stale_store_is_not_used(self):
+        call_command("build_price_store", stdout=StringIO())
+        store = get_price_store()
+        self.assertIsNotNone(store)
+
+        # A new price bumps the Performance version (post_save)
+        date = pd.Timestamp(store.dates[-1]) + pd.offsets.BDay()
+        Performance.objects.create(
+            symbol="AAA",
+            date=date.strftime("%d.%m.%Y"),
+            trade_date=date.date(),
+            close=123,
+        )
+        self.assertIsNone(get_price_store())
+
+        call_command("build_price_store", "--append", stdout=StringIO())
+        store = get_price_store()
+        self.assertIsNotNone(store)
+        self.assertEqual(store.panel(["AAA"], from_date=date)["AAA"].tolist(), [123.0])
+
+    def test_aggregated_performance_does_not_depend_on_the_store(self):
+        query = {"ticker[]": ["AAA", "BBB"], "weights": "[0.5, 0.5]"}
+        url = "/pf_view_aggregated_performance/"
+        without_store = self.client.get(url, query).json()
+        call_command("build_price_store", stdout=StringIO())
+        self.assertIsNotNone(get_price_store())
+        with_store = self.client.get(url, query).json()
+
+        self.assertEqual(len(without_store), len(self.prices))
+        self.assertEqual(with_store, without_store)
+
+
+class DateFormatTests(LoadPricesTestCase):
+    def write(self, lines):
+        path = os.path.join(self.directory.name, "prices.csv")
+        with open(path, "w") as file:
+            file.write("\n".join(["symbol,date,close", *lines]))
+        return path
+
+    def load_file(self, path, *args):
+        call_command("load_prices", path, *args, stdout=StringIO())
+        return list(Performance.objects.order_by("trade_date").values_list("date"))
+
+    def test_day_first_dates_are_detected_from_the_sample(self):
+        path = self.write(["AAA,05/01/2024,1", "AAA,25/01/2024,2"])
+        self.assertEqual(self.load_file(path), [("05.01.2024",), ("25.01.2024",)])
+
+    def test_ambiguous_dates_need_a_format(self):
+        path = self.write(["AAA,05/01/2024,1", "AAA,06/01/2024,2"])
+        with self.assertRaisesMessage(CommandError, "Ambiguous date format"):
+            self.load_file(path)
+        self.assertEqual(
+            self.load_file(path, "--date-format", "%d/%m/%Y"),
+            [("05.01.2024",), ("06.01.2024",)],
+        )
+
+
+class MaterializedAnalyticsTests(LoadPricesTestCase):
+    def statistics(self, panel):
+        statistics = materialized_rolling_statistics(panel)
+        if statistics is not None:
+            expected = rolling_statistics(panel.daily_returns, [252])[252]
+            for field in ["return", "volatility"]:
+                pd.testing.assert_frame_equal(
+                    statistics[field], expected[field], check_names=False
+                )
+        return statistics
+
+    def test_materialized_statistics_match_the_panel(self):
+        self.load(self.prices.iloc[:-5], "history.csv")
+        call_command("build_analytics", stdout=StringIO())
+        panel = PricePanel(read_closes()).restrict(self.prices.index[100:])
+        self.assertIsNotNone(self.statistics(panel))
+
+        # Incremental loads append the new dates and keep the table current
+        self.load(self.prices.iloc[-10:], "update.csv")
+        self.assertIsNotNone(self.statistics(PricePanel(read_closes())))
+
+    def test_stale_table_is_not_used(self):
+        self.load(self.prices, "history.csv")
+        call_command("build_analytics", stdout=StringIO())
+        Performance.objects.filter(trade_date=self.prices.index[-1]).first().save()
+        self.assertIsNone(self.statistics(PricePanel(read_closes())))
+
+        call_command("build_analytics", stdout=StringIO())
+        self.assertIsNotNone(self.statistics(PricePanel(read_closes())))
+
+    def test_panel_with_missing_closes_is_computed(self):
+        # A close of one symbol is missing, its window differs from its own days
+        self.load(self.prices.drop(self.prices.index[300])[["SYM00000"]], "a.csv")
+        self.load(self.prices[["SYM00001"]], "b.csv")
+        call_command("build_analytics", stdout=StringIO())
+        self.assertIsNone(self.statistics(PricePanel(read_closes())))
+
+
+class RunStagesTests(SimpleTestCase):
+    def test_stages_are_recorded_on_every_pool(self):
+        for kind in ["serial", "thread"]:
+            graph = StageGraph({"x": 2})
+            square = graph.add("square", pow, Ref("x"), 2)
+            graph.add("total", sum, [1, 2])
+            graph.add("cube", pow, square, 3)
+            with collect_timings() as timings:
+                results = run_stages(graph, kind)
+            self.assertEqual(results.values["cube"], 64)
+            self.assertEqual(
+                set(timings.durations), {"square", "total", "cube", "analytics"}
+            )
+
+
+class DataVersionTests(TestCase):
+    def setUp(self):
+        create_prices(synthetic_panel(2, 1, seed=6).prices.iloc[:20])
+
+    def test_queryset_delete_bumps_per_row(self):
+        version = DataVersion.current(PERFORMANCE_DATA)
+        Performance.objects.filter(symbol="SYM00000").delete()
+        self.assertEqual(DataVersion.current(PERFORMANCE_DATA), version + 20)
+
+    def test_bump_once(self):
+        version = DataVersion.current(PERFORMANCE_DATA)
+        with bump_once(Performance):
+            Performance.objects.all().delete()
+            self.assertEqual(DataVersion.current(PERFORMANCE_DATA), version)
+        self.assertEqual(DataVersion.current(PERFORMANCE_DATA), version + 1)
+
+
+def reference_betas(asset, benchmark, window):
+    """Blume adjusted rolling beta of one pair with np.cov and np.var per window."""
+    aligned = pd.concat([asset, benchmark], axis=1, keys=["asset", "benchmark"])
+    aligned = aligned.dropna()
+    beta = (
+        aligned["asset"]
+        .rolling(window=window, min_periods=window)
+        .apply(
+            lambda x: np.cov(x, aligned.loc[x.index, "benchmark"])[0, 1]
+            / np.var(aligned.loc[x.index, "benchmark"]),
+            raw=False,
+        )
+    )
+    return (0.67 * beta + 0.33).dropna()
+
+
+class RollingBetaTests(SimpleTestCase):
+    def test_betas_match_the_pairwise_windows(self):
+        # A gap in the benchmark returns shifts the windows of every asset
+        returns = synthetic_panel(20, 4, seed=7).weekly_returns
+        assets = returns.iloc[:, :3]
+        benchmarks = returns.iloc[:, 3:5].copy()
+        benchmarks.iloc[60:64, 0] = np.nan
+
+        dates, betas = rolling_beta(assets, benchmarks, window=52)
+        self.assertEqual(betas.shape, (len(dates), 3, 2))
+        for i, asset in enumerate(assets.columns):
+            for j, benchmark in enumerate(benchmarks.columns):
+                expected = reference_betas(
+                    assets[asset], benchmarks[benchmark], window=52
+                )
+                beta = pd.Series(betas[:, i, j], index=dates).dropna()
+                pd.testing.assert_index_equal(beta.index, expected.index)
+                np.testing.assert_allclose(beta, expected, rtol=1e-9)
+
+
+class RollingStatisticsTests(SimpleTestCase):
+    def test_statistics_match_the_pandas_windows(self):
+        # A missing return leaves every window that holds it empty
+        returns = synthetic_panel(10, 3, seed=8).daily_returns
+        returns.iloc[400, 1] = np.nan
+
+        statistics = rolling_statistics(returns, [21, 252])
+        for window, frames in statistics.items():
+            rolling = returns.rolling(window)
+            pd.testing.assert_frame_equal(
+                frames["volatility"], rolling.std() * np.sqrt(252), rtol=1e-7
+            )
+            pd.testing.assert_frame_equal(
+                frames["return"],
+                (returns + 1).rolling(window).apply(np.prod, raw=True) - 1,
+                rtol=1e-9,
+            )
+
+
+def reference_episodes(series):
+    """Drawdown episodes of one close series with a loop over the dates."""
+    series = series.dropna()
+    cumulative_returns = series / series.iloc[0]
+    rolling_max = cumulative_returns.cummax()
+    drawdown = (cumulative_returns - rolling_max) / rolling_max
+
+    episodes = []
+    start = None
+    for date, dd in drawdown.items():
+        if dd < 0:
+            if start is None:
+                start, trough, depth = date, date, dd
+            elif dd < depth:
+                trough, depth = date, dd
+        elif start is not None:
+            episodes.append((start, trough, date, depth))
+            start = None
+    if start is not None:
+        episodes.append((start, trough, pd.NaT, depth))
+    return sorted(episodes, key=lambda episode: episode[3])
+
+
+class DrawdownEpisodeTests(SimpleTestCase):
+    def test_episodes_match_the_loop(self):
+        prices = synthetic_panel(20, 3, seed=9).prices
+        episodes = drawdown_episodes(prices)
+        self.assertEqual(list(episodes["symbol"].unique()), list(prices.columns))
+
+        for symbol, group in episodes.groupby("symbol", sort=False):
+            expected = reference_episodes(prices[symbol])
+            self.assertEqual(len(group), len(expected))
+            for episode, (start, trough, end, depth) in zip(
+                group.itertuples(), expected
+            ):
+                self.assertEqual(
+                    (episode.start, episode.trough, episode.recovery),
+                    (start, trough, end),
+                )
+                self.assertAlmostEqual(episode.depth, depth, places=12)
+
+
+class PerformanceEndpointTestCase(TestCase):
+    def setUp(self):
+        self.prices = synthetic_panel(4, 3, seed=10).prices
+        create_prices(self.prices)
+        self.user = User.objects.create_user("performance")
+        self.client.force_login(self.user)
+        self.params = {
+            "assetTicker[]": ["SYM00000", "SYM00001", "SYM00002"],
+            "assetWeights": "[0.5, 0.3, 0.2]",
+            "bmTicker[]": ["SYM00003"],
+            "bmWeights": "[1.0]",
+            "fromDate": '"2022-06-01"',
+            "toDate": '"2024-12-31"',
+        }
+
+
+class ColumnarFormatTests(PerformanceEndpointTestCase):
+    SERIES = {
+        "asset_performance": ["close"],
+        "portfolio_performance": ["close"],
+        "pf_bm_rolling_return": ["volatility", "return"],
+        "asset_rolling_return": ["volatility", "return"],
+        "portfolio_drawdown": ["drawdown"],
+        "portfolio_rolling_beta": ["beta"],
+        "asset_rolling_beta": ["beta"],
+    }
+
+    def test_columnar_payload_matches_the_rows(self):
+        rows = self.client.get("/pf_view_performance/", self.params).json()
+        columns = self.client.get(
+            "/pf_view_performance/", {**self.params, "format": "columnar"}
+        ).json()
+
+        for key, fields in self.SERIES.items():
+            dates = columns["beta_dates" if "beta" in key else "dates"]
+            for field in fields:
+                expected = {
+                    (row["symbol"], row["date"]): float(row[field]) for row in rows[key]
+                }
+                actual = {
+                    (symbol, date): value
+                    for symbol, series in columns[key].items()
+                    for date, value in zip(dates, series[field])
+                    if value is not None
+                }
+                self.assertEqual(actual.keys(), expected.keys(), key)
+                np.testing.assert_allclose(
+                    [actual[k] for k in expected],
+                    list(expected.values()),
+                    # Rows round prices to 2 and statistics to 6 decimals
+                    atol=0.005 if field == "close" else 1e-6,
+                    err_msg=key,
+                )
+
+        # The small tables keep their rows
+        for key in ["portfolio_top_drawdowns", "performance_metrics"]:
+            self.assertEqual(columns[key], rows[key])
+
+
+class PerformanceCacheTests(PerformanceEndpointTestCase):
+    def setUp(self):
+        super().setUp()
+        caches[ANALYTICS_CACHE].clear()
+
+    def get(self, **params):
+        return self.client.get("/pf_view_performance/", {**self.params, **params})
+
+    def test_repeated_request_is_a_hit(self):
+        miss = self.get()
+        self.assertEqual(miss["X-Cache"], "MISS")
+        hit = self.get(assetWeights="[0.50000000000000001, 0.3, 0.2]")
+        self.assertEqual(hit["X-Cache"], "HIT")
+        self.assertEqual(hit.content, miss.content)
+
+    def test_ticker_order_is_part_of_the_key(self):
+        self.get(format="columnar")
+        response = self.get(
+            **{"assetTicker[]": ["SYM00002", "SYM00001", "SYM00000"]},
+            assetWeights="[0.2, 0.3, 0.5]",
+            format="columnar",
+        )
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(
+            list(response.json()["asset_performance"]),
+            ["SYM00002", "SYM00001", "SYM00000"],
+        )
+
+    def test_price_write_invalidates_the_cache(self):
+        self.get()
+        Performance.objects.filter(symbol="SYM00000").last().save()
+        self.assertEqual(self.get()["X-Cache"], "MISS")
+        self.assertEqual(self.get()["X-Cache"], "HIT")
+
+    def test_errors_are_not_cached(self):
+        for _ in range(2):
+            response = self.get(assetWeights="[0.5, 0.5]")
+            self.assertEqual(response.status_code, 400)
+            self.assertNotIn("X-Cache", response)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        create_prices(synthetic_panel(3, 1, seed=11).prices.iloc[-20:])
+        self.user = User.objects.create_user("pages")
+        self.client.force_login(self.user)
+
+    def get(self, **params):
+        response = self.client.get("/performance/", params)
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content)
+
+    def test_stream_is_the_json_list(self):
+        rows = Performance.objects.order_by("symbol", "trade_date").values(
+            "id", "symbol", "date", "close"
+        )
+        _, content = self.get()
+        self.assertEqual(content, JsonResponse(list(rows), safe=False).content)
+
+    def test_pages_cover_every_row_once(self):
+        _, content = self.get()
+        expected = json.loads(content)
+
+        # A row inserted before the cursor does not shift the later pages
+        rows, params, pages = [], {"limit": 7}, 0
+        while True:
+            response, content = self.get(**params)
+            rows.extend(json.loads(content))
+            pages += 1
+            if pages == 1:
+                Performance.objects.create(
+                    symbol="AAA",
+                    date="02.12.2024",
+                    trade_date=pd.Timestamp("2024-12-02").date(),
+                    close=1,
+                )
+            if "X-Next-Cursor" not in response:
+                break
+            params["cursor"] = response["X-Next-Cursor"]
+
+        self.assertEqual(rows, expected)
+        self.assertEqual(pages, 9)
+
+    def test_ndjson_with_filters(self):
+        _, content = self.get(
+            **{"ticker[]": ["SYM00001"]},
+            fromDate="2024-12-10",
+            toDate="2024-12-20",
+            format="ndjson",
+        )
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        expected = Performance.objects.filter(
+            symbol="SYM00001",
+            trade_date__range=("2024-12-10", "2024-12-20"),
+        ).order_by("trade_date")
+        self.assertEqual([row["id"] for row in rows], [row.id for row in expected])
+        self.assertEqual(len(rows), 9)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/performance/", {"cursor": "x"})
+        self.assertEqual(response.status_code, 400)
+
+
+class UniverseTestCase(TestCase):
+    def setUp(self):
+        caches[ANALYTICS_CACHE].clear()
+        for i in range(30):
+            code = Identification.objects.create(
+                code=f"C{i:03d}", isin=f"XS{i:010d}", name=f"Company {i % 7}"
+            )
+            Sector.objects.create(
+                code=code,
+                sector="Sector",
+                industry="Industry",
+                gicSector=f"G{i % 3}",
+                gicGroup=f"G{i % 3}{i % 2}",
+                gicIndustry="I",
+                gicSubIndustry="S",
+            )
+        self.user = User.objects.create_user("universe")
+        self.client.force_login(self.user)
+
+
+class ConditionalGetTests(UniverseTestCase):
+    def test_unchanged_data_is_not_modified(self):
+        response = self.client.get("/data2/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertEqual(
+            response.json(),
+            list(Identification.objects.values("code", "isin", "name")),
+        )
+
+        revalidation = self.client.get("/data2/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(revalidation.status_code, 304)
+        self.assertEqual(revalidation.content, b"")
+
+    def test_write_changes_the_etag(self):
+        etag = self.client.get("/data2/")["ETag"]
+        code = Identification.objects.get(code="C000")
+        code.name = "Renamed"
+        code.save()
+
+        response = self.client.get("/data2/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()[0]["name"], "Renamed")
+
+    def test_compressed_body_is_the_json(self):
+        identity = self.client.get("/data/")
+        compressed = self.client.get("/data/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(compressed["Content-Encoding"], "gzip")
+        self.assertEqual(compressed["ETag"], identity["ETag"])
+        self.assertEqual(gzip.decompress(compressed.content), identity.content)
+
+
+class UniversePageTests(UniverseTestCase):
+    def pages(self, **params):
+        rows, offset = [], 0
+        while True:
+            page = self.client.get(
+                "/data/", {**params, "offset": offset, "pageSize": 7}
+            ).json()
+            rows.extend(page["rows"])
+            offset += 7
+            if offset >= page["total"]:
+                return page["total"], rows
+
+    def test_pages_match_the_sorted_universe(self):
+        universe = list(Sector.objects.values("pk", *SECTOR_COLUMNS))
+        universe.sort(key=lambda row: (row["gicSector"], row["pk"]), reverse=True)
+        for row in universe:
+            del row["pk"]
+
+        total, rows = self.pages(sort="gicSector", dir="desc")
+        self.assertEqual(total, 30)
+        self.assertEqual(rows, universe)
+
+    def test_filters_and_search(self):
+        total, rows = self.pages(**{"gicGroup[]": ["G00", "G11"], "q": "company 3"})
+        expected = [
+            f"C{i:03d}"
+            for i in range(30)
+            if f"G{i % 3}{i % 2}" in ["G00", "G11"] and i % 7 == 3
+        ]
+        self.assertEqual(total, len(expected))
+        self.assertEqual([row["code__code"] for row in rows], expected)
+
+    def test_invalid_parameters(self):
+        for params in [{"page": 0}, {"pageSize": 5000}, {"sort": "password"}]:
+            response = self.client.get("/data/", params)
+            self.assertEqual(response.status_code, 400)
+
+
+class SimulationTests(SimpleTestCase):
+    def setUp(self):
+        self.returns = synthetic_panel(3, 2, seed=12).daily_returns.dropna()
+        self.weights = [0.5, 0.3, 0.1]
+
+    @patch("scores.simulation.CHUNK_ELEMENTS", 21 * 3 * 100)
+    def test_same_seed_gives_the_same_paths_on_every_pool(self):
+        for method in METHODS:
+            model = make_model(self.returns, self.weights, method)
+            serial = simulate(model, 450, 100, seed=3, kind="serial")
+            thread = simulate(model, 450, 100, seed=3, kind="thread", max_workers=2)
+            for expected, actual in zip(serial, thread):
+                np.testing.assert_array_equal(actual, expected)
+
+            steps, fan, terminal, drawdown = serial
+            self.assertEqual(fan.shape, (450, len(steps)))
+            np.testing.assert_allclose(fan[:, -1], terminal, rtol=1e-6)
+            self.assertTrue(np.all(drawdown <= 0))
+
+    def test_constant_returns_match_the_closed_form(self):
+        # Every bootstrapped day is the same, so the paths are known
+        daily = np.array([0.001, -0.0005, 0.002])
+        returns = pd.DataFrame(np.tile(daily, (50, 1)))
+        weights = np.array(self.weights)
+        cash = 1 - weights.sum()
+
+        for schedule, periods in [("quarterly", 4), ("none", 1)]:
+            model = make_model(returns, weights, "bootstrap", schedule=schedule)
+            _, _, terminal, drawdown = simulate(model, 10, 252, seed=4, kind="serial")
+            period = weights @ (1 + daily) ** (252 // periods) + cash
+            np.testing.assert_allclose(terminal, period**periods, rtol=1e-12)
+            np.testing.assert_array_equal(drawdown, 0.0)
+
+
+def reference_price_factors(series):
+    """Screener price factors of one close series with pandas."""
+    closes = series.dropna()
+    returns = closes.pct_change()
+    row = {"trade_date": closes.index[-1].date()}
+    for name, window in RETURN_WINDOWS.items():
+        row[f"return_{name}"] = (
+            closes.iloc[-1] / closes.iloc[-1 - window] - 1
+            if len(closes) > window
+            else np.nan
+        )
+    for name, window in VOLATILITY_WINDOWS.items():
+        row[f"volatility_{name}"] = (
+            returns.iloc[-window:].std() * np.sqrt(252)
+            if len(closes) > window
+            else np.nan
+        )
+    for name, window in DRAWDOWN_WINDOWS.items():
+        values = closes.iloc[-1 - window :]
+        row[f"max_drawdown_{name}"] = (
+            (values / values.cummax() - 1).min() if len(closes) > window else np.nan
+        )
+    row["drawdown"] = closes.iloc[-1] / closes.max() - 1
+    return row
+
+
+class ScreenerFactorTests(SimpleTestCase):
+    def test_factors_match_pandas(self):
+        # SYM00000 is listed late, SYM00001 misses closes and stops early
+        prices = synthetic_panel(4, 4, seed=13).prices
+        prices.iloc[:800, 0] = np.nan
+        prices.iloc[500:510, 1] = np.nan
+        prices.iloc[-3:, 1] = np.nan
+
+        factors = price_factors(prices)
+        expected = pd.DataFrame.from_dict(
+            {symbol: reference_price_factors(prices[symbol]) for symbol in prices},
+            orient="index",
+        )
+        pd.testing.assert_frame_equal(factors, expected[factors.columns], rtol=1e-9)
+        self.assertTrue(np.isnan(factors.loc["SYM00000", "return_1y"]))
+
+    def test_match_codes(self):
+        codes = ["AAPL US", "VOD LN", "VOD US", "MSFT"]
+        self.assertEqual(
+            match_codes(codes, ["AAPL", "VOD", "MSFT", "MXWO", "VOD LN"]),
+            {
+                "AAPL": "AAPL US",
+                "VOD": "VOD",
+                "MSFT": "MSFT",
+                "MXWO": "MXWO",
+                "VOD LN": "VOD LN",
+            },
+        )
+
+
+def reference_zscores(values, groups, min_size=5, cap=3.0):
+    """Sector z-scores of a dates x names array with a loop over the cells."""
+    zscores = np.full(values.shape, np.nan)
+    for t, row in enumerate(values):
+        for j, value in enumerate(row):
+            peers = row[groups == groups[j]] if groups[j] >= 0 else row[:0]
+            if np.count_nonzero(~np.isnan(peers)) < min_size:
+                peers = row
+            peers = peers[~np.isnan(peers)]
+            zscores[t, j] = (value - peers.mean()) / peers.std(ddof=1)
+    return np.clip(zscores, -cap, cap)
+
+
+class ScoringTests(SimpleTestCase):
+    def test_sector_zscores_match_the_loop(self):
+        rng = np.random.default_rng(14)
+        values = rng.normal(size=(6, 40))
+        values[rng.random(values.shape) < 0.2] = np.nan
+        values[0, :5] = 50.0  # outliers, capped at +-3
+        groups = rng.integers(-1, 4, 40)
+
+        np.testing.assert_allclose(
+            sector_zscores(values, groups), reference_zscores(values, groups)
+        )
+
+    def test_stale_names_have_no_factors(self):
+        prices = synthetic_panel(3, 3, seed=15).prices.iloc[:, :3]
+        prices.loc["2024-11-15":, "SYM00001"] = np.nan
+        dates = score_dates(prices.index)
+
+        factors = scoring_factors(prices, dates)
+        recent = has_recent_close(prices, dates)
+        self.assertFalse(recent.loc["2024-11-29", "SYM00001"])
+        self.assertTrue(recent.loc["2024-10-31", "SYM00001"])
+        for frame in factors.values():
+            self.assertTrue(np.isnan(frame.loc["2024-12-31", "SYM00001"]))
+
+        # 12-1 momentum from the month end closes
+        closes = prices.loc[dates]
+        momentum = closes.shift(1) / closes.shift(12) - 1
+        pd.testing.assert_frame_equal(
+            factors["momentum"][["SYM00000", "SYM00002"]],
+            momentum[["SYM00000", "SYM00002"]],
+        )
+
+    def test_composite_is_the_weighted_mean(self):
+        dates = pd.DatetimeIndex(["2024-01-31", "2024-02-29"])
+        names = [f"N{i}" for i in range(8)]
+        rng = np.random.default_rng(16)
+        factors = {
+            factor: pd.DataFrame(rng.normal(size=(2, 8)), index=dates, columns=names)
+            for factor in ["momentum", "low_volatility", "quality"]
+        }
+        factors["quality"].iloc[:, :2] = np.nan
+        factors["momentum"].iloc[:, 0] = np.nan
+        weights = {"momentum": 2.0, "low_volatility": 1.0, "quality": 1.0}
+
+        scores = score_history(factors, {}, weights)
+        zscores = pd.concat(
+            {factor: scores[factor] * weights[factor] for factor in factors}
+        )
+        valid = pd.concat(
+            {factor: scores[factor].notna() * weights[factor] for factor in factors}
+        )
+        composite = zscores.groupby(level=1).sum() / valid.groupby(level=1).sum()
+        composite.iloc[:, 0] = np.nan  # a single factor z-score
+        pd.testing.assert_frame_equal(scores["composite"], composite)
+        self.assertEqual(
+            scores["rank"].iloc[0].idxmin(), scores["composite"].iloc[0].idxmax()
+        )
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import async_views, views
 
 app_name = "scores"
 
@@ -18,6 +18,8 @@ urlpatterns = [
         view=views.single_stock_view_data_2,
         name="single_stock_view_data_2",
     ),
+    path(route="qualdata/", view=views.qualdata_view_data, name="qualdata_data"),
+    path(route="screener/", view=views.screener_view, name="screener"),
     path(route="table/", view=views.table_view, name="table_view"),
     path(route="data/", view=views.table_view_data, name="table_data"),
     path(route="data2/", view=views.table_view_data_2, name="table_data2"),
@@ -42,4 +44,77 @@ urlpatterns = [
         view=views.pf_view_performance,
         name="pf_view_performance",
     ),
+    path(
+        route="pf_view_batch_performance/",
+        view=views.pf_view_batch_performance,
+        name="pf_view_batch_performance",
+    ),
+    path(route="optimize/", view=views.optimize_view, name="optimize"),
+    path(route="simulate/", view=views.simulate_view, name="simulate"),
+    # Prometheus metrics of the local process, scraped at /metrics without a slash
+    path(route="metrics", view=views.metrics_view, name="metrics"),
+    # Async versions of the data endpoints, served under ASGI (quantamental/asgi.py)
+    path(
+        route="async/data/", view=async_views.table_view_data, name="async_table_data"
+    ),
+    path(
+        route="async/data2/",
+        view=async_views.table_view_data_2,
+        name="async_table_data2",
+    ),
+    path(
+        route="async/stockdata1/",
+        view=async_views.single_stock_view_data_1,
+        name="async_single_stock_view_data_1",
+    ),
+    path(
+        route="async/stockdata2/",
+        view=async_views.single_stock_view_data_2,
+        name="async_single_stock_view_data_2",
+    ),
+    path(
+        route="async/qualdata/",
+        view=async_views.qualdata_view_data,
+        name="async_qualdata_data",
+    ),
+    path(
+        route="async/screener/",
+        view=async_views.screener_view,
+        name="async_screener",
+    ),
+    path(
+        route="async/performance/",
+        view=async_views.performance,
+        name="async_performance",
+    ),
+    path(
+        route="async/pf_view_aggregated_performance/",
+        view=async_views.pf_view_aggregated_performance,
+        name="async_pf_view_aggregated_performance",
+    ),
+    path(
+        route="async/pf_view_asset_performance/",
+        view=async_views.pf_view_asset_performance,
+        name="async_pf_view_asset_performance",
+    ),
+    path(
+        route="async/pf_view_performance/",
+        view=async_views.pf_view_performance,
+        name="async_pf_view_performance",
+    ),
+    path(
+        route="async/pf_view_batch_performance/",
+        view=async_views.pf_view_batch_performance,
+        name="async_pf_view_batch_performance",
+    ),
+    path(
+        route="async/optimize/",
+        view=async_views.optimize_view,
+        name="async_optimize",
+    ),
+    path(
+        route="async/simulate/",
+        view=async_views.simulate_view,
+        name="async_simulate",
+    ),
 ]
@@ -1,385 +1,569 @@
-from datetime import datetime
-
 import numpy as np
 import pandas as pd
 
-
-def filter_performance(performance_ts, from_date, to_date):
-    return [
-        asset
-        for asset in performance_ts
-        if from_date <= datetime.strptime(asset["date"], "%d.%m.%Y") <= to_date
-    ]
-
-
-def calculate_portfolio_performance(weights, asset_timeseries, symbol):
+from .metrics import timed
+from .panel import PricePanel
+from .rebalancing import rebalance
+
+# Cached PricePanel return frame for every supported return frequency
+RETURN_FREQUENCIES = {
+    "daily": "daily_returns",
+    "weekly": "weekly_returns",
+    "monthly": "monthly_returns",
+}
+
+# Columns of drawdown_episodes
+EPISODE_COLUMNS = [
+    "symbol",
+    "start",
+    "trough",
+    "recovery",
+    "depth",
+    "days_to_trough",
+    "days_to_recovery",
+    "duration",
+    "time_under_water",
+]
+
+# Rolling windows (trading days) and fields of calculate_rolling_statistics
+ROLLING_WINDOWS = [63, 126, 252, 756]
+ROLLING_FIELDS = ["return", "volatility", "sharpe", "sortino"]
+
+
+@timed("calculate_portfolio_performance")
+def calculate_portfolio_performance(
+    weights, asset_timeseries, symbol, schedule="quarterly", band=0.05
+):
     """
     Calculate portfolio performance with rebalancing at the last business day of March, June, September, and December.
     The asset timeseries and the resulting portfolio performance are indexed at 100.
 
     Parameters:
-    weights (np.ndarray): Array of weights. Shape (n_assets,)
-    asset_timeseries (list of dict): List of dictionaries with asset timeseries data.
+    weights (np.ndarray or dict): Array of weights. Shape (n_assets,)
+    asset_timeseries (list of dict or PricePanel): Asset timeseries data.
+    schedule (str): Rebalancing schedule, see calculate_portfolio_panel.
 
     Returns:
     str: Portfolio performance timeseries indexed at 100 in JSON format.
     """
-    # Convert the list of dictionaries to a DataFrame
-    weights = np.array(weights)
+    return calculate_portfolio_panel(
+        weights, asset_timeseries, symbol, schedule, band
+    ).to_records()
+
+
+@timed("calculate_portfolio_panel")
+def calculate_portfolio_panel(
+    weights, asset_timeseries, symbol, schedule="quarterly", band=0.05
+):
+    """
+    Calculate portfolio performance as a single column PricePanel.
 
-    df = pd.DataFrame(asset_timeseries)
-    df["date"] = pd.to_datetime(df["date"], format="%d.%m.%Y")
-    df["close"] = df["close"].astype(float)
+    Between rebalancing dates the weights drift with the asset returns, on every
+    rebalancing date (close of the last trading day of the period) they are reset.
 
-    # Pivot the DataFrame to get the timeseries for each asset
-    asset_timeseries_df = df.pivot(
-        index="date", columns="symbol", values="close"
-    ).sort_index()
+    Parameters:
+    weights (np.ndarray or dict): Array of weights in the column order of the panel.
+    Shape (n_assets,). A dict of {"yyyy-mm-dd": weights} gives an explicit dated
+    schedule instead.
+    asset_timeseries (list of dict or PricePanel): Asset timeseries data.
+    symbol (str): Name of the portfolio column.
+    schedule (str): "monthly", "quarterly", "annual", "drift" or "none".
+    band (float): Weight tolerance of the "drift" schedule.
+
+    Returns:
+    PricePanel: Portfolio performance timeseries indexed at 100.
+    """
+    # Get the date x symbol price frame of the assets
+    asset_timeseries_df = PricePanel.coerce(asset_timeseries).prices
+
+    if isinstance(weights, dict):
+        weights = pd.DataFrame(
+            list(weights.values()),
+            index=pd.to_datetime(list(weights)),
+            columns=asset_timeseries_df.columns,
+        )
+    else:
+        weights = np.array(weights, dtype=float)
+        if weights.shape != (asset_timeseries_df.shape[1],):
+            raise ValueError("Number of weights must match the number of assets")
 
-    # Extract the dates from the DataFrame
-    dates = asset_timeseries_df.index
+    result = rebalance(asset_timeseries_df, weights, schedule, band)
 
-    # Ensure the dates are sorted
-    asset_timeseries_df = asset_timeseries_df.reindex(dates).fillna(method="ffill")
+    return PricePanel(result.values.to_frame(symbol).rename_axis(columns="symbol"))
 
-    # Convert the DataFrame to a numpy array
-    asset_timeseries = asset_timeseries_df.values
 
-    n_assets = weights.shape[0]
-    n_periods = asset_timeseries.shape[0]
+@timed("calculate_rolling_return")
+def calculate_rolling_return(asset_timeseries, window=252, statistics=None):
+    """
+    Calculate the 1-year rolling volatility and 1-year rolling return for every timeseries in asset_timeseries.
 
-    # Ensure the number of periods matches the number of dates
-    assert n_periods == len(dates), "Number of periods must match the number of dates"
+    Parameters:
+    asset_timeseries (list of dict or PricePanel): Asset timeseries data.
+    window (int): Rolling window in trading days.
+    statistics (dict): Optional precomputed {"return", "volatility"} frames on the
+    panel dates (see analytics.materialized_rolling_statistics).
 
-    # Calculate simple returns from the asset timeseries
-    simple_returns = asset_timeseries[1:] / asset_timeseries[:-1] - 1
+    Returns:
+    str: Rolling volatility and return timeseries in JSON format.
+    """
+    panel = PricePanel.coerce(asset_timeseries)
+    if statistics is None:
+        statistics = rolling_statistics(panel.daily_returns, [window])[window]
 
-    # Find the last business day of March, June, September, and December
-    rebalancing_dates = pd.date_range(start=dates.min(), end=dates.max(), freq="Q")
-    rebalancing_dates = rebalancing_dates + pd.offsets.BMonthEnd(0)
+    return _rolling_records(panel, statistics, ["volatility", "return"])
 
-    # Create a weights matrix for all rebalancings
-    n_quarters = len(rebalancing_dates)
-    weights_matrix = np.tile(weights, (n_quarters, 1))
 
-    portfolio_performance = np.zeros(n_periods)
-    current_weights = weights
+@timed("calculate_rolling_statistics")
+def calculate_rolling_statistics(asset_timeseries, windows=ROLLING_WINDOWS):
+    """
+    Calculate rolling return, volatility, Sharpe and Sortino ratio for several windows.
 
-    # Initialize the portfolio performance at 100
-    portfolio_performance[0] = 100
+    Parameters:
+    asset_timeseries (list of dict or PricePanel): Asset timeseries data.
+    windows (list of int): Rolling windows in trading days.
 
-    for i in range(1, n_periods):
-        if dates[i] in rebalancing_dates:
-            quarter_index = rebalancing_dates.get_loc(dates[i])
-            current_weights = weights_matrix[quarter_index]
-        portfolio_performance[i] = portfolio_performance[i - 1] * (
-            1 + np.dot(simple_returns[i - 1], current_weights)
-        )
+    Returns:
+    list of dict: One row per window, symbol and date in JSON format.
+    """
+    panel = PricePanel.coerce(asset_timeseries)
+    statistics = rolling_statistics(panel.daily_returns, windows)
 
-    # Create the output in the specified format
     output = []
-    for i, date in enumerate(dates):
-        output.append(
-            {
-                "id": i + 1,
-                "symbol": symbol,
-                "date": date.strftime("%d.%m.%Y"),
-                "close": f"{portfolio_performance[i]:.2f}",
-            }
-        )
+    for window in windows:
+        for row in _rolling_records(panel, statistics[window], ROLLING_FIELDS):
+            row["window"] = window
+            output.append(row)
 
     return output
 
 
-def calculate_rolling_return(asset_timeseries):
+def rolling_statistics(returns, windows=(252,), periods_per_year=252):
     """
-    Calculate the 1-year rolling volatility and 1-year rolling return for every timeseries in asset_timeseries.
+    Rolling return, volatility, Sharpe and Sortino ratio from cumulative sums.
+
+    The cumulative sums of log(1 + r), r and r**2 (and of the negative returns)
+    are built once over the whole panel. Every window is then a difference of two
+    rows, so the cost is O(n) per window instead of O(n * window).
 
     Parameters:
-    asset_timeseries (list of dict): List of dictionaries with asset timeseries data.
+    returns (pd.DataFrame): Date x symbol simple returns (NaN where missing).
+    windows (list of int): Rolling windows in periods.
+    periods_per_year (int): Periods used to annualize.
 
     Returns:
-    str: Rolling volatility and return timeseries in JSON format.
+    dict: {window: {"return", "volatility", "sharpe", "sortino": pd.DataFrame}}.
+    Values are NaN until a window holds `window` returns.
     """
-    # Convert the list of dictionaries to a DataFrame
-    df = pd.DataFrame(asset_timeseries)
-    df["date"] = pd.to_datetime(df["date"], format="%d.%m.%Y")
-    df["close"] = df["close"].astype(float)
-
-    # Pivot the DataFrame to get the timeseries for each asset
-    asset_timeseries_df = df.pivot(
-        index="date", columns="symbol", values="close"
-    ).sort_index()
-
-    # Calculate daily returns
-    daily_returns = asset_timeseries_df.pct_change()
-
-    # Calculate rolling volatility (annualized, using 252 trading days)
-    rolling_volatility = daily_returns.rolling(window=252).std() * np.sqrt(252)
-
-    # Calculate rolling return
-    rolling_return = (daily_returns + 1).rolling(window=252).apply(
-        np.prod, raw=True
-    ) - 1
-
-    # Reshape the DataFrames to long format
-    rolling_volatility = rolling_volatility.reset_index().melt(
-        id_vars="date", var_name="symbol", value_name="volatility"
-    )
-    rolling_return = rolling_return.reset_index().melt(
-        id_vars="date", var_name="symbol", value_name="return"
-    )
+    values = returns.to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    values = np.where(valid, values, 0.0)
+    downside = np.minimum(values, 0.0)
+
+    cumulative = {
+        "count": np.cumsum(valid, axis=0, dtype=float),
+        "log": np.cumsum(np.log1p(values), axis=0),
+        "sum": np.cumsum(values, axis=0),
+        "squares": np.cumsum(values * values, axis=0),
+        "down_count": np.cumsum(values < 0, axis=0, dtype=float),
+        "down_sum": np.cumsum(downside, axis=0),
+        "down_squares": np.cumsum(downside * downside, axis=0),
+    }
+
+    output = {}
+    for window in windows:
+        sums = {key: _window_sum(value, window) for key, value in cumulative.items()}
+        n = sums["count"]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rolling_return = np.expm1(sums["log"])
+            volatility = _std(sums["sum"], sums["squares"], n) * np.sqrt(
+                periods_per_year
+            )
+            downside_volatility = _std(
+                sums["down_sum"], sums["down_squares"], sums["down_count"]
+            ) * np.sqrt(periods_per_year)
+            annual_return = (1 + rolling_return) ** (periods_per_year / window) - 1
+            sharpe = annual_return / volatility
+            sortino = annual_return / downside_volatility
+
+        incomplete = n < window - 0.5
+        frames = {}
+        for name, value in [
+            ("return", rolling_return),
+            ("volatility", volatility),
+            ("sharpe", sharpe),
+            ("sortino", sortino),
+        ]:
+            value[incomplete] = np.nan
+            frames[name] = pd.DataFrame(
+                value, index=returns.index, columns=returns.columns
+            )
+        output[window] = frames
+
+    return output
+
+
+def _window_sum(cumulative, window):
+    """Trailing window sums from a cumulative sum along the first axis."""
+    result = np.full(cumulative.shape, np.nan)
+    if len(cumulative) >= window:
+        result[window - 1] = cumulative[window - 1]
+        result[window:] = cumulative[window:] - cumulative[:-window]
+    return result
+
 
-    # Merge the volatility and return DataFrames
-    merged_df = pd.merge(rolling_volatility, rolling_return, on=["date", "symbol"])
+def _std(total, squares, n):
+    """Sample standard deviation (ddof=1) from the sum and the sum of squares."""
+    variance = (squares - total * total / n) / (n - 1)
+    return np.sqrt(np.maximum(variance, 0.0))
 
-    # Drop rows with NaN values (before 1-year rolling window is complete)
-    merged_df = merged_df.dropna()
 
-    # Create the output in the specified format
+def _rolling_records(panel, statistics, fields):
+    """Long format rows (symbol by symbol, then by date) of the rolling statistics."""
+    dates = panel.dates.strftime("%d.%m.%Y")
+    n_dates = len(dates)
+    complete = ~np.isnan(statistics["return"].to_numpy())
+
     output = []
-    for i, row in merged_df.iterrows():
-        output.append(
-            {
-                "id": i + 1,
-                "symbol": row["symbol"],
-                "date": row["date"].strftime("%d.%m.%Y"),
-                "volatility": f"{row['volatility']:.6f}",
-                "return": f"{row['return']:.6f}",
-            }
-        )
+    for j, symbol in enumerate(statistics["return"].columns):
+        columns = {field: statistics[field].iloc[:, j].to_numpy() for field in fields}
+        for i in np.flatnonzero(complete[:, j]).tolist():
+            row = {"id": j * n_dates + i + 1, "symbol": symbol, "date": dates[i]}
+            for field in fields:
+                row[field] = f"{columns[field][i]:.6f}"
+            output.append(row)
 
     return output
 
 
+@timed("calculate_drawdown")
 def calculate_drawdown(asset_timeseries):
     """
     Calculate the drawdown timeseries for every timeseries in asset_timeseries.
 
     Parameters:
-    asset_timeseries (list of dict): List of dictionaries with asset timeseries data.
+    asset_timeseries (list of dict or PricePanel): Asset timeseries data.
 
     Returns:
     str: Drawdown timeseries in JSON format.
     """
-    # Convert the list of dictionaries to a DataFrame
-    df = pd.DataFrame(asset_timeseries)
-    df["date"] = pd.to_datetime(df["date"], format="%d.%m.%Y")
-    df["close"] = df["close"].astype(float)
+    panel = PricePanel.coerce(asset_timeseries)
+    drawdown = drawdown_series(panel.prices).to_numpy()
+    dates = panel.dates.strftime("%d.%m.%Y")
+    n_dates = len(dates)
+
+    # Create the output in the specified format (symbol by symbol, then by date)
+    output = []
+    for j, symbol in enumerate(panel.symbols):
+        for i, value in enumerate(drawdown[:, j].tolist()):
+            output.append(
+                {
+                    "id": j * n_dates + i + 1,
+                    "symbol": symbol,
+                    "date": dates[i],
+                    "drawdown": f"{value:.6f}",
+                }
+            )
+
+    return output
+
+
+def drawdown_series(prices):
+    """
+    Drawdown of every column from its running peak since the first date.
 
-    # Pivot the DataFrame to get the timeseries for each asset
-    asset_timeseries_df = df.pivot(
-        index="date", columns="symbol", values="close"
-    ).sort_index()
+    Parameters:
+    prices (pd.DataFrame): Date x symbol close prices.
 
+    Returns:
+    pd.DataFrame: Date x symbol drawdowns (0 at a new peak, negative below it).
+    """
     # Calculate the cumulative returns
-    cumulative_returns = asset_timeseries_df / asset_timeseries_df.iloc[0]
+    cumulative_returns = prices / prices.iloc[0]
 
     # Calculate the rolling maximum
     rolling_max = cumulative_returns.cummax()
 
     # Calculate the drawdown
-    drawdown = (cumulative_returns - rolling_max) / rolling_max
+    return (cumulative_returns - rolling_max) / rolling_max
 
-    # Reshape the DataFrame to long format
-    drawdown = drawdown.reset_index().melt(
-        id_vars="date", var_name="symbol", value_name="drawdown"
-    )
 
-    # Create the output in the specified format
+@timed("calculate_top_drawdowns")
+def calculate_top_drawdowns(asset_timeseries, top_n=5, min_depth=0.0):
+    """
+    Calculate the top 5 drawdowns for every timeseries in asset_timeseries.
+
+    Parameters:
+    asset_timeseries (list of dict or PricePanel): Asset timeseries data.
+    top_n (int): Number of drawdowns per symbol.
+    min_depth (float): Only report drawdowns at least this deep (0.1 = 10%).
+
+    Returns:
+    str: Top 5 drawdowns in JSON format.
+    """
+    episodes = drawdown_episodes(PricePanel.coerce(asset_timeseries).prices)
+
+    # Sort drawdowns by magnitude and take the top N per symbol
+    episodes = episodes[episodes["depth"] <= -min_depth]
+    episodes = episodes.groupby("symbol", sort=False, group_keys=False).head(top_n)
+
     output = []
-    for i, row in drawdown.iterrows():
+    for episode in episodes.itertuples(index=False):
+        is_open = pd.isna(episode.recovery)
         output.append(
             {
-                "id": i + 1,
-                "symbol": row["symbol"],
-                "date": row["date"].strftime("%d.%m.%Y"),
-                "drawdown": f"{row['drawdown']:.6f}",
+                "symbol": episode.symbol,
+                "Start Date": episode.start.strftime("%d.%m.%Y"),
+                "Trough Date": episode.trough.strftime("%d.%m.%Y"),
+                "End Date": (
+                    "Open" if is_open else episode.recovery.strftime("%d.%m.%Y")
+                ),
+                "Days to Trough": int(episode.days_to_trough),
+                "Days To Recovery": "-" if is_open else int(episode.days_to_recovery),
+                "Days Under Water": int(episode.time_under_water),
+                "Max Drawdown [%]": f"{episode.depth * 100:.2f}",
             }
         )
 
     return output
 
 
-def calculate_top_drawdowns(asset_timeseries):
+def drawdown_episodes(prices):
     """
-    Calculate the top 5 drawdowns for every timeseries in asset_timeseries.
+    Find every drawdown episode of every column at once.
+
+    An episode starts on the first close below the running peak and ends on the
+    first close back at the peak (recovery). Episodes still under water on the
+    last date are reported as open. The columns are laid out one after another
+    with a separating row, so run starts and ends of all symbols come out of a
+    single diff over the flattened under-water mask.
 
     Parameters:
-    asset_timeseries (list of dict): List of dictionaries with asset timeseries data.
+    prices (pd.DataFrame): Date x symbol close prices.
 
     Returns:
-    str: Top 5 drawdowns in JSON format.
+    pd.DataFrame: One row per episode with symbol, start, trough, recovery (NaT if
+    open), depth, days_to_trough, days_to_recovery, duration (closes under water)
+    and time_under_water (calendar days until recovery or the last date), sorted by
+    symbol (column order) and depth.
     """
-    # Convert the list of dictionaries to a DataFrame
-    df = pd.DataFrame(asset_timeseries)
-    df["date"] = pd.to_datetime(df["date"], format="%d.%m.%Y")
-    df["close"] = df["close"].astype(float)
-
-    # Pivot the DataFrame to get the timeseries for each asset
-    asset_timeseries_df = df.pivot(
-        index="date", columns="symbol", values="close"
-    ).sort_index()
-
-    output = []
-
-    for symbol in asset_timeseries_df.columns:
-        series = asset_timeseries_df[symbol]
-        cumulative_returns = series / series.iloc[0]
-        rolling_max = cumulative_returns.cummax()
-        drawdown = (cumulative_returns - rolling_max) / rolling_max
-
-        # Find drawdown periods
-        drawdown_periods = []
-        in_drawdown = False
-        start_date = None
-        trough_date = None
-        end_date = None
-        max_drawdown = 0
-
-        for date, dd in drawdown.items():
-            if dd < 0:
-                if not in_drawdown:
-                    in_drawdown = True
-                    start_date = date
-                    trough_date = date
-                    max_drawdown = dd
-                elif dd < max_drawdown:
-                    trough_date = date
-                    max_drawdown = dd
-            elif in_drawdown:
-                in_drawdown = False
-                end_date = date
-                drawdown_periods.append(
-                    (start_date, trough_date, end_date, max_drawdown)
-                )
-                start_date = None
-                trough_date = None
-                end_date = None
-                max_drawdown = 0
-
-        # Sort drawdowns by magnitude
-        drawdown_periods = sorted(drawdown_periods, key=lambda x: x[3])
-
-        # Take the top 5 drawdowns
-        top_drawdowns = drawdown_periods[:5]
+    columns = list(prices.columns)
+    dates = prices.index.values
+    values = prices.ffill().to_numpy(dtype=float)
+    n_dates, n_symbols = values.shape
+
+    # Drawdown from the running peak (NaN before the first price)
+    with np.errstate(invalid="ignore"):
+        drawdown = values / np.fmax.accumulate(values, axis=0) - 1
+    under_water = drawdown < 0
+
+    # Flatten column by column, each column followed by one row above water
+    mask = np.zeros((n_symbols, n_dates + 1), dtype=bool)
+    mask[:, :n_dates] = under_water.T
+    flat_mask = mask.ravel()
+    flat_drawdown = np.zeros((n_symbols, n_dates + 1))
+    flat_drawdown[:, :n_dates] = np.where(under_water, drawdown, 0.0).T
+    flat_drawdown = flat_drawdown.ravel()
+
+    edges = np.diff(flat_mask.astype(np.int8), prepend=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    if len(starts) == 0:
+        return pd.DataFrame(columns=EPISODE_COLUMNS)
+
+    # Depth of every run and the first close at that depth (trough)
+    depth = np.minimum.reduceat(flat_drawdown, starts)
+    positions = np.flatnonzero(flat_mask)
+    run = np.cumsum(edges == 1)[positions] - 1
+    at_depth = flat_drawdown[positions] == depth[run]
+    first = np.flatnonzero(np.diff(run[at_depth], prepend=-1) != 0)
+    troughs = positions[at_depth][first]
+
+    symbol = starts // (n_dates + 1)
+    start_row = starts % (n_dates + 1)
+    trough_row = troughs % (n_dates + 1)
+    end_row = ends % (n_dates + 1)
+    is_open = end_row == n_dates
+
+    start = dates[start_row]
+    trough = dates[trough_row]
+    recovery = np.where(
+        is_open, np.datetime64("NaT"), dates[np.minimum(end_row, n_dates - 1)]
+    )
+    last = np.where(is_open, dates[-1], recovery)
+    day = np.timedelta64(1, "D")
 
-        for i, (start, trough, end, max_dd) in enumerate(top_drawdowns):
-            output.append(
-                {
-                    "symbol": symbol,
-                    "Start Date": start.strftime("%d.%m.%Y"),
-                    "Trough Date": trough.strftime("%d.%m.%Y"),
-                    "End Date": end.strftime("%d.%m.%Y"),
-                    "Days to Trough": (trough - start).days,
-                    "Days To Recovery": (end - trough).days,
-                    "Max Drawdown [%]": f"{max_dd * 100:.2f}",
-                }
-            )
+    episodes = pd.DataFrame(
+        {
+            "symbol": np.array(columns, dtype=object)[symbol],
+            "start": start,
+            "trough": trough,
+            "recovery": recovery,
+            "depth": depth,
+            "days_to_trough": (trough - start) // day,
+            "days_to_recovery": (recovery - trough) / day,
+            "duration": end_row - start_row,
+            "time_under_water": (last - start) // day,
+        }
+    )
 
-    return output
+    order = np.lexsort((start_row, depth, symbol))
+    return episodes.iloc[order].reset_index(drop=True)
 
 
-def calculate_rolling_beta(asset_timeseries, benchmark_timeseries):
+@timed("calculate_rolling_beta")
+def calculate_rolling_beta(
+    asset_timeseries, benchmark_timeseries, window=104, frequency="weekly"
+):
     """
     Calculate the rolling beta based on weekly returns and a 2-year lookback period.
     Apply the Blume adjustment to the beta.
 
     Parameters:
-    asset_timeseries (list of dict): List of dictionaries with asset timeseries data.
-    benchmark_timeseries (list of dict): List of dictionaries with benchmark timeseries data.
+    asset_timeseries (list of dict or PricePanel): Asset timeseries data.
+    benchmark_timeseries (list of dict or PricePanel): Benchmark timeseries data.
+    window (int): Lookback in return periods (104 weeks by default).
+    frequency (str): Return frequency, "daily", "weekly" or "monthly".
 
     Returns:
     list of dict: Rolling beta timeseries in JSON format.
     """
-    # Convert input data to DataFrames
-    asset_df = pd.DataFrame(asset_timeseries)
-    benchmark_df = pd.DataFrame(benchmark_timeseries)
-
-    # Convert date columns to datetime and ensure correct types
-    asset_df["date"] = pd.to_datetime(asset_df["date"], format="%d.%m.%Y")
-    benchmark_df["date"] = pd.to_datetime(benchmark_df["date"], format="%d.%m.%Y")
-    asset_df["close"] = asset_df["close"].astype(float)
-    benchmark_df["close"] = benchmark_df["close"].astype(float)
-
-    # Pivot data to have symbols as columns
-    asset_df = asset_df.pivot(
-        index="date", columns="symbol", values="close"
-    ).sort_index()
-    benchmark_df = benchmark_df.pivot(
-        index="date", columns="symbol", values="close"
-    ).sort_index()
-
-    # Resample to weekly frequency and calculate weekly returns
-    asset_weekly_returns = asset_df.resample("W-FRI").last().pct_change()
-    benchmark_weekly_returns = benchmark_df.resample("W-FRI").last().pct_change()
-
-    # Initialize storage for results
-    results = []
-
-    # Iterate over all asset and benchmark combinations
-    for asset_symbol in asset_weekly_returns.columns:
-        for benchmark_symbol in benchmark_weekly_returns.columns:
-            # Align asset and benchmark returns
-            aligned_data = pd.concat(
-                [
-                    asset_weekly_returns[asset_symbol],
-                    benchmark_weekly_returns[benchmark_symbol],
-                ],
-                axis=1,
-                keys=["asset", "benchmark"],
-            ).dropna()
-
-            # Calculate rolling beta (2-year lookback, 104 weeks)
-            rolling_beta = (
-                aligned_data["asset"]
-                .rolling(window=104, min_periods=104)
-                .apply(
-                    lambda x: np.cov(x, aligned_data.loc[x.index, "benchmark"])[0, 1]
-                    / np.var(aligned_data.loc[x.index, "benchmark"]),
-                    raw=False,
-                )
-            )
+    asset_returns = getattr(
+        PricePanel.coerce(asset_timeseries), RETURN_FREQUENCIES[frequency]
+    )
+    benchmark_returns = getattr(
+        PricePanel.coerce(benchmark_timeseries), RETURN_FREQUENCIES[frequency]
+    )
 
-            # Apply Blume adjustment
-            adjusted_beta = 0.67 * rolling_beta + 0.33
+    # Betas of every asset against every benchmark, shape (dates, assets, benchmarks)
+    dates, betas = rolling_beta(asset_returns, benchmark_returns, window)
+    dates = dates.strftime("%d.%m.%Y")
 
-            # Add results to the output list
-            for date, beta in adjusted_beta.dropna().items():
+    # Add results to the output list
+    results = []
+    for i, asset_symbol in enumerate(asset_returns.columns):
+        for j in range(betas.shape[2]):
+            beta = betas[:, i, j]
+            for k in np.flatnonzero(~np.isnan(beta)):
                 results.append(
                     {
-                        "date": date.strftime("%d.%m.%Y"),
+                        "date": dates[k],
                         "symbol": asset_symbol,
-                        "beta": beta,
+                        "beta": beta[k],
                     }
                 )
 
     return results
 
 
+def rolling_beta(asset_returns, benchmark_returns, window=104, blume=True):
+    """
+    Rolling beta of every asset column against every benchmark column in one pass.
+
+    Covariance and variance come from sums of x, y, x*y and y*y over the last
+    `window` dates where both returns exist, instead of a Python call per window.
+    A beta is reported on every such date once `window` of them are available. As
+    before, the covariance uses ddof=1 and the benchmark variance ddof=0.
+
+    Parameters:
+    asset_returns (pd.DataFrame): Date x asset returns.
+    benchmark_returns (pd.DataFrame): Date x benchmark returns.
+    window (int): Number of joint return periods per window.
+    blume (bool): Apply the Blume adjustment 0.67 * beta + 0.33.
+
+    Returns:
+    tuple: (pd.DatetimeIndex, np.ndarray of shape (dates, assets, benchmarks)), NaN
+    where no full window is available.
+    """
+    asset_returns, benchmark_returns = asset_returns.align(
+        benchmark_returns, join="outer", axis=0
+    )
+    x = asset_returns.to_numpy(dtype=float)[:, :, None]
+    y = benchmark_returns.to_numpy(dtype=float)[:, None, :]
+
+    # Joint availability of every asset/benchmark pair
+    valid = ~np.isnan(x) & ~np.isnan(y)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+
+    sum_x, sum_y, sum_xy, sum_yy = _joint_window_sums(
+        [x, y, x * y, y * y], valid, window
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = (sum_xy - sum_x * sum_y / window) / (window - 1)
+        variance = (sum_yy - sum_y * sum_y / window) / window
+        beta = covariance / variance
+
+    if blume:
+        # Apply Blume adjustment
+        beta = 0.67 * beta + 0.33
+
+    return asset_returns.index, beta
+
+
+def _joint_window_sums(arrays, valid, window):
+    """
+    Sums of every array over the last `window` valid rows of each column.
+
+    The valid cells are laid out column after column, so the valid row `window`
+    positions back in the same column is a plain offset into that layout.
+
+    Parameters:
+    arrays (list of np.ndarray): Arrays of the shape of valid (0 where invalid).
+    valid (np.ndarray): Boolean mask, the first axis is the dates.
+    window (int): Number of valid rows per window.
+
+    Returns:
+    list of np.ndarray: Window sums, NaN where the row is invalid or fewer than
+    `window` valid rows are available.
+    """
+    shape = valid.shape
+    n_dates = shape[0]
+    valid = valid.reshape(n_dates, -1)
+
+    positions = np.flatnonzero(valid.T)
+    column = positions // n_dates
+    row = positions % n_dates
+
+    # Rank of every valid row within its column, the window starts after the
+    # valid row `window` positions back
+    index = np.arange(len(positions))
+    rank = index - np.searchsorted(column, column)
+    full = rank >= window - 1
+    back = row[np.maximum(index - window, 0)] + 1
+    start = np.where(rank >= window, back, 0)[full]
+    row, column = row[full], column[full]
+
+    sums = []
+    for array in arrays:
+        array = array.reshape(n_dates, -1)
+        cumulative = np.zeros((n_dates + 1, array.shape[1]))
+        np.cumsum(array, axis=0, out=cumulative[1:])
+        total = np.full(array.shape, np.nan)
+        total[row, column] = cumulative[row + 1, column] - cumulative[start, column]
+        sums.append(total.reshape(shape))
+    return sums
+
+
+@timed("calculate_performance_metrics")
 def calculate_performance_metrics(asset_timeseries, benchmark_timeseries):
     """
     Calculate performance metrics for the asset timeseries.
 
     Parameters:
-    asset_timeseries (list of dict): List of dictionaries with asset timeseries data.
-    benchmark_timeseries (list of dict): List of dictionaries with benchmark timeseries data.
+    asset_timeseries (list of dict or PricePanel): Asset timeseries data.
+    benchmark_timeseries (list of dict or PricePanel): Benchmark timeseries data.
 
     Returns:
     dict: Performance metrics including cumulative return, return per annum, YTD return, annualized volatility, sharpe ratio, calmar ratio, and sortino ratio.
     """
-    # Convert the list of dictionaries to a DataFrame
-    df = pd.DataFrame(asset_timeseries)
-    df["date"] = pd.to_datetime(df["date"], format="%d.%m.%Y")
-    df["close"] = df["close"].astype(float)
+    asset_panel = PricePanel.coerce(asset_timeseries)
+    asset_timeseries_df = asset_panel.prices
 
-    # Pivot the DataFrame to get the timeseries for each asset
-    asset_timeseries_df = df.pivot(
-        index="date", columns="symbol", values="close"
-    ).sort_index()
-
-    # Calculate daily returns
-    daily_returns = asset_timeseries_df.pct_change().dropna()
+    # Daily returns are cached on the panel
+    daily_returns = asset_panel.daily_returns.dropna()
 
     # Calculate cumulative return
     cumulative_return = (asset_timeseries_df.iloc[-1] / asset_timeseries_df.iloc[0]) - 1
@@ -436,42 +620,24 @@ def calculate_performance_metrics(asset_timeseries, benchmark_timeseries):
     return output
 
 
-import pandas as pd
-
-
+@timed("calculate_monthly_returns")
 def calculate_monthly_returns(asset_timeseries, benchmark_timeseries):
     """
     Calculate the monthly returns of both portfolio and benchmark, and then calculate the average returns
     for all the months when the benchmark performance is negative and all the months when the benchmark return is positive.
 
     Parameters:
-    asset_timeseries (list of dict): List of dictionaries with asset timeseries data.
-    benchmark_timeseries (list of dict): List of dictionaries with benchmark timeseries data.
+    asset_timeseries (list of dict or PricePanel): Asset timeseries data.
+    benchmark_timeseries (list of dict or PricePanel): Benchmark timeseries data.
 
     Returns:
     list of dict: Average returns for positive and negative benchmark months for both portfolio and benchmark.
     """
-    # Convert the list of dictionaries to DataFrames
-    asset_df = pd.DataFrame(asset_timeseries)
-    benchmark_df = pd.DataFrame(benchmark_timeseries)
-
-    # Convert date columns to datetime and ensure correct types
-    asset_df["date"] = pd.to_datetime(asset_df["date"], format="%d.%m.%Y")
-    benchmark_df["date"] = pd.to_datetime(benchmark_df["date"], format="%d.%m.%Y")
-    asset_df["close"] = asset_df["close"].astype(float)
-    benchmark_df["close"] = benchmark_df["close"].astype(float)
-
-    # Pivot data to have symbols as columns
-    asset_df = asset_df.pivot(
-        index="date", columns="symbol", values="close"
-    ).sort_index()
-    benchmark_df = benchmark_df.pivot(
-        index="date", columns="symbol", values="close"
-    ).sort_index()
-
-    # Resample to monthly frequency and calculate monthly returns
-    benchmark_monthly_returns = benchmark_df.resample("M").ffill().pct_change().dropna()
-    asset_monthly_returns = asset_df.resample("M").ffill().pct_change().dropna()
+    # Monthly returns are cached on the panels
+    benchmark_monthly_returns = PricePanel.coerce(
+        benchmark_timeseries
+    ).monthly_returns.dropna()
+    asset_monthly_returns = PricePanel.coerce(asset_timeseries).monthly_returns.dropna()
     results = []
     for benchmark_symbol in benchmark_monthly_returns.columns:
         benchmark_returns = benchmark_monthly_returns[benchmark_symbol]
@@ -1,15 +1,20 @@
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 
+import numpy as np
 from django import forms
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.models import User
-from django.http import JsonResponse
+from django.core.cache import caches
+from django.db.models import F, Max, Q
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
 from django.shortcuts import render
 from django.urls import reverse_lazy
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.views.generic import (
     CreateView,
     DeleteView,
@@ -19,18 +24,136 @@ from django.views.generic import (
 )
 
 from . import models
+from .analytics import materialized_rolling_statistics
+from .batch import BATCH_METRICS, BATCH_SCHEDULES, evaluate_batch, sample_weights
+from .bundle import performance_bundle
+from .cache import ANALYTICS_CACHE, cache_performance
+from .columnar import RESPONSE_FORMATS, ColumnarJsonResponse, format_dates, to_columns
+from .compression import compressed_response, precompressed
+from .conditional import data_state, etag, versioned
 from .forms import UserRegisterForm
+from .metrics import PROMETHEUS_CONTENT_TYPE, render_metrics, timed
+from .optimization import (
+    COVARIANCE_WINDOW,
+    ESTIMATORS,
+    EWMA_HALFLIFE,
+    MIN_OBSERVATIONS,
+    OBJECTIVES,
+    TRADING_DAYS,
+    cached_estimate,
+    daily_returns,
+    gic_sectors,
+    make_constraints,
+    optimize,
+    portfolio_statistics,
+)
+from .panel import PricePanel
+from .price_store import get_price_store, read_closes
+from .rebalancing import SCHEDULES
+from .screener import (
+    SCREENER_COLUMNS,
+    SCREENER_NUMBER_FIELDS,
+    SCREENER_TEXT_FIELDS,
+)
+from .signals import IDENTIFICATION_DATA, QUALDATA_DATA, SCREENER_DATA, SECTOR_DATA
+from .simulation import (
+    BLOCK_LENGTH,
+    FAN_QUANTILES,
+    METHODS,
+    SIMULATION_SCHEDULES,
+    T_DOF,
+    make_model,
+    simulate,
+    summarize,
+)
+from .streaming import (
+    STREAM_CHUNK_SIZE,
+    STREAM_CONTENT_TYPES,
+    StreamingJsonResponse,
+    decode_cursor,
+    encode_cursor,
+    stream_rows,
+)
 from .utils import (
-    calculate_drawdown,
-    calculate_monthly_returns,
-    calculate_performance_metrics,
+    RETURN_FREQUENCIES,
+    calculate_portfolio_panel,
     calculate_portfolio_performance,
-    calculate_rolling_beta,
-    calculate_rolling_return,
-    calculate_top_drawdowns,
-    filter_performance,
 )
 
+# Columns of the rows sent to the browser
+SECTOR_COLUMNS = [
+    "code__code",
+    "code__isin",
+    "code__name",
+    "sector",
+    "industry",
+    "gicSector",
+    "gicGroup",
+    "gicIndustry",
+    "gicSubIndustry",
+]
+IDENTIFICATION_COLUMNS = ["code", "isin", "name"]
+DESCRIPTION_COLUMNS = ["description"]
+QUALDATA_COLUMNS = [
+    "name",
+    "ticker",
+    "exchange",
+    "sector",
+    "beta",
+    "mcap",
+    "dividendYield",
+]
+PERFORMANCE_COLUMNS = ["id", "symbol", "date", "close"]
+
+# Fields of the batched qualitative data endpoint and its maximum number of tickers
+QUALDATA_FIELDS = ["ticker", "name", "description", *QUALDATA_COLUMNS[2:]]
+MAX_QUALDATA_TICKERS = 500
+
+# Paging of the universe table
+UNIVERSE_PAGE_SIZE = 50
+MAX_UNIVERSE_PAGE_SIZE = 1000
+
+# Columns and rows of the latest factor scores on the scores page
+SCORES_COLUMNS = [
+    "rank",
+    "symbol",
+    "gicSector",
+    "composite",
+    "momentum",
+    "low_volatility",
+    "value",
+    "quality",
+]
+SCORES_PAGE_SIZE = 100
+
+# Rows of a screener response, and the lookups of its filters (field__lookup=value)
+SCREENER_LIMIT = 100
+MAX_SCREENER_LIMIT = 1000
+SCREENER_NUMBER_LOOKUPS = ["gt", "gte", "lt", "lte"]
+
+# Maximum number of assets and estimation window (trading days) of the optimizer
+MAX_OPTIMIZATION_ASSETS = 1000
+MAX_OPTIMIZATION_WINDOW = 30 * TRADING_DAYS
+
+# Maximum number of assets, weight vectors and value paths of the batch evaluation
+MAX_BATCH_ASSETS = 1000
+MAX_BATCH_VECTORS = 20000
+MAX_BATCH_TOP_K = 100
+
+# Limits of the simulation: paths, horizon (trading days) and random draws (paths x
+# horizon x assets) of a request
+MAX_SIMULATION_PATHS = 100000
+MAX_SIMULATION_HORIZON = 10 * TRADING_DAYS
+MAX_SIMULATION_DRAWS = 200_000_000
+
+# GIC level filters of the universe table, {query parameter: Sector field}
+GIC_FILTERS = {
+    "gicSector[]": "gicSector",
+    "gicGroup[]": "gicGroup",
+    "gicIndustry[]": "gicIndustry",
+    "gicSubIndustry[]": "gicSubIndustry",
+}
+
 
 @login_required
 def table_view(request):
@@ -43,27 +166,36 @@ def table_view(request):
 
 
 @login_required
+@versioned(SECTOR_DATA, IDENTIFICATION_DATA)
 def table_view_data(request):
-    default_columns = [
-        "code__code",
-        "code__isin",
-        "code__name",
-        "sector",
-        "industry",
-        "gicSector",
-        "gicGroup",
-        "gicIndustry",
-        "gicSubIndustry",
-    ]
-    data = list(models.Sector.objects.values(*default_columns))
-    return JsonResponse(data, safe=False)
+    if request.GET:
+        # One page of the filtered and sorted universe
+        try:
+            options = _universe_options(request.GET)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        queryset = _universe_queryset(options)
+        start = options["offset"]
+        rows = list(queryset[start : start + options["page_size"]])
+        return JsonResponse(_universe_page(options, queryset.count(), rows))
+
+    # The whole universe, encoded and compressed once per data version
+    bodies = precompressed(
+        f"table_view_data:{etag(request.data_state)}",
+        lambda: list(models.Sector.objects.values(*SECTOR_COLUMNS)),
+    )
+    return compressed_response(request, bodies)
 
 
 @login_required
+@versioned(IDENTIFICATION_DATA)
 def table_view_data_2(request):
-    default_columns = ["code", "isin", "name"]
-    data = list(models.Identification.objects.values(*default_columns))
-    return JsonResponse(data, safe=False)
+    bodies = precompressed(
+        f"table_view_data_2:{etag(request.data_state)}",
+        lambda: list(models.Identification.objects.values(*IDENTIFICATION_COLUMNS)),
+    )
+    return compressed_response(request, bodies)
 
 
 @login_required
@@ -73,13 +205,36 @@ def pf_view(request):
 
 @login_required
 def scores_view(request):
-    context = {"user": request.user}
-    print(context)
+    # Latest snapshot of the factor scores, in rank order from the (date, rank) index
+    latest = models.FactorScore.objects.aggregate(Max("score_date"))["score_date__max"]
+    with timed("fetch"):
+        scores = list(
+            models.FactorScore.objects.filter(score_date=latest)
+            .order_by("rank")
+            .values(*SCORES_COLUMNS)[:SCORES_PAGE_SIZE]
+        )
+    context = {"user": request.user, "score_date": latest, "scores": scores}
     return render(
         request=request, template_name="scores/scores_view.html", context=context
     )
 
 
+@login_required
+@versioned(SCREENER_DATA)
+def screener_view(request):
+    try:
+        options = _screener_options(request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    queryset = _screener_queryset(options)
+    start = options["offset"]
+    with timed("fetch"):
+        rows = list(queryset[start : start + options["limit"]])
+        total = queryset.count()
+    return JsonResponse(_screener_page(options, total, rows))
+
+
 @login_required
 def single_stock_view(request):
     context = {"view_name": "single_stock"}
@@ -91,32 +246,36 @@ def single_stock_view(request):
 
 
 @login_required
+@versioned(QUALDATA_DATA)
 def single_stock_view_data_1(request):
-    default_columns = [
-        "description",
-    ]
     ticker = request.GET.get("ticker")
     print(ticker)
-    data = list(models.Qualdata.objects.filter(ticker=ticker).values(*default_columns))
+    data = list(
+        models.Qualdata.objects.filter(ticker=ticker).values(*DESCRIPTION_COLUMNS)
+    )
     return JsonResponse(data, safe=False)
 
 
 @login_required
+@versioned(QUALDATA_DATA)
 def single_stock_view_data_2(request):
-    default_columns = [
-        "name",
-        "ticker",
-        "exchange",
-        "sector",
-        "beta",
-        "mcap",
-        "dividendYield",
-    ]
     ticker = request.GET.get("ticker")
-    data = list(models.Qualdata.objects.filter(ticker=ticker).values(*default_columns))
+    data = list(models.Qualdata.objects.filter(ticker=ticker).values(*QUALDATA_COLUMNS))
     return JsonResponse(data, safe=False)
 
 
+@login_required
+@versioned(QUALDATA_DATA)
+def qualdata_view_data(request):
+    try:
+        tickers, fields = _qualdata_options(request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    rows = list(_qualdata_queryset(tickers, fields))
+    return JsonResponse(_qualdata_rows(tickers, rows), safe=False)
+
+
 @login_required
 def vis_view(request):
     context = {
@@ -131,6 +290,17 @@ def vis_view(request):
     )
 
 
+def metrics_view(request):
+    """
+    Latency histograms of this process in the Prometheus text format.
+
+    Only clients in settings.METRICS_ALLOWED_IPS (the local host) may read them.
+    """
+    if request.META.get("REMOTE_ADDR") not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
 # FORMS:
 class SignUpView(CreateView):
     form_class = UserRegisterForm
@@ -143,8 +313,28 @@ class SignUpView(CreateView):
 
 @login_required
 def performance(request):
-    data = list(models.Performance.objects.values())
-    return JsonResponse(data, safe=False)
+    try:
+        options = _stream_options(request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    queryset = _stream_queryset(options)
+    if options["output_format"] == "columnar":
+        return _columnar_closes(queryset, "performance", options["symbols"] or None)
+
+    next_cursor = None
+    if options["limit"] is not None:
+        queryset, next_cursor = _page(
+            queryset, list(_page_keys(queryset, options["limit"]))
+        )
+
+    # Rows are fetched from the database cursor and encoded chunk by chunk
+    rows = queryset.values(*PERFORMANCE_COLUMNS).iterator(chunk_size=STREAM_CHUNK_SIZE)
+    return StreamingJsonResponse(
+        stream_rows(rows, options["output_format"]),
+        options["output_format"],
+        next_cursor,
+    )
 
 
 @login_required
@@ -152,138 +342,1099 @@ def pf_view_aggregated_performance(request):
     symbol = request.GET.getlist("ticker[]", [])
     weights = json.loads(request.GET.get("weights", "[]"))  # Parse weights
 
-    asset_performance = list(
-        models.Performance.objects.filter(symbol__in=symbol).values()
-    )
+    with timed("fetch"):
+        store = get_price_store()
+        if store is not None:
+            # Read the close panel straight from the memory-mapped price store
+            asset_performance = store.panel(symbol).dropna(how="all")
+        else:
+            asset_performance = list(
+                models.Performance.objects.filter(symbol__in=symbol).values(
+                    *PERFORMANCE_COLUMNS
+                )
+            )
 
-    portfolio_performance = calculate_portfolio_performance(weights, asset_performance)
+    portfolio_performance = calculate_portfolio_performance(
+        weights, asset_performance, "Portfolio"
+    )
 
-    return JsonResponse(portfolio_performance, safe=False)
+    with timed("serialize"):
+        return JsonResponse(portfolio_performance, safe=False)
 
 
 @login_required
 def pf_view_asset_performance(request):
     symbol = request.GET.getlist("ticker[]", [])
 
-    asset_performance = list(
-        models.Performance.objects.filter(symbol__in=symbol).values()
-    )
+    output_format = request.GET.get("format", "rows")
+    if output_format not in RESPONSE_FORMATS:
+        return JsonResponse({"error": "Invalid format"}, status=400)
 
-    return JsonResponse(asset_performance, safe=False)
+    if output_format == "columnar":
+        return _columnar_closes(
+            models.Performance.objects.filter(symbol__in=symbol),
+            "asset_performance",
+            symbol,
+        )
+
+    with timed("fetch"):
+        asset_performance = list(
+            models.Performance.objects.filter(symbol__in=symbol).values(
+                *PERFORMANCE_COLUMNS
+            )
+        )
+
+    with timed("serialize"):
+        return JsonResponse(asset_performance, safe=False)
 
 
 @login_required
+@cache_performance
 def pf_view_performance(request):
 
     #    ! GET DATA --------------------------------------------------------------------------
-    portfolio_performance = None  # Initialize portfolio performance to None
-    asset_symbol = request.GET.getlist(
-        "assetTicker[]", []
-    )  # Get asset tickers from the request
+    try:
+        options = _performance_options(request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    with timed("fetch"):
+        asset_performance = list(
+            _window_queryset(
+                options["asset_symbol"], options["from_date"], options["to_date"]
+            )
+        )  # Retrieve the requested window of performance data for the asset tickers
+        bm_performance = list(
+            _window_queryset(
+                options["bm_symbol"], options["from_date"], options["to_date"]
+            )
+        )  # Retrieve the requested window of performance data for the benchmark tickers
+
+    try:
+        return _performance_response(options, asset_performance, bm_performance)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
 
-    from_date = request.GET.get("fromDate")
-    to_date = request.GET.get("toDate")
+@login_required
+@require_POST
+def optimize_view(request):
+    try:
+        options = _optimization_options(request.body)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        return _optimization_response(options)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+@login_required
+@require_POST
+def pf_view_batch_performance(request):
+    try:
+        options = _batch_options(request.body)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        return _batch_response(options)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+@login_required
+@require_POST
+def simulate_view(request):
+    try:
+        options = _simulation_options(request.body)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        return _simulation_response(options)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+def _performance_options(query):
+    """
+    Parse the query parameters of pf_view_performance.
+
+    Parameters:
+    query (QueryDict): GET parameters of the request.
 
-    asset_performance = list(
-        models.Performance.objects.filter(symbol__in=asset_symbol).values()
-    )  # Retrieve performance data for the specified asset tickers
+    Returns:
+    dict: Parsed options. Raises ValueError with the error message of the 400
+    response if a parameter is invalid.
+    """
+    options = {
+        "asset_symbol": query.getlist(
+            "assetTicker[]", []
+        ),  # Get asset tickers from the request
+        "bm_symbol": query.getlist(
+            "bmTicker[]", []
+        ),  # Get benchmark tickers from the request
+        "asset_weights": query.get("assetWeights"),
+        "bm_weights": query.get("bmWeights"),
+    }
+
+    # Convert the from_date and to_date to date objects
+    try:
+        options["from_date"] = datetime.strptime(
+            query.get("fromDate").strip('"'), "%Y-%m-%d"
+        ).date()
+        options["to_date"] = datetime.strptime(
+            query.get("toDate").strip('"'), "%Y-%m-%d"
+        ).date()
+    except (AttributeError, ValueError):
+        raise ValueError("Invalid dates")
+
+    # Rolling beta lookback (2 years of weekly returns unless requested otherwise)
+    options["beta_frequency"] = query.get("betaFrequency", "weekly")
+    try:
+        options["beta_window"] = int(query.get("betaWindow", 104))
+    except ValueError:
+        options["beta_window"] = 0
+    if (
+        options["beta_frequency"] not in RETURN_FREQUENCIES
+        or options["beta_window"] < 2
+    ):
+        raise ValueError("Invalid beta parameters")
+
+    # Rebalancing schedule of the portfolio and the benchmark
+    options["schedule"] = query.get("rebalance", "quarterly")
+    try:
+        options["band"] = float(query.get("driftBand", 0.05))
+    except ValueError:
+        options["band"] = -1
+    if options["schedule"] not in SCHEDULES or options["band"] < 0:
+        raise ValueError("Invalid rebalancing parameters")
+
+    # Optional extra rolling windows (trading days) for return, volatility, Sharpe and Sortino
+    try:
+        options["rolling_windows"] = [
+            int(w) for w in query.getlist("rollingWindow[]", [])
+        ]
+    except ValueError:
+        options["rolling_windows"] = [0]
+    if any(window < 2 for window in options["rolling_windows"]):
+        raise ValueError("Invalid rolling windows")
+
+    # Number of top drawdowns per series and minimum drawdown depth in percent
+    try:
+        options["top_n"] = int(query.get("topDrawdowns", 5))
+        options["min_depth"] = float(query.get("minDrawdown", 0)) / 100
+    except ValueError:
+        raise ValueError("Invalid drawdown parameters")
+    if options["top_n"] < 0:
+        raise ValueError("Invalid drawdown parameters")
+
+    # Rows for the existing charts, or one shared date array plus one array per series
+    options["output_format"] = query.get("format", "rows")
+    if options["output_format"] not in RESPONSE_FORMATS:
+        raise ValueError("Invalid format")
+
+    return options
+
+
+def _window_queryset(symbols, from_date, to_date):
+    """Performance rows of the symbols within the date window, symbol by symbol."""
+    return (
+        models.Performance.objects.filter(
+            symbol__in=symbols, trade_date__range=(from_date, to_date)
+        )
+        .order_by("symbol", "trade_date")
+        .values(*PERFORMANCE_COLUMNS)
+    )
 
-    # Convert the from_date and to_date to datetime objects
-    from_date = datetime.strptime(from_date.strip('"'), "%Y-%m-%d")
-    to_date = datetime.strptime(to_date.strip('"'), "%Y-%m-%d")
 
-    asset_performance = filter_performance(asset_performance, from_date, to_date)
+def _qualdata_options(query):
+    """
+    Parse the query parameters of the batched qualitative data endpoint.
 
-    asset_weights_param = request.GET.get(
-        "assetWeights"
-    )  # Get asset weights from the request
+    Parameters:
+    query (QueryDict): GET parameters with ticker[] and optionally fields[]
+    (QUALDATA_FIELDS, all of them by default).
+
+    Returns:
+    tuple: (tickers, fields). Raises ValueError with the error message of the
+    400 response if a parameter is invalid.
+    """
+    tickers = list(dict.fromkeys(query.getlist("ticker[]", [])))
+    if not 1 <= len(tickers) <= MAX_QUALDATA_TICKERS:
+        raise ValueError(f"Between 1 and {MAX_QUALDATA_TICKERS} tickers are required")
+
+    fields = query.getlist("fields[]", []) or QUALDATA_FIELDS
+    if any(field not in QUALDATA_FIELDS for field in fields):
+        raise ValueError("Invalid fields")
+    # The ticker is always sent so that the rows can be matched
+    fields = ["ticker", *[field for field in fields if field != "ticker"]]
+    return tickers, fields
+
+
+def _qualdata_queryset(tickers, fields):
+    """Qualdata rows of the tickers in one query on the ticker index."""
+    return (
+        models.Qualdata.objects.filter(ticker__in=tickers)
+        .order_by("pk")
+        .values(*fields)
+    )
+
+
+def _qualdata_rows(tickers, rows):
+    """Rows in the order of the requested tickers (tickers without data are left out)."""
+    order = {ticker: i for i, ticker in enumerate(tickers)}
+    return sorted(rows, key=lambda row: order[row["ticker"]])
+
+
+def _universe_options(query):
+    """
+    Parse the query parameters of a universe table page.
+
+    All parameters are optional: page (from 1) and pageSize, or offset instead of
+    page, sort (a column of the rows) and dir ("asc" or "desc"), the GIC_FILTERS
+    (exact values, repeatable) and q (search in the code, ISIN and name).
+
+    Parameters:
+    query (QueryDict): GET parameters of the request.
+
+    Returns:
+    dict: Parsed options. Raises ValueError with the error message of the 400
+    response if a parameter is invalid.
+    """
+    try:
+        page = int(query.get("page", 1))
+        page_size = int(query.get("pageSize", UNIVERSE_PAGE_SIZE))
+        offset = int(query.get("offset", (page - 1) * page_size))
+    except ValueError:
+        raise ValueError("Invalid paging parameters")
+    if page < 1 or not 1 <= page_size <= MAX_UNIVERSE_PAGE_SIZE or offset < 0:
+        raise ValueError("Invalid paging parameters")
+
+    options = {"offset": offset, "page_size": page_size}
+
+    options["sort"] = query.get("sort", "code__code")
+    options["dir"] = query.get("dir", "asc")
+    if options["sort"] not in SECTOR_COLUMNS or options["dir"] not in ["asc", "desc"]:
+        raise ValueError("Invalid sort parameters")
+
+    options["filters"] = {
+        field: query.getlist(key) for key, field in GIC_FILTERS.items() if key in query
+    }
+    options["q"] = query.get("q", "").strip()
+    return options
+
+
+def _universe_queryset(options):
+    """Filtered and sorted universe rows (Sector joined with Identification)."""
+    queryset = models.Sector.objects.all()
+    for field, values in options["filters"].items():
+        queryset = queryset.filter(**{f"{field}__in": values})
+
+    if options["q"]:
+        q = options["q"]
+        queryset = queryset.filter(
+            Q(code__code__startswith=q)
+            | Q(code__isin__startswith=q)
+            | Q(code__name__icontains=q)
+        )
+
+    # The primary key makes the order total, so pages do not overlap
+    sign = "-" if options["dir"] == "desc" else ""
+    return queryset.order_by(f"{sign}{options['sort']}", f"{sign}pk").values(
+        *SECTOR_COLUMNS
+    )
+
+
+def _universe_page(options, total, rows):
+    """Response of a universe table page."""
+    return {
+        "total": total,
+        "offset": options["offset"],
+        "pageSize": options["page_size"],
+        "rows": rows,
+    }
+
+
+def _screener_options(query):
+    """
+    Parse the query parameters of the screener.
+
+    Filters are field[]=value for the SCREENER_TEXT_FIELDS (exact values,
+    repeatable), field__gt, field__gte, field__lt and field__lte=number for the
+    SCREENER_NUMBER_FIELDS and field__isnull=true|false for both. sort (a
+    screener field), dir ("asc" or "desc"), limit and offset are optional.
+    Missing values are sorted last in both directions.
+
+    Parameters:
+    query (QueryDict): GET parameters of the request.
+
+    Returns:
+    dict: Parsed options. Raises ValueError with the error message of the 400
+    response if a parameter is invalid.
+    """
+    try:
+        options = {
+            "limit": int(query.get("limit", SCREENER_LIMIT)),
+            "offset": int(query.get("offset", 0)),
+        }
+    except ValueError:
+        raise ValueError("Invalid paging parameters")
+    if not 1 <= options["limit"] <= MAX_SCREENER_LIMIT or options["offset"] < 0:
+        raise ValueError("Invalid paging parameters")
+
+    options["sort"] = query.get("sort", "symbol")
+    options["dir"] = query.get("dir", "asc")
+    if options["sort"] not in SCREENER_COLUMNS or options["dir"] not in ["asc", "desc"]:
+        raise ValueError("Invalid sort parameters")
+
+    # Every other parameter is a filter on a whitelisted field and lookup
+    filters = {}
+    for key in query:
+        if key in ["limit", "offset", "sort", "dir"]:
+            continue
+        field, _, lookup = key.partition("__")
+        if key.endswith("[]") and key[:-2] in SCREENER_TEXT_FIELDS:
+            filters[f"{key[:-2]}__in"] = query.getlist(key)
+        elif lookup == "isnull" and field in SCREENER_COLUMNS:
+            if query[key] not in ["true", "false"]:
+                raise ValueError(f"Invalid filter value: {key}")
+            filters[key] = query[key] == "true"
+        elif lookup in SCREENER_NUMBER_LOOKUPS and field in SCREENER_NUMBER_FIELDS:
+            try:
+                filters[key] = float(query[key])
+            except ValueError:
+                raise ValueError(f"Invalid filter value: {key}")
+        else:
+            raise ValueError(f"Invalid filter: {key}")
+    options["filters"] = filters
+    return options
+
+
+def _screener_queryset(options):
+    """Filtered and sorted screener rows, the filters use the field indexes."""
+    field = F(options["sort"])
+    order = (
+        field.desc(nulls_last=True)
+        if options["dir"] == "desc"
+        else field.asc(nulls_last=True)
+    )
+    # The unique symbol makes the order total, so pages do not overlap
+    return (
+        models.ScreenerFactor.objects.filter(**options["filters"])
+        .order_by(order, "symbol")
+        .values(*SCREENER_COLUMNS)
+    )
+
+
+def _screener_page(options, total, rows):
+    """Response of a screener page."""
+    return {
+        "total": total,
+        "offset": options["offset"],
+        "limit": options["limit"],
+        "rows": rows,
+    }
+
+
+def _stream_options(query):
+    """
+    Parse the query parameters of the performance endpoint.
+
+    All parameters are optional: ticker[] (symbols), fromDate and toDate
+    ("yyyy-mm-dd"), limit (rows per page), cursor (X-Next-Cursor of the previous
+    page) and format ("rows", "ndjson" or "columnar"; columnar is not paginated).
+
+    Parameters:
+    query (QueryDict): GET parameters of the request.
+
+    Returns:
+    dict: Parsed options. Raises ValueError with the error message of the 400
+    response if a parameter is invalid.
+    """
+    options = {"symbols": query.getlist("ticker[]", [])}
+
+    try:
+        for option, key in [("from_date", "fromDate"), ("to_date", "toDate")]:
+            value = query.get(key)
+            options[option] = (
+                datetime.strptime(value.strip('"'), "%Y-%m-%d").date()
+                if value
+                else None
+            )
+    except ValueError:
+        raise ValueError("Invalid dates")
+
+    try:
+        options["limit"] = int(query["limit"]) if query.get("limit") else None
+    except ValueError:
+        options["limit"] = 0
+    if options["limit"] is not None and options["limit"] < 1:
+        raise ValueError("Invalid limit")
+
+    cursor = query.get("cursor")
+    options["cursor"] = decode_cursor(cursor) if cursor else None
+
+    options["output_format"] = query.get("format", "rows")
+    if options["output_format"] not in [*RESPONSE_FORMATS, *STREAM_CONTENT_TYPES]:
+        raise ValueError("Invalid format")
+
+    return options
+
+
+def _stream_queryset(options):
+    """Filtered Performance rows after the cursor, in keyset order (symbol, trade_date)."""
+    # Rows without a trade date have no place in the keyset order
+    queryset = models.Performance.objects.filter(trade_date__isnull=False).order_by(
+        "symbol", "trade_date"
+    )
+    if options["symbols"]:
+        queryset = queryset.filter(symbol__in=options["symbols"])
+    if options["from_date"] is not None:
+        queryset = queryset.filter(trade_date__gte=options["from_date"])
+    if options["to_date"] is not None:
+        queryset = queryset.filter(trade_date__lte=options["to_date"])
+    if options["cursor"] is not None:
+        symbol, trade_date = options["cursor"]
+        queryset = queryset.filter(
+            Q(symbol__gt=symbol) | Q(symbol=symbol, trade_date__gt=trade_date)
+        )
+    return queryset
+
+
+def _page_keys(queryset, limit):
+    """Keys of the last row of the page and of the row after it (index only query)."""
+    return queryset.values_list("symbol", "trade_date")[limit - 1 : limit + 1]
+
+
+def _page(queryset, keys):
+    """
+    Bound a queryset to the page that ends with keys[0].
+
+    Returns:
+    tuple: (queryset, cursor of the next page), the cursor is None on the last page.
+    """
+    if len(keys) < 2:
+        return queryset, None
+    symbol, trade_date = keys[0]
+    queryset = queryset.filter(
+        Q(symbol__lt=symbol) | Q(symbol=symbol, trade_date__lte=trade_date)
+    )
+    return queryset, encode_cursor(symbol, trade_date)
+
+
+def _performance_response(options, asset_performance, bm_performance):
+    """
+    Compute the pf_view_performance response from the loaded Performance rows.
+
+    Raises ValueError with the error message of the 400 response if the weights
+    are invalid.
+    """
+    portfolio_performance = None  # Initialize portfolio performance to None
+    asset_symbol = options["asset_symbol"]
+    bm_symbol = options["bm_symbol"]
+    schedule = options["schedule"]
+    band = options["band"]
+    output_format = options["output_format"]
+
+    # Parse and pivot the asset prices once, in the order of the requested tickers
+    with timed("pivot"):
+        asset_panel = PricePanel.from_records(asset_performance).select(asset_symbol)
+
+    asset_weights_param = options["asset_weights"]
     if asset_weights_param:
         try:
             asset_weights = json.loads(
                 asset_weights_param
             )  # Parse asset weights from JSON
-            portfolio_performance = calculate_portfolio_performance(
-                asset_weights, asset_performance, "Portfolio"
+            portfolio_panel = calculate_portfolio_panel(
+                asset_weights, asset_panel, "Portfolio", schedule, band
             )  # Calculate portfolio performance based on asset weights and performance data
-        except (json.JSONDecodeError, ValueError) as e:
-            return JsonResponse(
-                {"error": "Invalid weights format"}, status=400
+            portfolio_performance = portfolio_panel.to_records()
+        except (json.JSONDecodeError, ValueError):
+            raise ValueError(
+                "Invalid weights format"
             )  # Return error if weights format is invalid
 
-    bm_performance = None  # Initialize benchmark performance to None
-    bm_symbol = request.GET.getlist(
-        "bmTicker[]", []
-    )  # Get benchmark tickers from the request
-    bm_performance = list(
-        models.Performance.objects.filter(symbol__in=bm_symbol).values()
-    )  # Retrieve performance data for the specified benchmark tickers
-
-    bm_performance = filter_performance(bm_performance, from_date, to_date)
+    with timed("pivot"):
+        bm_panel = PricePanel.from_records(bm_performance).select(bm_symbol)
 
     # Ensure that bm_performance has the same "date" as portfolio_performance
     if portfolio_performance and bm_performance:
-        portfolio_dates = {entry["date"] for entry in portfolio_performance}
-        bm_performance = [
-            entry for entry in bm_performance if entry["date"] in portfolio_dates
-        ]
+        bm_panel = bm_panel.restrict(portfolio_panel.dates)
+        bm_performance = bm_panel.to_records()
 
-    bm_weights_param = request.GET.get(
-        "bmWeights"
-    )  # Get benchmark weights from the request
+    bm_weights_param = options["bm_weights"]
     if bm_weights_param:
         try:
             bm_weights = json.loads(
                 bm_weights_param
             )  # Parse benchmark weights from JSON
-            bm_performance = calculate_portfolio_performance(
-                bm_weights, bm_performance, "Benchmark"
+            bm_panel = calculate_portfolio_panel(
+                bm_weights, bm_panel, "Benchmark", schedule, band
             )  # Calculate benchmark performance based on weights and performance data
-        except (json.JSONDecodeError, ValueError) as e:
-            return JsonResponse(
-                {"error": "Invalid weights format"}, status=400
+            bm_performance = bm_panel.to_records()
+        except (json.JSONDecodeError, ValueError):
+            raise ValueError(
+                "Invalid weights format"
             )  # Return error if weights format is invalid
 
-    pf_bm_performance = portfolio_performance + bm_performance
-
     #    ! Run Computation --------------------------------------------------------------------------
+    # The independent analytics run as stages on the analytics executor and share
+    # the same panels and their cached returns
+
+    # Weight independent asset statistics come from the SymbolAnalytics table if built
+    asset_statistics = materialized_rolling_statistics(asset_panel)
 
-    pf_bm_rolling_return = calculate_rolling_return(pf_bm_performance)
+    response_data, _ = performance_bundle(
+        asset_panel,
+        portfolio_panel,
+        bm_panel,
+        options["beta_window"],
+        options["beta_frequency"],
+        options["rolling_windows"],
+        options["top_n"],
+        options["min_depth"],
+        output_format,
+        asset_statistics,
+    )
+
+    with timed("serialize"):
+        if output_format == "columnar":
+            # Small tables keep their rows, every timeseries becomes a numeric array
+            return ColumnarJsonResponse(response_data)
+        # Combine both results in a single response
+        return JsonResponse(
+            {
+                "asset_performance": asset_performance,
+                "portfolio_performance": portfolio_performance
+                + bm_performance,  # This will be None if no weights are provided
+                **response_data,
+            },
+            safe=False,
+        )
 
-    portfolio_rolling_return = calculate_rolling_return(portfolio_performance)
-    asset_rolling_return = calculate_rolling_return(asset_performance)
 
-    portfolio_drawdown = calculate_drawdown(portfolio_performance)
-    benchmark_drawdown = calculate_drawdown(bm_performance)
-    combined_drawdown = portfolio_drawdown + benchmark_drawdown
+def _columnar_closes(queryset, key, symbols=None):
+    """Columnar close prices of a Performance queryset (see pf_view_performance)."""
+    return _columnar_prices(read_closes(queryset), key, symbols)
 
-    portfolio_top_drawdowns = calculate_top_drawdowns(portfolio_performance)
-    benchmark_top_drawdowns = calculate_top_drawdowns(bm_performance)
 
-    portfolio_rolling_beta = calculate_rolling_beta(
-        portfolio_performance, bm_performance
+def _columnar_prices(prices, key, symbols=None):
+    """Columnar response of a wide close frame, optionally in the order of symbols."""
+    if symbols is not None:
+        prices = PricePanel(prices).select(symbols).prices
+    return ColumnarJsonResponse(
+        {
+            "format": "columnar",
+            "dates": format_dates(prices.index),
+            key: to_columns({"close": prices}, prices.index),
+        }
     )
 
-    asset_rolling_beta = calculate_rolling_beta(asset_performance, bm_performance)
 
-    combined_performance = portfolio_performance + asset_performance
-    performance_metrics = calculate_performance_metrics(
-        combined_performance, bm_performance
-    )
+def _optimization_options(body):
+    """
+    Parse the JSON body of the optimization endpoint.
+
+    Only tickers is required. objective (OBJECTIVES, "min_variance" by default),
+    estimator (ESTIMATORS, "ledoit_wolf" by default), window (trading days of
+    returns) ending at toDate ("yyyy-mm-dd", the latest price by default),
+    halflife (days, EWMA only), minWeight and maxWeight (a number or
+    {ticker: bound}), sectorMax (a number or {gicSector: cap}) and riskFree (the
+    annual rate of the maximum Sharpe ratio) are optional.
+
+    Returns:
+    dict: Parsed options. Raises ValueError with the error message of the 400
+    response if a parameter is invalid.
+    """
+    try:
+        data = json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError("Invalid JSON body")
+    if not isinstance(data, dict):
+        raise ValueError("Invalid JSON body")
+
+    tickers = data.get("tickers")
+    if not isinstance(tickers, list) or not all(isinstance(t, str) for t in tickers):
+        raise ValueError("Invalid tickers")
+    tickers = list(dict.fromkeys(tickers))
+    if not 2 <= len(tickers) <= MAX_OPTIMIZATION_ASSETS:
+        raise ValueError(
+            f"Between 2 and {MAX_OPTIMIZATION_ASSETS} tickers are required"
+        )
 
-    monthly_returns = calculate_monthly_returns(portfolio_performance, bm_performance)
-
-    # Combine both results in a single response
-    response_data = {
-        "asset_performance": asset_performance,
-        "portfolio_performance": pf_bm_performance,  # This will be None if no weights are provided
-        "pf_bm_rolling_return": pf_bm_rolling_return,
-        "asset_rolling_return": asset_rolling_return,
-        "portfolio_drawdown": combined_drawdown,
-        "portfolio_top_drawdowns": portfolio_top_drawdowns,
-        "benchmark_top_drawdowns": benchmark_top_drawdowns,
-        "portfolio_rolling_beta": portfolio_rolling_beta,
-        "asset_rolling_beta": asset_rolling_beta,
-        "performance_metrics": performance_metrics,
-        "monthly_returns": monthly_returns,
+    options = {
+        "tickers": tickers,
+        "objective": data.get("objective", "min_variance"),
+        "estimator": data.get("estimator", "ledoit_wolf"),
     }
-    return JsonResponse(response_data, safe=False)
+    if options["objective"] not in OBJECTIVES:
+        raise ValueError("Invalid objective")
+    if options["estimator"] not in ESTIMATORS:
+        raise ValueError("Invalid estimator")
+
+    try:
+        options["window"] = int(data.get("window", COVARIANCE_WINDOW))
+        options["halflife"] = float(data.get("halflife", EWMA_HALFLIFE))
+        options["risk_free"] = float(data.get("riskFree", 0.0))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid estimation parameters")
+    if (
+        not MIN_OBSERVATIONS < options["window"] <= MAX_OPTIMIZATION_WINDOW
+        or options["halflife"] <= 0
+    ):
+        raise ValueError("Invalid estimation parameters")
+
+    try:
+        to_date = data.get("toDate")
+        options["to_date"] = (
+            datetime.strptime(to_date.strip('"'), "%Y-%m-%d").date()
+            if to_date
+            else None
+        )
+    except (AttributeError, ValueError):
+        raise ValueError("Invalid dates")
+
+    for option, key in [
+        ("lower", "minWeight"),
+        ("upper", "maxWeight"),
+        ("sector_caps", "sectorMax"),
+    ]:
+        value = data.get(key)
+        if value is not None and not isinstance(value, (int, float, dict)):
+            raise ValueError("Invalid constraints")
+        options[option] = value
+    options["lower"] = 0.0 if options["lower"] is None else options["lower"]
+    options["upper"] = 1.0 if options["upper"] is None else options["upper"]
+    return options
+
+
+def _optimization_returns(symbols, window, to_date=None):
+    """Daily returns of the symbols over the last window trading days up to to_date."""
+    store = get_price_store()
+    if store is not None:
+        prices = store.panel(symbols, to_date=to_date)
+    else:
+        queryset = models.Performance.objects.filter(symbol__in=symbols)
+        if to_date is None:
+            to_date = queryset.aggregate(Max("trade_date"))["trade_date__max"]
+            if to_date is None:
+                raise ValueError("No prices for the tickers")
+        # Calendar days that surely hold the window, with room for long holidays
+        from_date = to_date - timedelta(days=window * 366 // TRADING_DAYS + 30)
+        prices = read_closes(queryset.filter(trade_date__range=(from_date, to_date)))
+
+    prices = prices.dropna(how="all").iloc[-(window + 1) :]
+    return daily_returns(prices)
+
+
+def _symbol_sectors(symbols):
+    """GIC sector of the symbols, the sector map is cached per reference data version."""
+    state = data_state([IDENTIFICATION_DATA, SECTOR_DATA])
+    cache = caches[ANALYTICS_CACHE]
+    key = f"gic_sectors:{etag(state)}"
+    sectors = cache.get(key)
+    if sectors is None:
+        sectors = gic_sectors(
+            models.Sector.objects.values_list("code__code", "gicSector").iterator()
+        )
+        cache.set(key, sectors)
+    return {symbol: sectors.get(symbol) for symbol in symbols}
+
+
+def _optimization_response(options):
+    """
+    Optimize the portfolio of the optimization endpoint.
+
+    Raises ValueError with the error message of the 400 response if the data or
+    the constraints do not allow an optimization.
+    """
+    with timed("covariance"):
+        result, hit = cached_estimate(
+            options["tickers"],
+            lambda: _optimization_returns(
+                options["tickers"], options["window"], options["to_date"]
+            ),
+            options["estimator"],
+            options["window"],
+            options["to_date"],
+            options["halflife"],
+        )
+
+    with timed("optimize"):
+        sectors = _symbol_sectors(result.symbols)
+        constraints = make_constraints(
+            result.symbols,
+            options["lower"],
+            options["upper"],
+            sectors,
+            options["sector_caps"],
+        )
+        solution = optimize(
+            options["objective"], result, constraints, options["risk_free"]
+        )
+        statistics = portfolio_statistics(
+            solution.weights, result, options["risk_free"]
+        )
+
+    estimated = set(result.symbols)
+    weights = [
+        {
+            "symbol": symbol,
+            "weight": float(weight),
+            "sector": sectors[symbol],
+            "riskContribution": contribution,
+        }
+        for symbol, weight, contribution in zip(
+            result.symbols, solution.weights, statistics.pop("riskContributions")
+        )
+    ]
+    sector_weights = {}
+    for row in weights:
+        sector = row["sector"] or "Other"
+        sector_weights[sector] = sector_weights.get(sector, 0.0) + row["weight"]
+
+    with timed("serialize"):
+        response = JsonResponse(
+            {
+                "objective": options["objective"],
+                "estimator": options["estimator"],
+                "window": options["window"],
+                "shrinkage": result.shrinkage,
+                "converged": solution.converged,
+                "iterations": solution.iterations,
+                **statistics,
+                "weights": weights,
+                "sectorWeights": sector_weights,
+                # Requested tickers without enough prices in the window
+                "excluded": [t for t in options["tickers"] if t not in estimated],
+            }
+        )
+    response["X-Cache"] = "HIT" if hit else "MISS"
+    return response
+
+
+def _batch_options(body):
+    """
+    Parse the JSON body of the batch evaluation endpoint.
+
+    tickers, fromDate and toDate ("yyyy-mm-dd") are required, and either
+    weights (a list of weight vectors in the order of tickers) or sample
+    ({"count", "alpha", "seed"}, random weight vectors that add up to 1). The
+    request body is limited by DATA_UPLOAD_MAX_MEMORY_SIZE, large scenario sets
+    are better sampled. rebalance (BATCH_SCHEDULES, "quarterly" by default),
+    sortBy (BATCH_METRICS, "sharpe" by default), order ("desc" or "asc"), topK
+    (10 by default) and paths (value paths of the topK vectors) are optional.
+
+    Returns:
+    dict: Parsed options. Raises ValueError with the error message of the 400
+    response if a parameter is invalid.
+    """
+    try:
+        data = json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError("Invalid JSON body")
+    if not isinstance(data, dict):
+        raise ValueError("Invalid JSON body")
+
+    tickers = data.get("tickers")
+    if (
+        not isinstance(tickers, list)
+        or not all(isinstance(t, str) for t in tickers)
+        or len(set(tickers)) != len(tickers)
+    ):
+        raise ValueError("Invalid tickers")
+    if not 1 <= len(tickers) <= MAX_BATCH_ASSETS:
+        raise ValueError(f"Between 1 and {MAX_BATCH_ASSETS} tickers are required")
+    options = {"tickers": tickers}
+
+    try:
+        options["from_date"] = datetime.strptime(
+            data.get("fromDate").strip('"'), "%Y-%m-%d"
+        ).date()
+        options["to_date"] = datetime.strptime(
+            data.get("toDate").strip('"'), "%Y-%m-%d"
+        ).date()
+    except (AttributeError, ValueError):
+        raise ValueError("Invalid dates")
+
+    # Weight vectors, either given or sampled
+    weights, sample = data.get("weights"), data.get("sample")
+    if (weights is None) == (sample is None):
+        raise ValueError("Either weights or sample is required")
+    if weights is not None:
+        try:
+            weights = np.asarray(weights, dtype=float)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid weights format")
+        if (
+            weights.ndim != 2
+            or weights.shape[1] != len(tickers)
+            or not np.isfinite(weights).all()
+        ):
+            raise ValueError("Invalid weights format")
+        options["seed"] = None
+    else:
+        if not isinstance(sample, dict):
+            raise ValueError("Invalid sample")
+        try:
+            count = int(sample.get("count", 1000))
+            alpha = np.asarray(sample.get("alpha", 1.0), dtype=float)
+            # A random seed is drawn and returned, so that the sample can be repeated
+            seed = sample.get("seed")
+            seed = int(
+                np.random.default_rng().integers(2**32) if seed is None else seed
+            )
+        except (TypeError, ValueError):
+            raise ValueError("Invalid sample")
+        if (
+            alpha.ndim > 1
+            or alpha.size not in (1, len(tickers))
+            or not (alpha > 0).all()
+        ):
+            raise ValueError("Invalid sample")
+        if not 1 <= count <= MAX_BATCH_VECTORS or seed < 0:
+            raise ValueError("Invalid sample")
+        weights = sample_weights(len(tickers), count, alpha, seed)
+        options["seed"] = seed
+    if not 1 <= len(weights) <= MAX_BATCH_VECTORS:
+        raise ValueError(
+            f"Between 1 and {MAX_BATCH_VECTORS} weight vectors are required"
+        )
+    options["weights"] = weights
+
+    options["schedule"] = data.get("rebalance", "quarterly")
+    if options["schedule"] not in BATCH_SCHEDULES:
+        raise ValueError("Invalid rebalancing parameters")
+
+    options["sort"] = data.get("sortBy", "sharpe")
+    options["order"] = data.get("order", "desc")
+    try:
+        options["top_k"] = int(data.get("topK", 10))
+    except (TypeError, ValueError):
+        options["top_k"] = -1
+    options["paths"] = data.get("paths", False)
+    if (
+        options["sort"] not in BATCH_METRICS
+        or options["order"] not in ("desc", "asc")
+        or not 0 <= options["top_k"] <= MAX_BATCH_TOP_K
+        or not isinstance(options["paths"], bool)
+    ):
+        raise ValueError("Invalid ranking parameters")
+    return options
+
+
+def _batch_prices(symbols, from_date, to_date):
+    """Close prices of the symbols between from_date and to_date, in the order of symbols."""
+    store = get_price_store()
+    if store is not None:
+        prices = store.panel(symbols, from_date, to_date)
+    else:
+        prices = read_closes(
+            models.Performance.objects.filter(
+                symbol__in=symbols, trade_date__range=(from_date, to_date)
+            )
+        )
+    return PricePanel(prices.dropna(how="all")).select(symbols).prices
+
+
+def _batch_response(options):
+    """
+    Evaluate the weight vectors of the batch evaluation endpoint.
+
+    Raises ValueError with the error message of the 400 response if the
+    tickers have no prices in the window.
+    """
+    tickers = options["tickers"]
+    with timed("fetch"):
+        prices = _batch_prices(tickers, options["from_date"], options["to_date"])
+    missing = [ticker for ticker in tickers if ticker not in prices.columns]
+    if missing:
+        raise ValueError(f"No prices in the window for: {', '.join(missing)}")
+    if len(prices) < 2:
+        raise ValueError("At least 2 dates with prices are required")
+
+    weights = options["weights"]
+    with timed("evaluate"):
+        metrics, top, paths = evaluate_batch(
+            prices,
+            weights,
+            options["schedule"],
+            options["sort"],
+            options["order"] == "desc",
+            options["top_k"],
+        )
+
+    with timed("serialize"):
+        response_data = {
+            "tickers": tickers,
+            "count": len(weights),
+            "seed": options["seed"],
+            "rebalance": options["schedule"],
+            "sortBy": options["sort"],
+            "order": options["order"],
+            # One array per metric with a value for every weight vector
+            "metrics": metrics,
+            "top": {
+                "index": top,
+                "weights": weights[top],
+                "metrics": {metric: values[top] for metric, values in metrics.items()},
+            },
+        }
+        if options["paths"]:
+            response_data["dates"] = format_dates(prices.index)
+            response_data["top"]["paths"] = np.ascontiguousarray(paths.T)
+        return ColumnarJsonResponse(response_data)
+
+
+def _simulation_options(body):
+    """
+    Parse the JSON body of the simulation endpoint.
+
+    tickers and weights (in the order of tickers, long only, the rest is cash)
+    are required. method (METHODS, "bootstrap" by default), paths (10000 by
+    default), horizon (trading days, 252 by default), window (trading days of
+    historical returns) ending at toDate ("yyyy-mm-dd", the latest price by
+    default), estimator (ESTIMATORS, normal and t only), dof (t only),
+    blockLength (bootstrap only), rebalance (SIMULATION_SCHEDULES), quantiles
+    and seed (drawn and returned if missing) are optional.
+
+    Returns:
+    dict: Parsed options. Raises ValueError with the error message of the 400
+    response if a parameter is invalid.
+    """
+    try:
+        data = json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError("Invalid JSON body")
+    if not isinstance(data, dict):
+        raise ValueError("Invalid JSON body")
+
+    tickers = data.get("tickers")
+    if (
+        not isinstance(tickers, list)
+        or not all(isinstance(t, str) for t in tickers)
+        or len(set(tickers)) != len(tickers)
+        or not 1 <= len(tickers) <= MAX_OPTIMIZATION_ASSETS
+    ):
+        raise ValueError("Invalid tickers")
+
+    try:
+        weights = np.asarray(data.get("weights"), dtype=float)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid weights format")
+    if (
+        weights.shape != (len(tickers),)
+        or not np.isfinite(weights).all()
+        or (weights < 0).any()
+        or not 0 < weights.sum() <= 1 + 1e-9
+    ):
+        raise ValueError("Invalid weights format")
+
+    options = {
+        "tickers": tickers,
+        "weights": weights,
+        "method": data.get("method", "bootstrap"),
+        "estimator": data.get("estimator", "ledoit_wolf"),
+        "schedule": data.get("rebalance", "quarterly"),
+    }
+    if options["method"] not in METHODS or options["estimator"] not in ESTIMATORS:
+        raise ValueError("Invalid simulation method")
+    if options["schedule"] not in SIMULATION_SCHEDULES:
+        raise ValueError("Invalid rebalancing parameters")
+
+    try:
+        options["paths"] = int(data.get("paths", 10000))
+        options["horizon"] = int(data.get("horizon", TRADING_DAYS))
+        options["window"] = int(data.get("window", COVARIANCE_WINDOW))
+        options["dof"] = float(data.get("dof", T_DOF))
+        options["block_length"] = float(data.get("blockLength", BLOCK_LENGTH))
+        options["quantiles"] = [float(q) for q in data.get("quantiles", FAN_QUANTILES)]
+        seed = data.get("seed")
+        options["seed"] = int(
+            np.random.default_rng().integers(2**32) if seed is None else seed
+        )
+    except (TypeError, ValueError):
+        raise ValueError("Invalid simulation parameters")
+    if (
+        not 1 <= options["paths"] <= MAX_SIMULATION_PATHS
+        or not 1 <= options["horizon"] <= MAX_SIMULATION_HORIZON
+        or options["paths"] * options["horizon"] * len(tickers) > MAX_SIMULATION_DRAWS
+        or not MIN_OBSERVATIONS < options["window"] <= MAX_OPTIMIZATION_WINDOW
+        or not options["dof"] > 2
+        or not options["block_length"] >= 1
+        or not 1 <= len(options["quantiles"]) <= 21
+        or not all(0 <= q <= 1 for q in options["quantiles"])
+        or options["seed"] < 0
+    ):
+        raise ValueError("Invalid simulation parameters")
+
+    try:
+        to_date = data.get("toDate")
+        options["to_date"] = (
+            datetime.strptime(to_date.strip('"'), "%Y-%m-%d").date()
+            if to_date
+            else None
+        )
+    except (AttributeError, ValueError):
+        raise ValueError("Invalid dates")
+    return options
+
+
+def _simulation_response(options):
+    """
+    Simulate the portfolio of the simulation endpoint.
+
+    Raises ValueError with the error message of the 400 response if the
+    tickers do not have enough common returns in the window.
+    """
+    tickers = options["tickers"]
+    with timed("fetch"):
+        returns = _optimization_returns(tickers, options["window"], options["to_date"])
+    missing = [ticker for ticker in tickers if ticker not in returns.columns]
+    if missing:
+        raise ValueError(f"No prices in the window for: {', '.join(missing)}")
+    # The days of the bootstrap and the moments need a return of every ticker
+    returns = returns[tickers].dropna()
+    if len(returns) < MIN_OBSERVATIONS:
+        raise ValueError(
+            f"At least {MIN_OBSERVATIONS} days with returns of all tickers are required"
+        )
+
+    with timed("simulate"):
+        model = make_model(
+            returns,
+            options["weights"],
+            options["method"],
+            options["estimator"],
+            options["dof"],
+            options["block_length"],
+            options["schedule"],
+        )
+        steps, fan, terminal, drawdown = simulate(
+            model,
+            options["paths"],
+            options["horizon"],
+            options["seed"],
+            **getattr(settings, "SIMULATION_EXECUTOR", {}),
+        )
+        distributions = summarize(steps, fan, terminal, drawdown, options["quantiles"])
+
+    with timed("serialize"):
+        return ColumnarJsonResponse(
+            {
+                "tickers": tickers,
+                "weights": options["weights"],
+                "method": options["method"],
+                "paths": options["paths"],
+                "horizon": options["horizon"],
+                "rebalance": options["schedule"],
+                "seed": options["seed"],
+                # Historical days the model was estimated or resampled from
+                "observations": len(returns),
+                **distributions,
+            }
+        )